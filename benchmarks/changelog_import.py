@@ -0,0 +1,87 @@
+"""Time and peak memory for importing a generated CHANGELOG.md of a given size.
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/changelog_import.py --megabytes 10
+"""
+
+import argparse
+import asyncio
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import Project, User
+from app.services.changelog_import import import_changelog
+from app.services.post import shutdown_render_pool
+
+SECTIONS = ("Added", "Changed", "Fixed", "Security")
+
+
+def _write_changelog(path: Path, megabytes: float) -> int:
+    target = int(megabytes * 1024 * 1024)
+    day = date(2000, 1, 1)
+    versions = 0
+    with path.open("w") as f:
+        f.write("# Changelog\n\n")
+        while f.tell() < target:
+            f.write(f"## [{versions // 100}.{versions % 100}.0] - {day.isoformat()}\n")
+            for section in SECTIONS[: versions % len(SECTIONS) + 1]:
+                f.write(f"### {section}\n")
+                for i in range(6):
+                    f.write(f"- Item {i} with `code`, **bold** text and a [link](https://e.com/{i})\n")
+                f.write("\n")
+            versions += 1
+            day += timedelta(days=1)
+    return versions
+
+
+async def _chunks(path: Path):
+    with path.open("rb") as f:
+        while chunk := f.read(256 * 1024):
+            yield chunk
+
+
+async def main(megabytes: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "CHANGELOG.md"
+        versions = _write_changelog(path, megabytes)
+        size = path.stat().st_size
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as db:
+            user = User(email="bench@example.com", username="bench", hashed_password="x")
+            db.add(user)
+            await db.flush()
+            project = Project(name="Bench", slug="bench", owner_id=user.id)
+            db.add(project)
+            await db.commit()
+
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            start = time.perf_counter()
+            result = await import_changelog(db, project.id, _chunks(path))
+            await db.commit()
+            elapsed = time.perf_counter() - start
+            rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        await engine.dispose()
+        shutdown_render_pool()
+
+    print(f"     file: {size:,} bytes, {versions} versions")
+    print(f" imported: {result.imported} posts in {elapsed:.2f}s "
+          f"({result.imported / elapsed:,.0f} posts/s)")
+    print(f"peak RSS growth: {(rss_after - rss_before) / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.megabytes))
@@ -0,0 +1,16 @@
+"""Reproducible load test: seeded data, scripted scenarios, latency percentiles.
+
+Seeds a throwaway SQLite database with a deterministic dataset (projects,
+posts with realistic markdown sizes, subscribers, users, API keys), then
+drives the app in-process with concurrent requests per scenario and reports
+p50/p95/p99 latency and throughput as JSON. Run from the repository root:
+
+    PYTHONPATH=src python -m benchmarks.load run --out before.json
+    PYTHONPATH=src python -m benchmarks.load run --out after.json
+    PYTHONPATH=src python -m benchmarks.load compare before.json after.json
+
+``compare`` exits non-zero when a scenario's p95 latency or throughput got
+worse by more than ``--threshold`` percent, so it can gate CI. Numbers are
+only comparable between runs on the same machine with the same seed and
+scale.
+"""
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.load import __doc__ as DOC
+from benchmarks.load.data import SCALES
+from benchmarks.load.report import compare
+from benchmarks.load.runner import run
+from benchmarks.load.scenarios import SCENARIOS
+
+
+def _print_results(report: dict) -> None:
+    meta = report["meta"]
+    print(f"commit {meta['commit']}  seed {meta['seed']}  scale {meta['scale']}  "
+          f"concurrency {meta['concurrency']}")
+    print(f"{'scenario':<18} {'requests':>8} {'errors':>6} {'req/s':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, r in report["scenarios"].items():
+        print(f"{name:<18} {r['requests']:>8} {r['errors']:>6} {r['throughput_rps']:>9.1f} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+
+
+def _compare(base_path: Path, new_path: Path, threshold: float) -> int:
+    base = json.loads(base_path.read_text())
+    new = json.loads(new_path.read_text())
+    rows, regressions = compare(base, new, threshold)
+    print(f"{base['meta']['commit']} -> {new['meta']['commit']} (threshold {threshold:g}%)")
+    print(f"{'scenario':<18} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22} {'req/s':>24}")
+    for row in rows:
+        cells = [
+            f"{old:.2f}->{current:.2f} {change:+.0f}%"
+            for old, current, change in (row[m] for m in ("p50_ms", "p95_ms", "p99_ms"))
+        ]
+        old, current, change = row["throughput_rps"]
+        cells.append(f"{old:.0f}->{current:.0f} {change:+.0f}%")
+        flag = "  REGRESSION" if row["scenario"] in regressions else ""
+        print(
+            f"{row['scenario']:<18} {cells[0]:>22} {cells[1]:>22} {cells[2]:>22} "
+            f"{cells[3]:>24}{flag}"
+        )
+    return 1 if regressions else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load", description=DOC.splitlines()[0]
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runner = commands.add_parser("run", help="seed a database and run the scenarios")
+    runner.add_argument("--seed", type=int, default=1)
+    runner.add_argument("--scale", choices=SCALES, default="small")
+    runner.add_argument(
+        "--scenario", action="append", choices=SCENARIOS, dest="scenarios",
+        help="run only this scenario (repeatable)",
+    )
+    runner.add_argument(
+        "--requests", type=int, help="requests per scenario (default: per scenario)"
+    )
+    runner.add_argument("--concurrency", type=int, default=10)
+    runner.add_argument("--out", type=Path, help="write the JSON report here")
+
+    comparer = commands.add_parser("compare", help="compare two JSON reports")
+    comparer.add_argument("base", type=Path)
+    comparer.add_argument("new", type=Path)
+    comparer.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return _compare(args.base, args.new, args.threshold)
+
+    report = asyncio.run(run(
+        args.seed, args.scale, args.scenarios or list(SCENARIOS), args.concurrency, args.requests
+    ))
+    _print_results(report)
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
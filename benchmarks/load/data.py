@@ -0,0 +1,114 @@
+"""Deterministic synthetic dataset."""
+
+import random
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+
+from app.models import Post, Project, Subscriber, User
+from app.services.api_key import create_api_key
+from app.services.auth import hash_password
+from app.services.markdown_renderer import renderer
+from app.services.post import CATEGORIES
+
+PASSWORD = "benchmark-password"
+CATEGORY_KEYS = list(CATEGORIES)
+
+WORDS = [
+    "sync", "export", "import", "dashboard", "billing", "webhook", "latency", "cache", "search",
+    "SSO", "SAML", "audit", "team", "invite", "role", "permission", "report", "chart", "filter",
+    "timezone", "locale", "API", "token", "widget", "email", "digest", "integration", "Slack",
+    "GitHub", "release", "performance", "reliability", "onboarding", "mobile", "offline", "upload",
+    "attachment", "comment", "mention",
+]
+
+SCALES = {
+    "small": {"projects": 5, "posts": 50, "subscribers": 20, "users": 20},
+    "medium": {"projects": 20, "posts": 250, "subscribers": 100, "users": 50},
+    "large": {"projects": 50, "posts": 1000, "subscribers": 500, "users": 200},
+}
+
+
+@dataclass
+class Dataset:
+    project_slugs: list[str] = field(default_factory=list)
+    api_keys: list[str] = field(default_factory=list)
+    user_emails: list[str] = field(default_factory=list)
+    subscribers_per_project: int = 0
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 16))
+    return " ".join(words).capitalize() + "."
+
+
+def markdown_body(rng: random.Random) -> str:
+    """A post whose size follows a log-normal distribution (median about 1 KB)."""
+    target = min(50_000, max(120, int(rng.lognormvariate(7.0, 0.8))))
+    parts = []
+    size = 0
+    while size < target:
+        kind = rng.random()
+        if kind < 0.45:
+            chunk = " ".join(_sentence(rng) for _ in range(rng.randint(1, 4)))
+        elif kind < 0.75:
+            chunk = "\n".join(
+                f"- **{rng.choice(WORDS)}**: {_sentence(rng)}" for _ in range(rng.randint(2, 6))
+            )
+        elif kind < 0.85:
+            chunk = f"### {rng.choice(WORDS).capitalize()}"
+        elif kind < 0.95:
+            chunk = f"```\n{rng.choice(WORDS)} --{rng.choice(WORDS)}={rng.randint(1, 99)}\n```"
+        else:
+            chunk = (
+                f"See the [docs](https://example.com/{rng.choice(WORDS)}) "
+                f"for `{rng.choice(WORDS)}`."
+            )
+        parts.append(chunk)
+        size += len(chunk) + 2
+    return "\n\n".join(parts)
+
+
+async def generate(session_factory, seed: int, scale: dict) -> Dataset:
+    rng = random.Random(seed)
+    dataset = Dataset(subscribers_per_project=scale["subscribers"])
+    # One bcrypt hash for every user keeps seeding fast
+    hashed = hash_password(PASSWORD)
+    start = datetime(2020, 1, 1, tzinfo=UTC)
+    async with session_factory() as db:
+        users = []
+        for u in range(scale["users"]):
+            user = User(email=f"user{u}@bench.test", username=f"user{u}", hashed_password=hashed)
+            db.add(user)
+            users.append(user)
+            dataset.user_emails.append(user.email)
+        await db.flush()
+
+        for p in range(scale["projects"]):
+            project = Project(
+                name=f"Product {p}", slug=f"product-{p}", owner_id=users[p % len(users)].id
+            )
+            db.add(project)
+            await db.flush()
+            dataset.project_slugs.append(project.slug)
+            for i in range(scale["posts"]):
+                body = markdown_body(rng)
+                published = rng.random() < 0.9
+                db.add(Post(
+                    title=f"{_sentence(rng)[:80]} ({i})",
+                    slug=f"post-{i}",
+                    body_markdown=body,
+                    body_html=renderer.render(body),
+                    category=rng.choice(CATEGORY_KEYS),
+                    is_published=published,
+                    published_at=start + timedelta(hours=i * 7) if published else None,
+                    view_count=rng.randint(0, 5000),
+                    project_id=project.id,
+                ))
+            for s in range(scale["subscribers"]):
+                db.add(Subscriber(email=f"sub{s}@p{p}.bench.test", project_id=project.id))
+            _, raw_key = await create_api_key(db, project.id, "benchmark")
+            dataset.api_keys.append(raw_key)
+            await db.flush()
+            db.expunge_all()
+        await db.commit()
+    return dataset
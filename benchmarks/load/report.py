@@ -0,0 +1,52 @@
+"""Latency summaries and run-to-run comparison."""
+
+import math
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": _ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "p50_ms": _ms(percentile(ordered, 50)),
+        "p95_ms": _ms(percentile(ordered, 95)),
+        "p99_ms": _ms(percentile(ordered, 99)),
+        "max_ms": _ms(ordered[-1]) if ordered else 0.0,
+    }
+
+
+def compare(base: dict, new: dict, threshold_pct: float) -> tuple[list[dict], list[str]]:
+    """Rows of before/after numbers per scenario, and the scenarios that regressed.
+
+    A scenario regresses when its p95 latency rises, or its throughput falls,
+    by more than ``threshold_pct`` percent.
+    """
+    rows = []
+    regressions = []
+    for name, after in new["scenarios"].items():
+        before = base["scenarios"].get(name)
+        if before is None:
+            continue
+        row = {"scenario": name}
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            old, current = before[metric], after[metric]
+            change = (current - old) / old * 100 if old else 0.0
+            row[metric] = (old, current, round(change, 1))
+        rows.append(row)
+        if row["p95_ms"][2] > threshold_pct or row["throughput_rps"][2] < -threshold_pct:
+            regressions.append(name)
+    return rows, regressions
@@ -0,0 +1,136 @@
+"""Seed a database, run the scenarios against the app in-process, collect results."""
+
+import asyncio
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database import Base, get_db
+from app.main import app
+from benchmarks.load.data import SCALES, generate
+from benchmarks.load.report import summarize
+from benchmarks.load.scenarios import SCENARIOS, Context, Scenario
+from benchmarks.load.smtp_sink import SMTPSink
+
+WARMUP_REQUESTS = 10
+SMTP_SETTINGS = ("smtp_host", "smtp_port", "smtp_use_tls", "smtp_user", "smtp_password")
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+async def run_scenario(
+    ctx: Context, scenario: Scenario, requests: int, concurrency: int
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            resp = await scenario.request(ctx)
+            latencies.append(time.perf_counter() - start)
+            if resp.status_code != scenario.expected_status:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run(
+    seed: int,
+    scale: str,
+    scenarios: list[str],
+    concurrency: int,
+    requests: int | None = None,
+    warmup: int = WARMUP_REQUESTS,
+) -> dict:
+    """Run ``scenarios`` against a fresh seeded database and return the report."""
+    saved_smtp = {name: getattr(settings, name) for name in SMTP_SETTINGS}
+    sink = SMTPSink()
+    await sink.start()
+    settings.smtp_host, settings.smtp_port = "127.0.0.1", sink.port
+    settings.smtp_use_tls, settings.smtp_user, settings.smtp_password = False, "", ""
+
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            session_factory = async_sessionmaker(
+                engine, class_=AsyncSession, expire_on_commit=False
+            )
+            seed_start = time.perf_counter()
+            dataset = await generate(session_factory, seed, SCALES[scale])
+            seed_seconds = time.perf_counter() - seed_start
+
+            async def override_get_db():
+                async with session_factory() as session:
+                    try:
+                        yield session
+                        await session.commit()
+                    except Exception:
+                        await session.rollback()
+                        raise
+
+            app.dependency_overrides[get_db] = override_get_db
+            try:
+                transport = ASGITransport(app=app)
+                async with AsyncClient(transport=transport, base_url="http://bench") as client:
+                    for name in scenarios:
+                        scenario = SCENARIOS[name]
+                        ctx = Context(client, dataset, random.Random(f"{seed}:{name}"), sink)
+                        await run_scenario(ctx, scenario, warmup, concurrency)
+                        emails_before = sink.messages
+                        result = await run_scenario(
+                            ctx, scenario, requests or scenario.default_requests, concurrency
+                        )
+                        if name == "publish_fanout":
+                            result["emails_delivered"] = sink.messages - emails_before
+                            result["emails_expected"] = (
+                                result["requests"] * dataset.subscribers_per_project
+                            )
+                        results[name] = result
+            finally:
+                app.dependency_overrides.clear()
+                await engine.dispose()
+    finally:
+        for name, value in saved_smtp.items():
+            setattr(settings, name, value)
+        await sink.stop()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(UTC).isoformat(timespec="seconds"),
+            "seed": seed,
+            "scale": scale,
+            "dataset": SCALES[scale],
+            "seed_seconds": round(seed_seconds, 2),
+            "concurrency": concurrency,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "scenarios": results,
+    }
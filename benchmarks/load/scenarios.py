@@ -0,0 +1,80 @@
+"""Scripted scenarios. Each one issues a single request chosen by a seeded RNG."""
+
+import random
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from httpx import AsyncClient, Response
+
+from benchmarks.load.data import PASSWORD, Dataset
+from benchmarks.load.smtp_sink import SMTPSink
+
+
+@dataclass
+class Context:
+    client: AsyncClient
+    dataset: Dataset
+    rng: random.Random
+    sink: SMTPSink
+    published: int = 0
+
+
+@dataclass
+class Scenario:
+    request: Callable[[Context], Awaitable[Response]]
+    expected_status: int
+    default_requests: int
+
+
+def _api_headers(ctx: Context) -> tuple[int, dict]:
+    project = ctx.rng.randrange(len(ctx.dataset.api_keys))
+    return project, {"Authorization": f"Bearer {ctx.dataset.api_keys[project]}"}
+
+
+async def public_changelog(ctx: Context) -> Response:
+    slug = ctx.rng.choice(ctx.dataset.project_slugs)
+    return await ctx.client.get(f"/changelog/{slug}")
+
+
+async def widget_polling(ctx: Context) -> Response:
+    slug = ctx.rng.choice(ctx.dataset.project_slugs)
+    endpoint = ctx.rng.choice(("posts", "latest"))
+    return await ctx.client.get(f"/api/widget/{slug}/{endpoint}")
+
+
+async def api_listing(ctx: Context) -> Response:
+    _, headers = _api_headers(ctx)
+    return await ctx.client.get("/api/v1/posts", params={"limit": 50}, headers=headers)
+
+
+async def publish_fanout(ctx: Context) -> Response:
+    # The in-process transport runs background tasks before returning, so this
+    # latency includes delivering the notification to every subscriber
+    _, headers = _api_headers(ctx)
+    ctx.published += 1
+    return await ctx.client.post(
+        "/api/v1/posts",
+        json={
+            "title": f"Benchmark release {ctx.published}",
+            "body_markdown": (
+                "We shipped **faster exports** and fixed `SSO` sign-in.\n\n- One\n- Two"
+            ),
+            "category": "improvement",
+            "is_published": True,
+        },
+        headers=headers,
+    )
+
+
+async def login_burst(ctx: Context) -> Response:
+    email = ctx.rng.choice(ctx.dataset.user_emails)
+    return await ctx.client.post("/login", data={"email": email, "password": PASSWORD})
+
+
+SCENARIOS = {
+    "public_changelog": Scenario(public_changelog, 200, 500),
+    "widget_polling": Scenario(widget_polling, 200, 1000),
+    "api_listing": Scenario(api_listing, 200, 500),
+    "publish_fanout": Scenario(publish_fanout, 201, 20),
+    "login_burst": Scenario(login_burst, 302, 50),
+}
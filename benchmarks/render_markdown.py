@@ -0,0 +1,110 @@
+"""Markdown render throughput for small, medium and 100 KB posts.
+
+Compares the shared ``MarkdownRenderer`` with building a fresh ``Markdown``
+and ``Cleaner`` per call (how posts used to be rendered). Run from the
+repository root:
+
+    PYTHONPATH=src python benchmarks/render_markdown.py
+    PYTHONPATH=src python benchmarks/render_markdown.py --json > render.json
+"""
+
+import argparse
+import json
+import re
+import time
+
+import bleach
+import markdown
+
+from app.services.markdown_renderer import (
+    ALLOWED_ATTRIBUTES,
+    ALLOWED_TAGS,
+    EXTENSIONS,
+    MarkdownRenderer,
+)
+
+PARAGRAPH = (
+    "We rewrote the **sync engine** so large workspaces load faster. "
+    "See the [migration guide](https://example.com/docs) and `config.yaml`.\n\n"
+)
+SECTION = (
+    "## Improvements\n\n"
+    + "".join(f"- Item {i} with *emphasis* and `code`\n" for i in range(8))
+    + "\n```python\nfor item in items:\n    process(item)\n```\n\n"
+    + "| Plan | Limit |\n|---|---|\n| Free | 3 |\n| Pro | 50 |\n\n"
+)
+
+
+def _document(target_bytes: int) -> str:
+    parts = ["# Release notes\n\n"]
+    size = len(parts[0])
+    while size < target_bytes:
+        chunk = PARAGRAPH if len(parts) % 3 else SECTION
+        parts.append(chunk)
+        size += len(chunk)
+    return "".join(parts)
+
+
+DOCUMENTS = {
+    "small": "Fixed a crash when **saving** drafts.",
+    "medium": _document(4 * 1024),
+    "large_100kb": _document(100 * 1024),
+}
+
+
+def _fresh_render(text: str) -> str:
+    html = markdown.markdown(text, extensions=list(EXTENSIONS))
+    html = re.sub(
+        r"<\s*(script|style|iframe|object|embed|form|input|textarea|button)[\s>].*?</\s*\1\s*>",
+        "", html, flags=re.DOTALL | re.IGNORECASE,
+    )
+    html = re.sub(
+        r"<\s*/?(script|style|iframe|object|embed|form|input|textarea|button)\b[^>]*>",
+        "", html, flags=re.IGNORECASE,
+    )
+    return bleach.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+
+
+def _measure(render, text: str, min_seconds: float) -> dict:
+    render(text)  # warm-up
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        render(text)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+    return {
+        "docs_per_sec": round(runs / elapsed, 1),
+        "mb_per_sec": round(runs * len(text.encode()) / elapsed / 1e6, 3),
+        "ms_per_doc": round(elapsed / runs * 1000, 3),
+    }
+
+
+def main(min_seconds: float, as_json: bool) -> None:
+    renderer = MarkdownRenderer()
+    results = {}
+    for name, text in DOCUMENTS.items():
+        results[name] = {
+            "bytes": len(text.encode()),
+            "renderer": _measure(renderer.render, text, min_seconds),
+            "fresh_per_call": _measure(_fresh_render, text, min_seconds),
+        }
+
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'document':<12} {'bytes':>8} {'renderer ms':>12} {'fresh ms':>10} {'speedup':>8}")
+    for name, result in results.items():
+        ours = result["renderer"]["ms_per_doc"]
+        fresh = result["fresh_per_call"]["ms_per_doc"]
+        print(f"{name:<12} {result['bytes']:>8} {ours:>12.3f} {fresh:>10.3f} {fresh / ours:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="minimum time per case")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+    main(args.seconds, args.json)
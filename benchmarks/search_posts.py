@@ -0,0 +1,121 @@
+"""Latency of ``search_posts`` against a large changelog.
+
+Seeds ``--posts`` posts (100k by default) spread over ``--projects``
+projects, builds the index the way ``init_db`` backfills an existing
+database, then times searches of the first project's published posts. One
+project is the worst case: every match belongs to the searched project.
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/search_posts.py --posts 100000 --projects 1
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import Post, Project, User
+from app.services import search
+
+# Common words appear in most posts; the feature words in a few percent
+FILLER = [
+    "the", "release", "improves", "performance", "fixes", "issues", "adds", "support", "for",
+    "users", "and", "teams",
+]
+FEATURES = ["sso", "export", "webhooks", "billing", "dark mode", "audit log", "saml", "csv"]
+
+QUERIES = {
+    "rare word": "saml",
+    "common word": "release",
+    "two words": "audit log",
+    "prefix": "webh*",
+    "stop words": "the release",
+    "no match": "kubernetes",
+}
+
+
+def _post(rng: random.Random, project_id: str, i: int) -> dict:
+    feature = rng.choice(FEATURES) if rng.random() < 0.3 else ""
+    words = [rng.choice(FILLER) for _ in range(rng.randint(40, 120))]
+    if feature:
+        words.insert(rng.randrange(len(words)), feature)
+    body = " ".join(words)
+    return {
+        "id": f"{i:08d}-0000-4000-8000-{rng.getrandbits(48):012x}",
+        "title": f"Release {i}" + (f": {feature}" if feature and rng.random() < 0.2 else ""),
+        "slug": f"release-{i}",
+        "body_markdown": body,
+        "body_html": f"<p>{body}</p>",
+        "category": "improvement",
+        "is_published": True,
+        "view_count": 0,
+        "project_id": project_id,
+    }
+
+
+async def _seed(engine, posts: int, projects: int) -> str:
+    rng = random.Random(50)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        user = User(email="bench@example.com", username="bench", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        project_list = [
+            Project(name=f"Bench {p}", slug=f"bench-{p}", owner_id=user.id) for p in range(projects)
+        ]
+        db.add_all(project_list)
+        await db.commit()
+        project_ids = [project.id for project in project_list]
+    async with engine.begin() as conn:
+        for start in range(0, posts, 5000):
+            rows = [
+                _post(rng, project_ids[i % projects], i)
+                for i in range(start, min(start + 5000, posts))
+            ]
+            await conn.execute(insert(Post.__table__), rows)
+    return project_ids[0]
+
+
+async def main(posts: int, projects: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(search.drop_search_index)
+        project_id = await _seed(engine, posts, projects)
+
+        start = time.perf_counter()
+        async with engine.begin() as conn:
+            await conn.run_sync(search.create_search_index)
+        print(f"indexed {posts} posts in {time.perf_counter() - start:.1f}s\n")
+
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        print(f"{'query':<12} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8}")
+        async with session_factory() as db:
+            for label, query in QUERIES.items():
+                timings = []
+                for _ in range(repeat):
+                    begin = time.perf_counter()
+                    results = await search.search_posts(db, project_id, query, published_only=True)
+                    timings.append((time.perf_counter() - begin) * 1000)
+                timings.sort()
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                median = statistics.median(timings)
+                print(f"{label:<12} {len(results):>5} {median:>8.2f} {p95:>8.2f}")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--projects", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.posts, args.projects, args.repeat))
@@ -0,0 +1,100 @@
+"""Requests per second for GET /api/widget/{slug}/posts with and without the snapshot cache.
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/widget_cache.py --requests 2000
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database import Base, get_db
+from app.main import app
+from app.models import Post, Project, User
+from app.services import widget_cache
+
+
+async def _seed(session_factory, projects: int, posts_per_project: int) -> list[str]:
+    slugs = []
+    async with session_factory() as db:
+        user = User(email="bench@example.com", username="bench", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        for p in range(projects):
+            project = Project(name=f"Bench {p}", slug=f"bench-{p}", owner_id=user.id)
+            db.add(project)
+            await db.flush()
+            for i in range(posts_per_project):
+                db.add(Post(
+                    title=f"Release {i}",
+                    slug=f"release-{i}",
+                    body_markdown="Lots of **improvements** in this release. " * 20,
+                    body_html="<p>Lots of improvements in this release.</p>",
+                    category="improvement",
+                    is_published=True,
+                    published_at=datetime.now(UTC),
+                    project_id=project.id,
+                ))
+            slugs.append(project.slug)
+        await db.commit()
+    return slugs
+
+
+async def _run(client: AsyncClient, slugs: list[str], requests: int, concurrency: int) -> float:
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            resp = await client.get(f"/api/widget/{slugs[i % len(slugs)]}/posts")
+            resp.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, concurrency: int, projects: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        slugs = await _seed(session_factory, projects, 20)
+
+        async def override_get_db():
+            async with session_factory() as session:
+                yield session
+                await session.commit()
+
+        app.dependency_overrides[get_db] = override_get_db
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = {}
+            for label, enabled in (("uncached", False), ("cached", True)):
+                settings.widget_cache_enabled = enabled
+                widget_cache.clear()
+                await _run(client, slugs, min(requests, 200), concurrency)  # warm-up
+                results[label] = await _run(client, slugs, requests, concurrency)
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    for label, rps in results.items():
+        print(f"{label:>9}: {rps:8.0f} req/s")
+    print(f"  speedup: {results['cached'] / results['uncached']:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--projects", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.projects))
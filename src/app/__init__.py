@@ -0,0 +1,4 @@
+import time
+
+# Start of the app's own import, for the startup profile in app.main
+IMPORT_STARTED = time.perf_counter()
@@ -0,0 +1,118 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app import profiler, slow_queries
+from app.api.deps import get_admin_user, session_factory_for
+from app.config import settings
+from app.models.user import User
+from app.services.auth import password_hash_stats
+from app.startup import startup_profile
+from app.templating import templates
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(get_admin_user)])
+
+# The re-render and maintenance services are imported by the handlers that
+# use them, so workers that never serve an admin request don't load them.
+
+
+@router.post("/jobs/rerender-posts")
+async def start_rerender(request: Request, restart: bool = False):
+    """Re-render every post's HTML in the background; poll the GET endpoint for progress."""
+    from app.services.rerender import rerender_job_status, start_rerender_job
+
+    if not start_rerender_job(session_factory_for(request), restart=restart):
+        raise HTTPException(status_code=409, detail="A re-render is already running")
+    return JSONResponse(status_code=202, content=rerender_job_status())
+
+
+@router.get("/jobs/rerender-posts")
+async def rerender_status():
+    from app.services.rerender import rerender_job_status
+
+    status = rerender_job_status()
+    if status is None:
+        raise HTTPException(status_code=404, detail="No re-render has run in this process")
+    return JSONResponse(content=status)
+
+
+def _get_profile(profile_id: str) -> profiler.Profile:
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """Profiles captured with ?_profile=1 in this process, newest first."""
+    return JSONResponse(content=profiler.list_profiles())
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    return JSONResponse(content=_get_profile(profile_id).details())
+
+
+@router.get("/profiles/{profile_id}/speedscope.json")
+async def get_profile_speedscope(profile_id: str):
+    """Open in https://www.speedscope.app/ to browse as a flame graph."""
+    profile = _get_profile(profile_id)
+    return JSONResponse(
+        content=profile.speedscope(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.speedscope.json"'},
+    )
+
+
+@router.get("/profiles/{profile_id}/collapsed.txt")
+async def get_profile_collapsed(profile_id: str):
+    return PlainTextResponse(_get_profile(profile_id).collapsed())
+
+
+@router.get("/maintenance")
+async def maintenance_status(request: Request):
+    """Last run and result of each database maintenance job."""
+    from app.services import maintenance
+
+    return JSONResponse(content=await maintenance.job_status(session_factory_for(request)))
+
+
+@router.post("/maintenance/{job_name}")
+async def run_maintenance_job(job_name: str, request: Request):
+    """Run one maintenance job now, within its usual time budget."""
+    from app.services import maintenance
+
+    job = next((job for job in maintenance.JOBS if job.name == job_name), None)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown maintenance job")
+    session_factory = session_factory_for(request)
+    # The engine behind get_db, so dependency overrides are honoured
+    async with session_factory() as db:
+        bind = db.bind
+    return JSONResponse(content=await maintenance.run_job(bind, session_factory, job))
+
+
+@router.get("/slow-queries")
+async def slow_queries_page(request: Request, user: User = Depends(get_admin_user)):
+    return templates.TemplateResponse(
+        request,
+        "pages/admin/slow_queries.html",
+        {
+            "user": user,
+            "entries": slow_queries.recent(),
+            "threshold_ms": settings.slow_query_ms,
+        },
+    )
+
+
+@router.get("/slow-queries.json")
+async def slow_queries_json():
+    return JSONResponse(content=slow_queries.recent())
+
+
+@router.get("/runtime")
+async def runtime_stats():
+    """Password hash pool load and this worker's startup timings."""
+    return JSONResponse(content={
+        "password_hashing": password_hash_stats.snapshot(),
+        "startup": startup_profile.snapshot(),
+    })
@@ -1,20 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
 from app.database import get_db
-from app.models.post import Post
-from app.models.subscriber import Subscriber
 from app.models.user import User
 from app.services.post import CATEGORIES, get_posts_for_project
 from app.services.project import get_project_by_id
 from app.services.subscriber import get_subscriber_count_for_project
+from app.templating import templates
 
 router = APIRouter(tags=["analytics"])
-templates = Jinja2Templates(directory="src/app/templates")
 
 
 @router.get("/projects/{project_id}/analytics", response_class=HTMLResponse)
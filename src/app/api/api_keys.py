@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
@@ -12,9 +11,9 @@ from app.services.api_key import (
     get_api_keys_for_project,
 )
 from app.services.project import get_project_by_id
+from app.templating import templates
 
 router = APIRouter(tags=["api_keys"])
-templates = Jinja2Templates(directory="src/app/templates")
 
 
 @router.get("/projects/{project_id}/api-keys", response_class=HTMLResponse)
@@ -86,7 +85,7 @@ async def create_api_key_handler(
             status_code=422,
         )
 
-    api_key, raw_key = await create_api_key(db, project_id, name)
+    _, raw_key = await create_api_key(db, project_id, name)
     api_keys = await get_api_keys_for_project(db, project_id)
 
     return templates.TemplateResponse(
@@ -1,21 +1,24 @@
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_optional_user
 from app.database import get_db
 from app.models.user import User
 from app.services.auth import (
+    PasswordHasherBusy,
     authenticate_user,
     create_access_token,
     create_user,
     get_user_by_email,
     get_user_by_username,
 )
+from app.templating import templates
 
 router = APIRouter(tags=["auth"])
-templates = Jinja2Templates(directory="src/app/templates")
+
+BUSY_MESSAGE = "We're handling a lot of sign-ins right now. Please try again in a few seconds."
+BUSY_RETRY_AFTER_SECONDS = "5"
 
 
 @router.get("/register", response_class=HTMLResponse)
@@ -65,7 +68,21 @@ async def register(
             status_code=422,
         )
 
-    user = await create_user(db, email, username, password, display_name)
+    try:
+        user = await create_user(db, email, username, password, display_name)
+    except PasswordHasherBusy:
+        return templates.TemplateResponse(
+            request,
+            "pages/register.html",
+            {
+                "errors": [BUSY_MESSAGE],
+                "email": email,
+                "username": username,
+                "display_name": display_name or "",
+            },
+            status_code=503,
+            headers={"Retry-After": BUSY_RETRY_AFTER_SECONDS},
+        )
     token = create_access_token(user.id)
     response = RedirectResponse(url="/dashboard", status_code=302)
     response.set_cookie(
@@ -108,7 +125,16 @@ async def login(
             status_code=422,
         )
 
-    user = await authenticate_user(db, email, password)
+    try:
+        user = await authenticate_user(db, email, password)
+    except PasswordHasherBusy:
+        return templates.TemplateResponse(
+            request,
+            "pages/login.html",
+            {"errors": [BUSY_MESSAGE], "email": email},
+            status_code=503,
+            headers={"Retry-After": BUSY_RETRY_AFTER_SECONDS},
+        )
     if not user:
         return templates.TemplateResponse(
             request,
@@ -1,19 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.services.post import (
     CATEGORIES,
-    get_published_posts_for_project,
     get_post_by_slug,
+    get_published_posts_for_project,
     increment_view_count,
 )
 from app.services.project import get_project_by_slug
+from app.services.search import search_posts
+from app.templating import templates
 
 router = APIRouter(prefix="/changelog", tags=["changelog"])
-templates = Jinja2Templates(directory="src/app/templates")
+
+SEARCH_RESULTS = 50
 
 
 @router.get("/{project_slug}", response_class=HTMLResponse)
@@ -21,13 +23,28 @@ async def public_changelog(
     project_slug: str,
     request: Request,
     category: str | None = None,
+    q: str | None = None,
     db: AsyncSession = Depends(get_db),
 ):
     project = await get_project_by_slug(db, project_slug)
     if not project:
         raise HTTPException(status_code=404, detail="Changelog not found")
 
-    posts = await get_published_posts_for_project(db, project.id, category=category)
+    q = (q or "").strip()
+    matches = {}
+    if q:
+        results = await search_posts(
+            db,
+            project.id,
+            q,
+            published_only=True,
+            category=category if category in CATEGORIES else None,
+            limit=SEARCH_RESULTS,
+        )
+        posts = [post for post, _, _ in results]
+        matches = {post.id: (title, snippet) for post, title, snippet in results}
+    else:
+        posts = await get_published_posts_for_project(db, project.id, category=category)
 
     return templates.TemplateResponse(
         request, "pages/changelog/public.html",
@@ -36,6 +53,8 @@ async def public_changelog(
             "posts": posts,
             "categories": CATEGORIES,
             "active_category": category,
+            "q": q,
+            "matches": matches,
         },
     )
 
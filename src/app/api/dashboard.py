@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, func
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
@@ -10,9 +9,9 @@ from app.models.post import Post
 from app.models.user import User
 from app.services.project import get_projects_for_user
 from app.services.subscriber import get_total_subscribers_for_user
+from app.templating import templates
 
 router = APIRouter(tags=["dashboard"])
-templates = Jinja2Templates(directory="src/app/templates")
 
 
 @router.get("/dashboard", response_class=HTMLResponse)
@@ -1,9 +1,12 @@
+from contextlib import aclosing, asynccontextmanager
+
 from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import get_db
 from app.models.user import User
-from app.services.auth import decode_access_token, get_user_by_id
+from app.services.auth import decode_access_token, get_cached_user
 
 
 async def get_current_user(
@@ -22,7 +25,7 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
-    user = await get_user_by_id(db, user_id)
+    user = await get_cached_user(db, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -41,4 +44,27 @@ async def get_optional_user(
     user_id = decode_access_token(token)
     if user_id is None:
         return None
-    return await get_user_by_id(db, user_id)
+    return await get_cached_user(db, user_id)
+
+
+def is_admin(user: User) -> bool:
+    admins = {email.strip().lower() for email in settings.admin_emails.split(",") if email.strip()}
+    return user.email.lower() in admins
+
+
+async def get_admin_user(user: User = Depends(get_current_user)) -> User:
+    if not is_admin(user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admins only")
+    return user
+
+
+def session_factory_for(request: Request):
+    """Session factory for work outliving the request, honouring ``get_db`` overrides."""
+    provider = request.app.dependency_overrides.get(get_db, get_db)
+
+    @asynccontextmanager
+    async def factory():
+        async with aclosing(provider()) as sessions:
+            yield await anext(sessions)
+
+    return factory
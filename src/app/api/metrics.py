@@ -0,0 +1,34 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app import metrics
+from app.api.deps import get_optional_user, is_admin
+from app.config import settings
+from app.models.user import User
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _valid_token(authorization: str | None) -> bool:
+    if not settings.metrics_token or not authorization:
+        return False
+    return secrets.compare_digest(authorization, f"Bearer {settings.metrics_token}")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(
+    authorization: str | None = Header(None),
+    user: User | None = Depends(get_optional_user),
+):
+    """Scrapers authenticate with ``METRICS_TOKEN``; admins can also read it signed in.
+
+    Without a token configured only admins get through: route names, traffic
+    and queue depths aren't for the public.
+    """
+    if not _valid_token(authorization) and not (user is not None and is_admin(user)):
+        raise HTTPException(status_code=403, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.exposition(), media_type=PROMETHEUS_CONTENT_TYPE)
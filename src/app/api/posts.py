@@ -1,27 +1,35 @@
+import asyncio
+
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
 from app.database import get_db
 from app.models.user import User
 from app.services.email import send_post_notification
+from app.services.markdown_renderer import render_preview
 from app.services.post import (
     CATEGORIES,
     create_post,
     delete_post,
     get_post_by_id,
-    get_posts_for_project,
     get_post_counts_for_project,
+    get_posts_for_project,
+    parse_schedule_time,
+    schedule_post,
     toggle_publish,
+    unschedule_post,
     update_post,
 )
 from app.services.project import get_project_by_id
+from app.services.search import search_posts
 from app.services.subscriber import get_subscribers_for_project
+from app.templating import templates
 
 router = APIRouter(prefix="/projects/{project_id}/posts", tags=["posts"])
-templates = Jinja2Templates(directory="src/app/templates")
+
+SEARCH_RESULTS = 50
 
 
 async def _get_user_project(project_id: str, user: User, db: AsyncSession):
@@ -35,11 +43,19 @@ async def _get_user_project(project_id: str, user: User, db: AsyncSession):
 async def list_posts(
     project_id: str,
     request: Request,
+    q: str | None = None,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     project = await _get_user_project(project_id, user, db)
-    posts = await get_posts_for_project(db, project_id)
+    q = (q or "").strip()
+    matches = {}
+    if q:
+        results = await search_posts(db, project_id, q, limit=SEARCH_RESULTS)
+        posts = [post for post, _, _ in results]
+        matches = {post.id: (title, snippet) for post, title, snippet in results}
+    else:
+        posts = await get_posts_for_project(db, project_id)
     counts = await get_post_counts_for_project(db, project_id)
     return templates.TemplateResponse(
         request, "pages/posts/list.html",
@@ -49,6 +65,8 @@ async def list_posts(
             "posts": posts,
             "counts": counts,
             "categories": CATEGORIES,
+            "q": q,
+            "matches": matches,
         },
     )
 
@@ -139,6 +157,24 @@ async def create_post_handler(
     )
 
 
+@router.post("/preview", response_class=HTMLResponse)
+async def preview_post(
+    project_id: str,
+    request: Request,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """HTMX fragment for the editor preview, rendered and sanitized like a saved post."""
+    await _get_user_project(project_id, user, db)
+    form = await request.form()
+    body_markdown = form.get("body_markdown", "")
+    if not body_markdown.strip():
+        return HTMLResponse('<p class="text-gray-400 italic">Nothing to preview yet...</p>')
+    loop = asyncio.get_running_loop()
+    html = await loop.run_in_executor(None, render_preview, body_markdown)
+    return HTMLResponse(html)
+
+
 @router.get("/{post_id}", response_class=HTMLResponse)
 async def post_detail(
     project_id: str,
@@ -268,6 +304,48 @@ async def toggle_publish_handler(
     )
 
 
+@router.post("/{post_id}/schedule")
+async def schedule_post_handler(
+    project_id: str,
+    post_id: str,
+    request: Request,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Publish the post at ``scheduled_at`` (UTC, from a datetime-local input)."""
+    await _get_user_project(project_id, user, db)
+    post = await get_post_by_id(db, post_id)
+    if not post or post.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Post not found")
+    form = await request.form()
+    try:
+        await schedule_post(db, post, parse_schedule_time(form.get("scheduled_at", "")))
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return RedirectResponse(
+        url=f"/projects/{project_id}/posts/{post.id}",
+        status_code=302,
+    )
+
+
+@router.post("/{post_id}/unschedule")
+async def unschedule_post_handler(
+    project_id: str,
+    post_id: str,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    await _get_user_project(project_id, user, db)
+    post = await get_post_by_id(db, post_id)
+    if not post or post.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Post not found")
+    await unschedule_post(db, post)
+    return RedirectResponse(
+        url=f"/projects/{project_id}/posts/{post.id}",
+        status_code=302,
+    )
+
+
 @router.post("/{post_id}/delete")
 async def delete_post_handler(
     project_id: str,
@@ -1,18 +1,31 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Request
+import json
+from datetime import datetime
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.services.api_key import verify_api_key
-from app.services.email import send_post_notification
+from app.services.changelog_import import (
+    BodyTooLarge,
+    import_changelog,
+    iter_file_chunks,
+    spool_body,
+)
+from app.services.idempotency import get_stored_response, request_fingerprint, store_response
+from app.services.notifications import queue_post_notifications
 from app.services.post import (
     CATEGORIES,
+    InvalidCursor,
+    count_posts,
     create_post,
-    get_posts_for_project,
+    create_posts,
     get_post_by_id,
+    get_posts_page,
+    parse_schedule_time,
 )
-from app.services.project import get_project_by_id
-from app.services.subscriber import get_subscribers_for_project
+from app.services.search import search_posts
 
 router = APIRouter(prefix="/api/v1", tags=["programmatic_api"])
 
@@ -45,51 +58,160 @@ async def get_api_key_project(
     return api_key
 
 
+POST_FIELDS = (
+    "id",
+    "title",
+    "slug",
+    "body_markdown",
+    "body_html",
+    "category",
+    "category_label",
+    "is_published",
+    "published_at",
+    "scheduled_at",
+    "view_count",
+    "created_at",
+    "updated_at",
+)
+DEFAULT_LIST_FIELDS = tuple(f for f in POST_FIELDS if f not in ("body_markdown", "body_html"))
+MAX_PAGE_SIZE = 200
+MAX_SEARCH_RESULTS = 50
+
+
+def _parse_fields(fields: str | None) -> tuple[str, ...]:
+    if fields is None:
+        return DEFAULT_LIST_FIELDS
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in POST_FIELDS]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=422,
+            detail={"errors": [f"fields must be a comma-separated subset of: {', '.join(POST_FIELDS)}"]},
+        )
+    return requested
+
+
+def _serialize_post(post, fields: tuple[str, ...]) -> dict:
+    data = {}
+    for field in fields:
+        if field == "category_label":
+            data[field] = CATEGORIES.get(post.category, {}).get("label", post.category)
+            continue
+        value = getattr(post, field)
+        data[field] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+def _check_category(category: str | None) -> None:
+    if category is not None and category not in CATEGORIES:
+        raise HTTPException(
+            status_code=422,
+            detail={"errors": [f"category must be one of: {', '.join(CATEGORIES.keys())}"]},
+        )
+
+
 @router.get("/posts")
 async def api_list_posts(
     api_key=Depends(get_api_key_project),
     published: bool | None = None,
+    category: str | None = None,
+    updated_since: datetime | None = None,
+    fields: str | None = None,
+    limit: int = 50,
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """List posts for the project associated with the API key.
+
+    Cursor-paginated, newest first. Bodies are omitted unless requested with
+    ``fields``. ``total`` is only included on the first page; use
+    ``/posts/count`` when only the number is needed.
+    """
+    selected = _parse_fields(fields)
+    _check_category(category)
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    columns = {"category" if f == "category_label" else f for f in selected} | {"id"}
+
+    try:
+        posts, next_cursor = await get_posts_page(
+            db,
+            api_key.project_id,
+            limit=limit,
+            cursor=cursor,
+            published=published,
+            category=category,
+            updated_since=updated_since,
+            columns=sorted(columns),
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+    content = {
+        "posts": [_serialize_post(post, selected) for post in posts],
+        "next_cursor": next_cursor,
+    }
+    if cursor is None:
+        if next_cursor is None:
+            content["total"] = len(posts)
+        else:
+            content["total"] = await count_posts(
+                db, api_key.project_id,
+                published=published, category=category, updated_since=updated_since,
+            )
+    return JSONResponse(content=content)
+
+
+@router.get("/posts/count")
+async def api_count_posts(
+    api_key=Depends(get_api_key_project),
+    published: bool | None = None,
+    category: str | None = None,
+    updated_since: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Number of posts matching the same filters as the list endpoint."""
+    _check_category(category)
+    total = await count_posts(
+        db, api_key.project_id,
+        published=published, category=category, updated_since=updated_since,
+    )
+    return JSONResponse(content={"total": total})
+
+
+@router.get("/posts/search")
+async def api_search_posts(
+    q: str,
+    api_key=Depends(get_api_key_project),
+    published: bool = False,
+    fields: str | None = None,
+    limit: int = 20,
     db: AsyncSession = Depends(get_db),
 ):
-    """List posts for the project associated with the API key."""
-    published_only = published if published is not None else False
-    posts = await get_posts_for_project(db, api_key.project_id, published_only=published_only)
+    """Full-text search over titles and bodies, best match first.
 
+    Every word must appear; end a word with ``*`` to match it as a prefix.
+    ``published=true`` searches published posts only. Each result carries
+    ``highlighted_title`` and ``snippet``, HTML with the matched words in
+    ``<mark>``.
+    """
+    selected = _parse_fields(fields)
+    limit = min(max(limit, 1), MAX_SEARCH_RESULTS)
+    results = await search_posts(db, api_key.project_id, q, published_only=published, limit=limit)
     return JSONResponse(content={
         "posts": [
-            {
-                "id": post.id,
-                "title": post.title,
-                "slug": post.slug,
-                "body_markdown": post.body_markdown,
-                "category": post.category,
-                "category_label": CATEGORIES.get(post.category, {}).get("label", post.category),
-                "is_published": post.is_published,
-                "published_at": post.published_at.isoformat() if post.published_at else None,
-                "view_count": post.view_count,
-                "created_at": post.created_at.isoformat(),
-            }
-            for post in posts
+            {**_serialize_post(post, selected), "highlighted_title": title, "snippet": snippet}
+            for post, title, snippet in results
         ],
-        "total": len(posts),
     })
 
 
-@router.post("/posts")
-async def api_create_post(
-    request: Request,
-    background_tasks: BackgroundTasks,
-    api_key=Depends(get_api_key_project),
-    db: AsyncSession = Depends(get_db),
-):
-    """Create a new changelog post via API."""
-    try:
-        body = await request.json()
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid JSON body")
+MAX_BATCH_POSTS = 500
+
 
+def _parse_post_input(body) -> tuple[dict, list[str]]:
+    """Validate one post object from a request body. Returns (fields, errors)."""
     if not isinstance(body, dict):
-        raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+        return {}, ["must be a JSON object"]
 
     title = str(body.get("title", "")).strip()
     body_markdown = str(body.get("body_markdown", "")).strip()
@@ -105,51 +227,218 @@ async def api_create_post(
         errors.append("body_markdown is required")
     if category not in CATEGORIES:
         errors.append(f"category must be one of: {', '.join(CATEGORIES.keys())}")
+    scheduled_at = None
+    if body.get("scheduled_at") is not None:
+        if is_published:
+            errors.append("scheduled_at cannot be combined with is_published")
+        else:
+            try:
+                scheduled_at = parse_schedule_time(str(body["scheduled_at"]))
+            except ValueError:
+                errors.append("scheduled_at must be an ISO 8601 time in the future")
+
+    fields = {
+        "title": title,
+        "body_markdown": body_markdown,
+        "category": category,
+        "is_published": is_published,
+        "scheduled_at": scheduled_at,
+    }
+    return fields, errors
+
+
+async def _read_json(request: Request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body") from None
+
+
+def _created_post(post) -> dict:
+    return {
+        "id": post.id,
+        "title": post.title,
+        "slug": post.slug,
+        "body_markdown": post.body_markdown,
+        "category": post.category,
+        "is_published": post.is_published,
+        "published_at": post.published_at.isoformat() if post.published_at else None,
+        "scheduled_at": post.scheduled_at.isoformat() if post.scheduled_at else None,
+        "created_at": post.created_at.isoformat(),
+    }
+
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+async def _replay_or_fingerprint(
+    request: Request, db: AsyncSession, project_id: str, idempotency_key: str | None, body
+) -> tuple[JSONResponse | None, str | None]:
+    """Handle the ``Idempotency-Key`` header before a create.
+
+    Returns the stored response to replay, or the fingerprint under which the
+    new response should be recorded (None when no key was sent).
+    """
+    if idempotency_key is None:
+        return None, None
+    if not idempotency_key.strip() or len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key must be 1-{MAX_IDEMPOTENCY_KEY_LENGTH} characters",
+        )
+    fingerprint = request_fingerprint(request.method, request.url.path, body)
+    stored = await get_stored_response(db, project_id, idempotency_key)
+    if stored is None:
+        return None, fingerprint
+    if stored.fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail={"errors": ["Idempotency-Key was already used with a different request"]},
+        )
+    return JSONResponse(
+        status_code=stored.status_code,
+        content=json.loads(stored.body),
+        headers={"Idempotent-Replayed": "true"},
+    ), None
+
+
+async def _record_response(
+    db: AsyncSession,
+    project_id: str,
+    idempotency_key: str | None,
+    fingerprint: str | None,
+    status_code: int,
+    content: dict,
+) -> None:
+    if fingerprint is None:
+        return
+    stored = await store_response(
+        db, project_id, idempotency_key, fingerprint, status_code, json.dumps(content)
+    )
+    if not stored:
+        # A concurrent request with the same key won; raising rolls this one back
+        raise HTTPException(
+            status_code=409, detail="A request with this Idempotency-Key is already in progress"
+        )
+
+
+@router.post("/posts")
+async def api_create_post(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    api_key=Depends(get_api_key_project),
+    idempotency_key: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create a new changelog post via API.
+
+    Send an ``Idempotency-Key`` header to make retries safe: a repeat of the
+    same request within the replay window returns the original response.
+    """
+    body = await _read_json(request)
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+
+    replay, fingerprint = await _replay_or_fingerprint(
+        request, db, api_key.project_id, idempotency_key, body
+    )
+    if replay is not None:
+        return replay
+
+    fields, errors = _parse_post_input(body)
+    if errors:
+        raise HTTPException(status_code=422, detail={"errors": errors})
+
+    post = await create_post(db, project_id=api_key.project_id, **fields)
+    content = {"post": _created_post(post)}
+    await _record_response(db, api_key.project_id, idempotency_key, fingerprint, 201, content)
+
+    # Send email notifications if published
+    if post.is_published:
+        await queue_post_notifications(background_tasks.add_task, db, api_key.project_id, [post])
 
+    return JSONResponse(status_code=201, content=content)
+
+
+@router.post("/posts:batch")
+async def api_create_posts_batch(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    api_key=Depends(get_api_key_project),
+    idempotency_key: str | None = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create many posts in one transaction.
+
+    Every entry is validated before anything is written; published posts
+    trigger at most one combined notification. Honours ``Idempotency-Key``
+    like ``POST /posts``.
+    """
+    body = await _read_json(request)
+    entries = body.get("posts") if isinstance(body, dict) else None
+    if not isinstance(entries, list) or not entries:
+        raise HTTPException(
+            status_code=400, detail='Request body must be {"posts": [ ... ]} with at least one post'
+        )
+    if len(entries) > MAX_BATCH_POSTS:
+        raise HTTPException(
+            status_code=422, detail={"errors": [f"at most {MAX_BATCH_POSTS} posts per batch"]}
+        )
+
+    replay, fingerprint = await _replay_or_fingerprint(
+        request, db, api_key.project_id, idempotency_key, body
+    )
+    if replay is not None:
+        return replay
+
+    parsed = []
+    errors = []
+    for index, entry in enumerate(entries):
+        fields, entry_errors = _parse_post_input(entry)
+        errors.extend(f"posts[{index}]: {error}" for error in entry_errors)
+        parsed.append(fields)
     if errors:
         raise HTTPException(status_code=422, detail={"errors": errors})
 
-    post = await create_post(
+    posts = await create_posts(db, api_key.project_id, parsed)
+    content = {"posts": [_created_post(post) for post in posts], "count": len(posts)}
+    await _record_response(db, api_key.project_id, idempotency_key, fingerprint, 201, content)
+    await queue_post_notifications(
+        background_tasks.add_task,
         db,
-        project_id=api_key.project_id,
-        title=title,
-        body_markdown=body_markdown,
-        category=category,
-        is_published=is_published,
+        api_key.project_id,
+        [post for post in posts if post.is_published],
     )
 
-    # Send email notifications if published
-    if is_published:
-        subscribers = await get_subscribers_for_project(db, api_key.project_id)
-        if subscribers:
-            project = await get_project_by_id(db, api_key.project_id)
-            cat_label = CATEGORIES.get(category, {}).get("label", category)
-            background_tasks.add_task(
-                send_post_notification,
-                subscribers=subscribers,
-                project_name=project.name,
-                project_slug=project.slug,
-                post_title=post.title,
-                post_slug=post.slug,
-                post_body_html=post.body_html,
-                post_category_label=cat_label,
-                accent_color=project.accent_color,
-            )
+    return JSONResponse(status_code=201, content=content)
+
+
+MAX_IMPORT_BYTES = 32 * 1024 * 1024
+
 
+@router.post("/posts:import")
+async def api_import_changelog(
+    request: Request,
+    api_key=Depends(get_api_key_project),
+    db: AsyncSession = Depends(get_db),
+):
+    """Import a CHANGELOG.md sent as the raw request body.
+
+    The whole body is received before anything is written, and posts are
+    committed in batches, so a slow upload never holds the database's write
+    lock. Imported history does not notify subscribers.
+    """
+    try:
+        async with spool_body(request.stream(), MAX_IMPORT_BYTES) as spool:
+            result = await import_changelog(db, api_key.project_id, iter_file_chunks(spool))
+    except BodyTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Changelog must be at most {MAX_IMPORT_BYTES // (1024 * 1024)} MB",
+        ) from None
     return JSONResponse(
         status_code=201,
-        content={
-            "post": {
-                "id": post.id,
-                "title": post.title,
-                "slug": post.slug,
-                "body_markdown": post.body_markdown,
-                "category": post.category,
-                "is_published": post.is_published,
-                "published_at": post.published_at.isoformat() if post.published_at else None,
-                "created_at": post.created_at.isoformat(),
-            }
-        },
+        content={"imported": result.imported, "drafts": result.drafts, "skipped": result.skipped},
     )
 
 
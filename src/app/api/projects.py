@@ -2,13 +2,12 @@ import re
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
 from app.database import get_db
 from app.models.user import User
-from app.services.post import get_posts_for_project, get_post_counts_for_project, CATEGORIES
+from app.services.post import CATEGORIES, get_post_counts_for_project, get_posts_for_project
 from app.services.project import (
     create_project,
     delete_project,
@@ -17,6 +16,7 @@ from app.services.project import (
     update_project,
 )
 from app.services.subscriber import get_subscriber_count_for_project
+from app.templating import templates
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -26,7 +26,6 @@ HEX_COLOR_RE = re.compile(r"^#[0-9A-Fa-f]{6}$")
 def sanitize_hex_color(color: str, default: str = "#6366f1") -> str:
     """Validate hex color format to prevent CSS/JS injection."""
     return color if HEX_COLOR_RE.match(color) else default
-templates = Jinja2Templates(directory="src/app/templates")
 
 
 @router.get("", response_class=HTMLResponse)
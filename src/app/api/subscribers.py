@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
@@ -9,15 +8,14 @@ from app.models.user import User
 from app.services.project import get_project_by_id, get_project_by_slug
 from app.services.subscriber import (
     delete_subscriber,
-    get_subscriber_count_for_project,
     get_subscribers_for_project,
     is_valid_email,
     subscribe,
     unsubscribe_by_token,
 )
+from app.templating import templates
 
 router = APIRouter(tags=["subscribers"])
-templates = Jinja2Templates(directory="src/app/templates")
 
 
 # --- Dashboard subscriber management ---
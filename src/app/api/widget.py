@@ -1,61 +1,359 @@
+import asyncio
+import calendar
 import json
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import aclosing
 
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import get_db
-from app.services.post import CATEGORIES, get_published_posts_for_project
-from app.services.project import get_project_by_slug
+from app.models.post import Post
+from app.models.project import Project
+from app.services import events, widget_cache
+from app.services.post import CATEGORIES, get_latest_published_posts_for_projects
+from app.services.project import get_project_by_slug, get_projects_by_slugs
 
 router = APIRouter(prefix="/api/widget", tags=["widget"])
 
+MAX_BATCH_SLUGS = 100
+
 
 def _js_string_escape(s: str) -> str:
     """Escape a string for safe interpolation into a JS string literal."""
     return json.dumps(s)[1:-1]  # json.dumps adds quotes; strip them
 
 
+def _widget_payload(project: Project, posts: list[Post]) -> dict:
+    return {
+        "project": {
+            "name": project.name,
+            "slug": project.slug,
+            "accent_color": project.accent_color,
+        },
+        "posts": [
+            {
+                "title": post.title,
+                "slug": post.slug,
+                "category": post.category,
+                "category_label": CATEGORIES.get(post.category, {}).get("label", post.category),
+                "published_at": post.published_at.isoformat() if post.published_at else None,
+                "excerpt": (post.body_markdown[:150] + "...") if len(post.body_markdown) > 150 else post.body_markdown,
+                "url": f"/changelog/{project.slug}/{post.slug}",
+            }
+            for post in posts
+        ],
+    }
+
+
+# Lite widget runtime. Nothing but scheduling runs at load: the style, button
+# and unread check wait for an idle period (or the first interaction) and the
+# posts are only fetched when the panel is first opened. Every line must end
+# in a way that survives _minify_js joining lines without separators.
+_LITE_WIDGET_SOURCE = """
+(function(w, d) {
+  'use strict';
+  if (w.__changepost_loaded) return;
+  w.__changepost_loaded = 1;
+  var S = '__SLUG__', A = '__ACCENT__', B = '__BASE__';
+  var API = B + '/api/widget/' + S, KEY = 'cp_last_seen_' + S;
+  var btn, badge, panel, open = 0, started = 0;
+  function esc(s) {
+    return String(s || '').replace(/[&<>"']/g, function(c) { return '&#' + c.charCodeAt(0) + ';'; });
+  }
+  function get(path, cb, fresh) {
+    fetch(API + path, fresh ? {cache: 'no-store'} : {}).then(function(r) { return r.json(); }).then(cb, function() {});
+  }
+  // Live events skip the HTTP cache, which may hold a response from before the publish
+  function check(fresh) {
+    get('/latest', function(j) {
+      var t = 0, n = 0;
+      try { t = Date.parse(localStorage.getItem(KEY)) || 0; } catch (e) {}
+      (j.published || []).forEach(function(p) { if (p > t) n++; });
+      badge.textContent = n > 9 ? '9+' : n;
+      badge.style.display = n && !open ? 'block' : 'none';
+    }, fresh);
+  }
+  function list(fresh) {
+    get('/posts?limit=5', function(j) {
+      var h = '';
+      (j.posts || []).forEach(function(p) {
+        h += '<a href="' + esc(B + p.url) + '" target="_blank"><small>' + esc(p.category_label) + '</small>' + esc(p.title) + '</a>';
+      });
+      panel.innerHTML = h + '<a href="' + esc(B + '/changelog/' + S) + '" target="_blank">View all updates</a>';
+    }, fresh);
+  }
+  // A post was published or taken down: update the badge and any open list
+  function refresh() {
+    check(1);
+    if (panel) list(1);
+  }
+  function toggle() {
+    if (!panel) {
+      panel = d.createElement('div');
+      panel.id = 'cp-lite-panel';
+      panel.innerHTML = '<a>Loading...</a>';
+      d.body.appendChild(panel);
+      list();
+    }
+    open = !open;
+    panel.style.display = open ? 'block' : 'none';
+    if (open) {
+      badge.style.display = 'none';
+      try { localStorage.setItem(KEY, new Date().toISOString()); } catch (e) {}
+    }
+  }
+  function init() {
+    if (started) return;
+    started = 1;
+    var st = d.createElement('style');
+    st.textContent = '#cp-lite{position:fixed;bottom:24px;right:24px;width:48px;height:48px;border-radius:50%;border:0;background:' + A + ';color:#fff;cursor:pointer;box-shadow:0 4px 12px rgba(0,0,0,.15);z-index:99998;font:700 11px sans-serif}' +
+      '#cp-lite b{position:absolute;top:-4px;right:-4px;min-width:18px;height:18px;line-height:18px;border-radius:9px;background:#ef4444;display:none}' +
+      '#cp-lite-panel{position:fixed;bottom:84px;right:24px;width:340px;max-width:calc(100vw - 48px);max-height:60vh;overflow:auto;background:#fff;border-radius:12px;box-shadow:0 12px 40px rgba(0,0,0,.18);z-index:99999;font:13px/1.4 sans-serif;display:none}' +
+      '#cp-lite-panel a{display:block;padding:12px 16px;color:#111827;text-decoration:none;border-bottom:1px solid #f3f4f6}' +
+      '#cp-lite-panel small{display:block;color:' + A + ';font-weight:600}';
+    d.head.appendChild(st);
+    btn = d.createElement('button');
+    btn.id = 'cp-lite';
+    btn.setAttribute('aria-label', "What's New");
+    btn.innerHTML = '<svg width="22" height="22" fill="none" stroke="currentColor" stroke-width="2" viewBox="0 0 24 24"><path d="M15 17h5l-1.4-1.4A2 2 0 0118 14.2V11a6 6 0 00-4-5.7V5a2 2 0 10-4 0v.3C7.7 6.2 6 8.4 6 11v3.2c0 .5-.2 1-.6 1.4L4 17h5m6 0v1a3 3 0 11-6 0v-1m6 0H9"/></svg><b></b>';
+    badge = btn.lastChild;
+    btn.onclick = toggle;
+    d.body.appendChild(btn);
+    check();
+    if (w.EventSource) {
+      var es = new w.EventSource(API + '/events');
+      es.addEventListener('published', refresh);
+      es.addEventListener('unpublished', refresh);
+    }
+  }
+  function schedule() {
+    (w.requestIdleCallback || function(f) { setTimeout(f, 200); })(init, {timeout: 3000});
+    d.addEventListener('pointerdown', init, {once: true, passive: true});
+  }
+  if (d.readyState == 'loading') {
+    d.addEventListener('DOMContentLoaded', schedule);
+  } else {
+    schedule();
+  }
+})(window, document);
+"""
+
+# Budgets for the served (minified) lite runtime, enforced by the test suite
+LITE_WIDGET_MAX_BYTES = 4096
+LITE_WIDGET_MAX_GZIP_BYTES = 1800
+
+
+def _minify_js(source: str) -> str:
+    """Strip indentation, blank lines and whole-line comments."""
+    lines = (line.strip() for line in source.splitlines())
+    return "".join(line for line in lines if line and not line.startswith("//"))
+
+
+_LITE_WIDGET_JS = _minify_js(_LITE_WIDGET_SOURCE)
+
+
+def _encode_json(content: dict) -> bytes:
+    """Same encoding as ``JSONResponse.render``."""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _json_headers() -> dict[str, str]:
+    return {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET",
+        "Access-Control-Allow-Headers": "Content-Type",
+        "Cache-Control": (
+            f"public, max-age={settings.widget_cache_ttl_seconds}, "
+            f"stale-while-revalidate={settings.widget_cache_stale_seconds}"
+        ),
+    }
+
+
+def _db_provider(request: Request) -> Callable[[], AsyncIterator[AsyncSession]]:
+    """The ``get_db`` provider for this app, honouring dependency overrides."""
+    return request.app.dependency_overrides.get(get_db, get_db)
+
+
+async def _cached_json_response(
+    request: Request,
+    db: AsyncSession,
+    key: widget_cache.Key,
+    build: Callable[[AsyncSession], Awaitable[bytes | None]],
+) -> Response:
+    """Serve ``key`` from the snapshot cache, building it with ``build`` on a miss.
+
+    ``build`` encodes and stores the body, returning None if the project does
+    not exist. Stale entries are served as-is while one background task rebuilds
+    them on a fresh session.
+    """
+    snapshot, state = widget_cache.lookup(key)
+    if state == widget_cache.STALE:
+        provider = _db_provider(request)
+
+        async def refresh() -> None:
+            async with aclosing(provider()) as sessions:
+                await build(await anext(sessions))
+
+        widget_cache.refresh_in_background(key, refresh)
+
+    if snapshot is not None:
+        body = snapshot.body
+    else:
+        body = await build(db)
+        if body is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={**_json_headers(), "X-Cache": state.upper()},
+    )
+
+
+async def _build_posts_body(db: AsyncSession, project_slug: str, limit: int) -> bytes | None:
+    project = await get_project_by_slug(db, project_slug)
+    if not project:
+        return None
+    generation = widget_cache.generation(project.id)
+    posts = (await get_latest_published_posts_for_projects(db, [project.id], limit))[project.id]
+    body = _encode_json(_widget_payload(project, posts))
+    widget_cache.store((project_slug, limit), project.id, body, generation)
+    return body
+
+
+async def _build_latest_body(db: AsyncSession, project_slug: str) -> bytes | None:
+    project = await get_project_by_slug(db, project_slug)
+    if not project:
+        return None
+    generation = widget_cache.generation(project.id)
+    posts = (await get_latest_published_posts_for_projects(db, [project.id], 10))[project.id]
+    body = _encode_json({
+        # Epoch milliseconds; naive datetimes from SQLite are UTC
+        "published": [
+            calendar.timegm(post.published_at.utctimetuple()) * 1000
+            for post in posts
+            if post.published_at
+        ],
+    })
+    widget_cache.store((project_slug, "latest"), project.id, body, generation)
+    return body
+
+
+@router.get("/batch")
+async def widget_batch_posts(
+    slugs: list[str] = Query(default_factory=list),
+    limit: int = 5,
+    db: AsyncSession = Depends(get_db),
+):
+    """Recent posts for several projects in one response.
+
+    ``slugs`` may be repeated or comma-separated. Unknown slugs are listed
+    under ``not_found`` rather than failing the whole request.
+    """
+    requested = list(dict.fromkeys(
+        slug.strip() for value in slugs for slug in value.split(",") if slug.strip()
+    ))
+    if not requested:
+        raise HTTPException(status_code=422, detail="At least one slug is required")
+    if len(requested) > MAX_BATCH_SLUGS:
+        raise HTTPException(
+            status_code=422, detail=f"At most {MAX_BATCH_SLUGS} slugs per request"
+        )
+    limit = min(max(limit, 1), 20)
+
+    projects = {p.slug: p for p in await get_projects_by_slugs(db, requested)}
+    posts_by_project = await get_latest_published_posts_for_projects(
+        db, [p.id for p in projects.values()], limit
+    )
+
+    return JSONResponse(
+        content={
+            "projects": {
+                slug: _widget_payload(projects[slug], posts_by_project[projects[slug].id])
+                for slug in requested
+                if slug in projects
+            },
+            "not_found": [slug for slug in requested if slug not in projects],
+        },
+        headers=_json_headers(),
+    )
+
+
 @router.get("/{project_slug}/posts")
 async def widget_posts(
     project_slug: str,
+    request: Request,
     limit: int = 5,
     db: AsyncSession = Depends(get_db),
 ):
     """Public API endpoint for the embeddable widget to fetch recent posts."""
+    limit = min(max(limit, 1), 20)
+    return await _cached_json_response(
+        request, db, (project_slug, limit),
+        lambda session: _build_posts_body(session, project_slug, limit),
+    )
+
+
+@router.get("/{project_slug}/latest")
+async def widget_latest(
+    project_slug: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    """Publish times of the ten newest posts, for the lite widget's unread badge."""
+    return await _cached_json_response(
+        request, db, (project_slug, "latest"),
+        lambda session: _build_latest_body(session, project_slug),
+    )
+
+
+async def _event_stream(project_id: str, queue: asyncio.Queue) -> AsyncIterator[str]:
+    """Yield SSE frames for one listener, with comment heartbeats while idle."""
+    try:
+        yield f"retry: {settings.sse_heartbeat_seconds * 1000}\n\n"
+        while True:
+            try:
+                frame = await asyncio.wait_for(queue.get(), timeout=settings.sse_heartbeat_seconds)
+            except TimeoutError:
+                frame = events.HEARTBEAT
+            yield frame
+    finally:
+        events.hub.unsubscribe(project_id, queue)
+
+
+@router.get("/{project_slug}/events")
+async def widget_events(
+    project_slug: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """Server-Sent Events stream of publish/unpublish events for a project."""
     project = await get_project_by_slug(db, project_slug)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    project_id = project.id
+    # Hand the pooled connection back now; the stream may stay open for hours
+    await db.close()
 
-    limit = min(max(limit, 1), 20)
-    posts = await get_published_posts_for_project(db, project.id)
-    posts = posts[:limit]
+    queue = events.hub.subscribe(project_id)
+    if queue is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many live connections",
+            headers={"Retry-After": str(settings.sse_heartbeat_seconds)},
+        )
 
-    return JSONResponse(
-        content={
-            "project": {
-                "name": project.name,
-                "slug": project.slug,
-                "accent_color": project.accent_color,
-            },
-            "posts": [
-                {
-                    "title": post.title,
-                    "slug": post.slug,
-                    "category": post.category,
-                    "category_label": CATEGORIES.get(post.category, {}).get("label", post.category),
-                    "published_at": post.published_at.isoformat() if post.published_at else None,
-                    "excerpt": (post.body_markdown[:150] + "...") if len(post.body_markdown) > 150 else post.body_markdown,
-                    "url": f"/changelog/{project.slug}/{post.slug}",
-                }
-                for post in posts
-            ],
-        },
+    return StreamingResponse(
+        _event_stream(project_id, queue),
+        media_type="text/event-stream",
         headers={
             "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET",
-            "Access-Control-Allow-Headers": "Content-Type",
-            "Cache-Control": "public, max-age=60",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
         },
     )
 
@@ -304,9 +602,10 @@ async def widget_script(
     return d.innerHTML;
   }}
 
-  // Fetch posts
-  function loadPosts() {{
-    fetch(API_URL)
+  // Fetch posts; live updates bypass the HTTP cache, which may still hold
+  // the response from before the change
+  function loadPosts(fresh) {{
+    fetch(API_URL, fresh ? {{cache: 'no-store'}} : {{}})
       .then(function(r) {{ return r.json(); }})
       .then(function(data) {{
         var container = document.getElementById('cp-widget-posts');
@@ -354,6 +653,14 @@ async def widget_script(
   }}
 
   loadPosts();
+
+  // Live updates: refetch when a post is published or unpublished
+  if (window.EventSource) {{
+    var stream = new EventSource(BASE_URL + '/api/widget/' + SLUG + '/events');
+    var refresh = function() {{ loadPosts(true); }};
+    stream.addEventListener('published', refresh);
+    stream.addEventListener('unpublished', refresh);
+  }}
 }})();
 """
 
@@ -365,3 +672,32 @@ async def widget_script(
             "Cache-Control": "public, max-age=300",
         },
     )
+
+
+@router.get("/{project_slug}/lite.js")
+async def widget_lite_script(
+    project_slug: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    """Serves the minified, lazily-initialized lite widget runtime for a project."""
+    project = await get_project_by_slug(db, project_slug)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    base_url = str(request.base_url).rstrip("/")
+    js_code = (
+        _LITE_WIDGET_JS
+        .replace("__SLUG__", _js_string_escape(project.slug))
+        .replace("__ACCENT__", _js_string_escape(project.accent_color))
+        .replace("__BASE__", _js_string_escape(base_url))
+    )
+
+    return Response(
+        content=js_code,
+        media_type="application/javascript",
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Cache-Control": "public, max-age=300",
+        },
+    )
@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user
@@ -8,9 +7,9 @@ from app.config import settings
 from app.database import get_db
 from app.models.user import User
 from app.services.project import get_project_by_id
+from app.templating import templates
 
 router = APIRouter(tags=["widget_page"])
-templates = Jinja2Templates(directory="src/app/templates")
 
 
 @router.get("/projects/{project_id}/widget", response_class=HTMLResponse)
@@ -0,0 +1,143 @@
+"""Command-line maintenance tasks.
+
+    python -m app.cli import-changelog <project-slug> CHANGELOG.md
+    python -m app.cli rerender-posts [--batch-size N] [--restart]
+    python -m app.cli startup-profile [--top N]
+    python -m app.cli maintenance [--job NAME] [--full-vacuum]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import app.models
+import app.services.search  # noqa: F401
+from app.database import async_session, engine, init_db
+from app.services import maintenance
+from app.services.changelog_import import import_changelog, iter_file_chunks
+from app.services.post import shutdown_render_pool
+from app.services.project import get_project_by_slug
+from app.services.rerender import RerenderProgress, rerender_posts
+from app.startup import profile_cold_start
+
+
+async def _import_changelog(project_slug: str, path: Path) -> int:
+    await init_db()
+    async with async_session() as db:
+        project = await get_project_by_slug(db, project_slug)
+        if project is None:
+            print(f"No project with slug {project_slug!r}", file=sys.stderr)
+            return 1
+        start = time.perf_counter()
+        with path.open("rb") as f:
+            result = await import_changelog(db, project.id, iter_file_chunks(f))
+        elapsed = time.perf_counter() - start
+    print(
+        f"Imported {result.imported} posts ({result.drafts} drafts), "
+        f"skipped {result.skipped} in {elapsed:.2f}s"
+    )
+    return 0
+
+
+def _print_progress(progress: RerenderProgress) -> None:
+    print(
+        f"{progress.processed}/{progress.total} posts, {progress.changed} changed, "
+        f"{progress.posts_per_second:,.0f} posts/s",
+        flush=True,
+    )
+
+
+async def _rerender_posts(batch_size: int | None, restart: bool) -> int:
+    await init_db()
+    progress = await rerender_posts(
+        async_session, batch_size=batch_size, restart=restart, on_batch=_print_progress
+    )
+    if progress.resumed_from:
+        print(f"Resumed after post {progress.resumed_from}")
+    print(
+        f"Re-rendered {progress.processed} posts ({progress.changed} changed) "
+        f"in {progress.elapsed:.1f}s, {progress.posts_per_second:,.0f} posts/s"
+    )
+    return 0
+
+
+def _startup_profile(top: int) -> int:
+    profile = profile_cold_start()
+    print(f"{'self ms':>9} {'cumulative ms':>14}  module")
+    for entry in sorted(profile.imports, key=lambda t: t.self_us, reverse=True)[:top]:
+        print(f"{entry.self_us / 1000:>9.1f} {entry.cumulative_us / 1000:>14.1f}  {entry.module}")
+    print()
+    for name, seconds in profile.steps.items():
+        print(f"{name:<10} {seconds * 1000:>8.0f}ms")
+    print(f"{'total':<10} {profile.total * 1000:>8.0f}ms")
+    return 0
+
+
+async def _maintenance(job_names: list[str] | None, full_vacuum: bool) -> int:
+    await init_db()
+    if full_vacuum:
+        start = time.perf_counter()
+        await maintenance.enable_incremental_vacuum(engine)
+        print(f"VACUUM with auto_vacuum=INCREMENTAL took {time.perf_counter() - start:.1f}s")
+    for job in maintenance.JOBS:
+        if job_names and job.name not in job_names:
+            continue
+        result = await maintenance.run_job(engine, async_session, job)
+        print(f"{job.name:<12} {json.dumps(result)}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser(
+        "import-changelog", help="Import a CHANGELOG.md into a project as posts"
+    )
+    importer.add_argument("project_slug")
+    importer.add_argument("path", type=Path)
+
+    rerender = commands.add_parser(
+        "rerender-posts",
+        help="Regenerate every post's HTML, resuming an interrupted run unless --restart",
+    )
+    rerender.add_argument("--batch-size", type=int, default=None)
+    rerender.add_argument("--restart", action="store_true")
+
+    profile = commands.add_parser(
+        "startup-profile", help="Show per-module import times and lifespan step times"
+    )
+    profile.add_argument("--top", type=int, default=25, help="modules to list")
+
+    upkeep = commands.add_parser(
+        "maintenance", help="Run the database maintenance jobs now"
+    )
+    upkeep.add_argument(
+        "--job", action="append", choices=[job.name for job in maintenance.JOBS],
+        help="only this job (repeatable)",
+    )
+    upkeep.add_argument(
+        "--full-vacuum", action="store_true",
+        help="first rewrite the database with auto_vacuum=INCREMENTAL (blocks writers)",
+    )
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "import-changelog":
+            return asyncio.run(_import_changelog(args.project_slug, args.path))
+        if args.command == "rerender-posts":
+            return asyncio.run(_rerender_posts(args.batch_size, args.restart))
+        if args.command == "startup-profile":
+            return _startup_profile(args.top)
+        if args.command == "maintenance":
+            return asyncio.run(_maintenance(args.job, args.full_vacuum))
+    finally:
+        shutdown_render_pool()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,8 @@ class Settings(BaseSettings):
     app_name: str = "ChangePost"
     app_version: str = "0.1.0"
     debug: bool = False
+    # Production boot: check a stored schema fingerprint instead of running create_all
+    fast_boot: bool = False
 
     # Database
     database_url: str = "sqlite+aiosqlite:///./changepost.db"
@@ -25,6 +27,103 @@ class Settings(BaseSettings):
     # Base URL for public pages
     base_url: str = "http://localhost:8000"
 
+    # Per-request SQL stats in a Server-Timing header (and the DEBUG toolbar)
+    query_stats_enabled: bool = True
+    # Same statement this many times in one request is logged as a likely N+1
+    n_plus_one_threshold: int = 10
+
+    # Statements slower than this are logged with their query plan (0 disables);
+    # the last slow_query_keep are listed at /admin/slow-queries
+    slow_query_ms: float = 100.0
+    slow_query_keep: int = 100
+    slow_query_log_file: str = ""
+    slow_query_log_max_bytes: int = 10_000_000
+    slow_query_log_backups: int = 3
+
+    # Prometheus /metrics. Set metrics_dir to a directory shared by all workers
+    # so each scrape covers every worker; a token requires "Bearer <token>"
+    metrics_dir: str = ""
+    metrics_flush_seconds: float = 5.0
+    metrics_token: str = ""
+
+    # Admins can profile a request with ?_profile=1 or "X-Profile: 1"; the last
+    # profiler_keep profiles are kept in memory and listed at /admin/profiles
+    profiler_enabled: bool = False
+    profiler_interval_ms: float = 5.0
+    profiler_keep: int = 20
+
+    # Compiled templates shared across workers; empty uses the system temp dir
+    template_bytecode_cache_dir: str = ""
+
+    # Scheduled publishing. The scheduler sleeps until the next due post and a
+    # committed schedule change in the same worker wakes it. One worker at a
+    # time holds the scheduler lease. scheduler_max_sleep_seconds (0 = no
+    # limit) bounds how late a change made by a worker running with
+    # scheduler_enabled off is noticed
+    scheduler_enabled: bool = True
+    scheduler_lease_seconds: float = 90.0
+    scheduler_max_sleep_seconds: float = 0.0
+
+    # SQLite maintenance (ANALYZE, incremental vacuum, WAL checkpoints, purging
+    # expired rows). Each job stops after maintenance_job_budget_seconds and
+    # resumes on its next run
+    maintenance_enabled: bool = True
+    maintenance_interval_seconds: float = 3600.0
+    maintenance_checkpoint_seconds: float = 300.0
+    maintenance_job_budget_seconds: float = 2.0
+    maintenance_lease_seconds: float = 600.0
+    maintenance_analysis_limit: int = 1000
+    maintenance_vacuum_step_pages: int = 256
+    maintenance_wal_max_bytes: int = 64 * 1024 * 1024
+    maintenance_purge_batch_size: int = 500
+
+    # Comma-separated emails of users allowed to use /admin
+    admin_emails: str = ""
+
+    # Widget response cache
+    widget_cache_enabled: bool = True
+    widget_cache_ttl_seconds: int = 30
+    widget_cache_stale_seconds: int = 300
+    widget_cache_max_entries: int = 2048
+
+    # Server-Sent Events
+    sse_heartbeat_seconds: int = 25
+    sse_max_connections: int = 20000
+    sse_max_connections_per_project: int = 5000
+    sse_queue_size: int = 16
+
+    # Markdown rendering: process pool size for bulk renders (0 = one per CPU,
+    # negative = never use processes) and the smallest batch worth sending to it
+    render_pool_workers: int = 0
+    render_pool_min_batch: int = 32
+    # Rendered HTML cache, keyed by a hash of the markdown and renderer config
+    render_cache_max_entries: int = 5000
+    render_cache_max_bytes: int = 32 * 1024 * 1024
+    # Posts per read/render/write transaction when re-rendering all posts
+    rerender_batch_size: int = 500
+    # Per-block cache behind the editor's live preview
+    preview_cache_max_entries: int = 20000
+    preview_cache_max_bytes: int = 16 * 1024 * 1024
+
+    # API key verification cache
+    api_key_cache_ttl_seconds: int = 60
+    api_key_cache_max_entries: int = 10000
+    api_key_last_used_flush_seconds: int = 30
+
+    # Password hashing runs on its own thread pool; beyond max_pending queued
+    # or running hashes, logins and sign-ups get 503
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+
+    # Authentication caches: verified JWTs (until they expire) and user rows
+    token_cache_max_entries: int = 10000
+    user_cache_ttl_seconds: int = 30
+    user_cache_max_entries: int = 10000
+
+    # Idempotency-Key replay window for programmatic writes
+    idempotency_key_ttl_hours: int = 24
+    idempotency_cache_max_entries: int = 1000
+
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8", "extra": "ignore"}
 
 
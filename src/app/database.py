@@ -1,16 +1,66 @@
+import hashlib
+import json
+import logging
+import time
+from collections.abc import Callable
+
+from sqlalchemy import Column, Integer, String, Table, delete, insert, inspect, make_url, select
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from app import metrics
 from app.config import settings
 
-engine = create_async_engine(settings.database_url, echo=settings.debug)
+logger = logging.getLogger(__name__)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout took for /metrics."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_wait.observe(time.perf_counter() - start)
+
+
+def _engine_options(url: str) -> dict:
+    parsed = make_url(url)
+    # In-memory SQLite uses a single static connection; nothing to wait for
+    if issubclass(parsed.get_dialect().get_pool_class(parsed), AsyncAdaptedQueuePool):
+        return {"poolclass": TimedQueuePool}
+    return {}
+
+
+engine = create_async_engine(
+    settings.database_url, echo=settings.debug, **_engine_options(settings.database_url)
+)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+metrics.callback(
+    "db_pool_checked_out",
+    "Database connections currently checked out",
+    lambda: {(): engine.pool.checkedout()} if hasattr(engine.pool, "checkedout") else {},
+)
+
 
 class Base(DeclarativeBase):
     pass
 
 
+# Fingerprint of the metadata the database was last initialised with, so a
+# fast boot can tell that create_all would have nothing to do
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+)
+
+
 async def get_db() -> AsyncSession:
     async with async_session() as session:
         try:
@@ -21,6 +71,88 @@ async def get_db() -> AsyncSession:
             raise
 
 
+def _add_missing_columns(connection) -> None:
+    """create_all skips tables that already exist, so add nullable columns defined later.
+
+    Anything else (NOT NULL without a server default, type changes, drops)
+    still needs a real migration.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.exec_driver_sql(
+                f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+            )
+            logger.warning("Added column %s.%s", table.name, column.name)
+
+
+def _create_missing_indexes(connection) -> None:
+    """create_all skips tables that already exist, so add indexes defined later."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+# Schema the models cannot express (virtual tables, triggers), by name
+_schema_hooks: dict[str, Callable] = {}
+
+
+def register_schema_hook(name: str, create: Callable) -> None:
+    """Have ``init_db`` run ``create(connection)`` after ``create_all``.
+
+    ``create`` must be idempotent. ``name`` is part of the schema
+    fingerprint, so changing it makes fast boots run ``init_db`` again.
+    """
+    _schema_hooks[name] = create
+
+
+def schema_fingerprint() -> str:
+    """Hash of every table, column and index the models define, plus schema hooks."""
+    tables = []
+    for table in Base.metadata.sorted_tables:
+        tables.append([
+            table.name,
+            [[c.name, str(c.type), c.nullable, c.primary_key] for c in table.columns],
+            sorted([i.name, [c.name for c in i.columns], bool(i.unique)] for i in table.indexes),
+        ])
+    return hashlib.sha256(json.dumps([tables, sorted(_schema_hooks)]).encode()).hexdigest()
+
+
 async def init_db():
     async with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            # Only takes effect on a new, empty database; lets maintenance
+            # return freed pages without a full VACUUM
+            await conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+        for create in _schema_hooks.values():
+            await conn.run_sync(create)
+        await conn.execute(delete(schema_version))
+        await conn.execute(insert(schema_version).values(id=1, fingerprint=schema_fingerprint()))
+
+
+async def ensure_schema() -> bool:
+    """Fast-boot replacement for ``init_db``: one query when nothing changed.
+
+    Falls back to ``init_db`` if the stored fingerprint is missing or differs
+    from the models. Returns True when the schema was already current.
+    """
+    try:
+        async with engine.connect() as conn:
+            stored = (await conn.execute(select(schema_version.c.fingerprint))).scalar()
+    except DBAPIError:
+        stored = None
+    if stored == schema_fingerprint():
+        return True
+    logger.warning("Database schema is not current, running create_all")
+    await init_db()
+    return False
@@ -1,36 +1,92 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
+from pathlib import Path
 
 from fastapi import FastAPI, Request
 from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from app.config import settings
-from app.database import init_db
-
 # Import models so they register with Base.metadata
-import app.models  # noqa: F401
-from app.api.health import router as health_router
+import app.models
+
+# Registers the ORM listeners that keep the post search index in sync
+import app.services.search
+from app import IMPORT_STARTED, metrics
+from app.api.admin import router as admin_router
+from app.api.analytics import router as analytics_router
+from app.api.api_keys import router as api_keys_router
 from app.api.auth import router as auth_router
+from app.api.changelog import router as changelog_router
 from app.api.dashboard import router as dashboard_router
-from app.api.projects import router as projects_router
+from app.api.health import router as health_router
+from app.api.metrics import router as metrics_router
 from app.api.posts import router as posts_router
-from app.api.changelog import router as changelog_router
+from app.api.programmatic import router as programmatic_router
+from app.api.projects import router as projects_router
 from app.api.subscribers import router as subscribers_router
 from app.api.widget import router as widget_router
-from app.api.analytics import router as analytics_router
-from app.api.api_keys import router as api_keys_router
 from app.api.widget_page import router as widget_page_router
-from app.api.programmatic import router as programmatic_router
+from app.config import settings
+from app.database import async_session, engine, ensure_schema, init_db
+from app.profiler import ProfilerMiddleware
+from app.query_stats import QueryStatsMiddleware
+from app.services.api_key import flush_last_used, run_last_used_flusher
+from app.services.auth import shutdown_password_hasher
+from app.services.post import shutdown_render_pool
+from app.slow_queries import SlowQueryMiddleware
+from app.startup import startup_profile
+from app.templating import precompile_templates, templates
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await init_db()
+    with startup_profile.step("schema"):
+        if settings.fast_boot:
+            await ensure_schema()
+        else:
+            await init_db()
+    with startup_profile.step("templates"):
+        precompile_templates()
+    last_used_flusher = asyncio.create_task(
+        run_last_used_flusher(async_session, settings.api_key_last_used_flush_seconds)
+    )
+    # Background jobs are imported only by workers that run them. The
+    # profiler, SQL stats, slow-query and metrics modules stay eager: they
+    # install middleware and engine listeners that must exist before the
+    # first request, and import in a few milliseconds.
+    scheduler = None
+    if settings.scheduler_enabled:
+        from app.services.scheduler import run_scheduler
+
+        scheduler = asyncio.create_task(run_scheduler(async_session))
+    maintenance = None
+    if settings.maintenance_enabled:
+        from app.services.maintenance import run_maintenance
+
+        maintenance = asyncio.create_task(run_maintenance(engine, async_session))
+    metrics_writer = None
+    if settings.metrics_dir:
+        metrics_writer = asyncio.create_task(
+            metrics.run_snapshot_writer(settings.metrics_flush_seconds)
+        )
+    startup_profile.log()
     yield
     # Shutdown
+    last_used_flusher.cancel()
+    if scheduler is not None:
+        scheduler.cancel()
+    if maintenance is not None:
+        maintenance.cancel()
+    if metrics_writer is not None:
+        metrics_writer.cancel()
+        metrics.write_snapshot()
+    async with async_session() as db:
+        await flush_last_used(db, commit=True)
+    shutdown_render_pool()
+    shutdown_password_hasher()
 
 
 app = FastAPI(
@@ -39,14 +95,17 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Static files
-app.mount("/static", StaticFiles(directory="src/app/static"), name="static")
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(SlowQueryMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
-# Templates
-templates = Jinja2Templates(directory="src/app/templates")
+# Static files
+app.mount("/static", StaticFiles(directory=Path(__file__).parent / "static"), name="static")
 
 # Routers
 app.include_router(health_router)
+app.include_router(metrics_router)
 app.include_router(auth_router)
 app.include_router(dashboard_router)
 app.include_router(projects_router)
@@ -58,6 +117,9 @@ app.include_router(analytics_router)
 app.include_router(api_keys_router)
 app.include_router(widget_page_router)
 app.include_router(programmatic_router)
+app.include_router(admin_router)
+
+startup_profile.record("import", time.perf_counter() - IMPORT_STARTED)
 
 
 @app.exception_handler(StarletteHTTPException)
@@ -80,6 +142,7 @@ async def custom_http_exception_handler(request: Request, exc: StarletteHTTPExce
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        headers=getattr(exc, "headers", None),
     )
 
 
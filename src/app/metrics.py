@@ -0,0 +1,378 @@
+"""Prometheus metrics served at ``GET /metrics``.
+
+Counters and histograms are plain dicts updated on the event loop thread,
+so recording a sample takes no lock. Values that other modules already keep
+(cache hit counts, SSE connections, queued ``last_used_at`` writes, ...) are
+read by callbacks when a snapshot is taken instead of being duplicated;
+each module registers its own callbacks next to the values they read.
+
+With several uvicorn workers each process only sees its own traffic. Set
+``METRICS_DIR`` to a directory shared by the workers (a fresh one per
+deploy): every worker writes its snapshot there every
+``METRICS_FLUSH_SECONDS`` and on shutdown, and ``/metrics`` sums all of
+them. Counters of exited workers keep counting towards the totals; their
+gauges are dropped.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from pathlib import Path
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+Labels = tuple[str, ...]
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> dict[Labels, float]:
+        return self.values
+
+    def reset(self) -> None:
+        self.values.clear()
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Labels = (), buckets=LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket..., count above the last bucket, sum]
+        self.values: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self) -> dict[Labels, list[float]]:
+        # Copies, so a snapshot serialised off the loop can't see half an observation
+        return {labels: list(counts) for labels, counts in self.values.items()}
+
+    def reset(self) -> None:
+        self.values.clear()
+
+
+class CallbackMetric:
+    """A counter or gauge whose samples come from ``collect`` at snapshot time."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], dict[Labels, float]],
+        labelnames: Labels = (),
+        type: str = "gauge",
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.type = type
+        self.collect = collect
+
+    def samples(self) -> dict[Labels, float]:
+        return self.collect()
+
+    def reset(self) -> None:
+        pass
+
+
+_registry: dict[str, Counter | Histogram | CallbackMetric] = {}
+
+
+def _register(metric):
+    _registry[metric.name] = metric
+    return metric
+
+
+def counter(name: str, help: str, labelnames: Labels = ()) -> Counter:
+    return _register(Counter(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: Labels = (), buckets=LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+def callback(
+    name: str,
+    help: str,
+    collect: Callable[[], dict[Labels, float]],
+    labelnames: Labels = (),
+    type: str = "gauge",
+) -> CallbackMetric:
+    return _register(CallbackMetric(name, help, collect, labelnames, type))
+
+
+http_requests = counter(
+    "http_requests_total", "HTTP responses by route and status", ("method", "route", "status")
+)
+http_request_duration = histogram(
+    "http_request_duration_seconds", "Time to the end of the response body", ("method", "route")
+)
+db_pool_wait = histogram(
+    "db_pool_wait_seconds", "Time to check a connection out of the pool, including waiting"
+)
+email_sent = counter("email_sent_total", "Emails handed to the SMTP server")
+email_failed = counter("email_failed_total", "Emails the SMTP server did not accept")
+email_send_duration = histogram("email_send_seconds", "SMTP delivery time per email")
+
+
+_cache_sources: dict[str, tuple[Callable[[], dict[str, int]], Callable[[], int]]] = {}
+
+
+def register_cache(
+    name: str, lookups: Callable[[], dict[str, int]], entries: Callable[[], int]
+) -> None:
+    """Report a cache's lookup counts by result ("hit", "miss", ...) as
+    ``cache_requests_total`` and its size as ``cache_entries``; every result
+    but "miss" counts as a hit."""
+    _cache_sources[name] = (lookups, entries)
+
+
+def _cache_requests() -> dict[Labels, float]:
+    return {
+        (name, result): count
+        for name, (lookups, _) in _cache_sources.items()
+        for result, count in lookups().items()
+    }
+
+
+callback(
+    "cache_requests_total",
+    "In-process cache lookups by result",
+    _cache_requests,
+    ("cache", "result"),
+    type="counter",
+)
+callback(
+    "cache_entries",
+    "Entries held by each in-process cache",
+    lambda: {(name,): entries() for name, (_, entries) in _cache_sources.items()},
+    ("cache",),
+)
+
+
+def reset() -> None:
+    for metric in _registry.values():
+        metric.reset()
+
+
+def snapshot() -> dict:
+    """This process's metrics in a JSON-friendly form."""
+    metrics = {}
+    for metric in _registry.values():
+        try:
+            samples = metric.samples()
+        except Exception:
+            logger.exception("Collecting metric %s failed", metric.name)
+            continue
+        metrics[metric.name] = {
+            "type": metric.type,
+            "help": metric.help,
+            "labelnames": list(metric.labelnames),
+            "buckets": list(getattr(metric, "buckets", ())),
+            "samples": [[list(labels), value] for labels, value in samples.items()],
+        }
+    return {"pid": os.getpid(), "metrics": metrics}
+
+
+def _snapshot_path(directory: Path, pid: int) -> Path:
+    return directory / f"worker-{pid}.json"
+
+
+def write_snapshot(data: dict | None = None) -> None:
+    """Publish this worker's snapshot to ``METRICS_DIR`` for the other workers.
+
+    Pass ``data`` taken on the event loop when calling this from a thread:
+    ``snapshot()`` reads dicts that request handlers keep updating.
+    """
+    if not settings.metrics_dir:
+        return
+    if data is None:
+        data = snapshot()
+    directory = Path(settings.metrics_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = _snapshot_path(directory, os.getpid())
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data))
+    # Readers never see a half-written file
+    os.replace(tmp, path)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _worker_snapshots() -> list[dict]:
+    own = snapshot()
+    if not settings.metrics_dir:
+        return [own]
+    snapshots = [own]
+    for path in Path(settings.metrics_dir).glob("worker-*.json"):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        if data.get("pid") != own["pid"]:
+            snapshots.append(data)
+    return snapshots
+
+
+def aggregate(snapshots: list[dict]) -> dict:
+    """Sum snapshots from several workers; gauges only from live ones."""
+    merged: dict[str, dict] = {}
+    for data in snapshots:
+        alive = data["pid"] == os.getpid() or _alive(data["pid"])
+        for name, metric in data["metrics"].items():
+            if metric["type"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    target["samples"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["samples"][key] = current + value
+    return merged
+
+
+def _hit_ratios(merged: dict) -> dict[Labels, float]:
+    totals: dict[str, list[float]] = {}
+    for (cache, result), value in merged.get("cache_requests_total", {}).get("samples", {}).items():
+        hits_and_total = totals.setdefault(cache, [0, 0])
+        if result != "miss":
+            hits_and_total[0] += value
+        hits_and_total[1] += value
+    return {(cache,): hits / total for cache, (hits, total) in totals.items() if total}
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra: tuple[str, str] | None = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def render_prometheus(merged: dict) -> str:
+    merged = dict(merged)
+    ratios = _hit_ratios(merged)
+    if ratios:
+        merged["cache_hit_ratio"] = {
+            "type": "gauge",
+            "help": "Share of cache lookups answered from the cache",
+            "labelnames": ["cache"],
+            "samples": ratios,
+        }
+    lines = []
+    for name, metric in merged.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labelnames"]
+        for labels, value in sorted(metric["samples"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(names, labels)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*metric["buckets"], math.inf], value[:-1]):
+                cumulative += count
+                le = ("le", "+Inf" if math.isinf(bound) else repr(bound))
+                lines.append(f"{name}_bucket{_format_labels(names, labels, le)} {int(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(names, labels)} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(names, labels)} {int(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def exposition() -> str:
+    """All workers' metrics in the Prometheus text format."""
+    if settings.metrics_dir:
+        write_snapshot()
+    return render_prometheus(aggregate(_worker_snapshots()))
+
+
+async def run_snapshot_writer(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(write_snapshot, snapshot())
+        except Exception:
+            logger.exception("Writing metrics snapshot failed")
+
+
+class MetricsMiddleware:
+    """Counts responses and times them per route template."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(method, route, str(status))
+            http_request_duration.observe(time.perf_counter() - start, method, route)
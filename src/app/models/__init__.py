@@ -1,7 +1,19 @@
 from app.models.api_key import APIKey
+from app.models.idempotency_key import IdempotencyKey
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.lease import Lease
 from app.models.post import Post
 from app.models.project import Project
 from app.models.subscriber import Subscriber
 from app.models.user import User
 
-__all__ = ["User", "Project", "Post", "Subscriber", "APIKey"]
+__all__ = [
+    "APIKey",
+    "IdempotencyKey",
+    "JobCheckpoint",
+    "Lease",
+    "Post",
+    "Project",
+    "Subscriber",
+    "User",
+]
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -22,6 +22,8 @@ class Post(Base):
     )  # new_feature, improvement, bugfix, announcement
     is_published: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     published_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    # When an unpublished post is due to be published by the scheduler (UTC)
+    scheduled_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     view_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     project_id: Mapped[str] = mapped_column(
         String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False
@@ -34,3 +36,11 @@ class Post(Base):
     )
 
     project: Mapped["Project"] = relationship(back_populates="posts")  # noqa: F821
+
+    __table_args__ = (
+        # Keyset pagination in the programmatic API
+        Index("ix_posts_project_created", "project_id", "created_at", "id"),
+        Index("ix_posts_project_published", "project_id", "published_at", "id"),
+        # The scheduler's next-due lookup
+        Index("ix_posts_scheduled_at", "scheduled_at"),
+    )
@@ -0,0 +1,233 @@
+"""On-demand sampling profiler for single requests.
+
+With ``PROFILER_ENABLED`` on, an admin can add ``?_profile=1`` to a URL (or
+send ``X-Profile: 1``) to have that request profiled. A background thread
+samples the event loop thread's stack every ``PROFILER_INTERVAL_MS`` while
+the request runs, so the request itself is not slowed by tracing hooks.
+The result is kept in memory with the request's SQL statements and their
+timings. The response carries an ``X-Profile-Id`` header, and the profile
+can be fetched from ``/admin/profiles/{id}`` as speedscope JSON or
+collapsed stacks (for flamegraph.pl and most flame graph viewers).
+
+Samples show whatever the loop is running, so other requests served at the
+same time appear in the profile too; profile on a quiet worker when you can.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+
+from app.api.deps import is_admin, session_factory_for
+from app.config import settings
+from app.query_stats import track_queries
+from app.services.auth import decode_access_token, get_cached_user
+
+PROFILE_FLAG = "_profile"
+PROFILE_HEADER = "x-profile"
+
+Frame = tuple[str, str, int]  # function name, file, first line
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[tuple[Frame, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        # The sampler may be mid-walk of a deep stack; wait for it off the loop
+        await asyncio.to_thread(self._thread.join)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+
+@dataclass
+class Profile:
+    id: str
+    method: str
+    path: str
+    interval_ms: float
+    started_at: float = field(default_factory=time.time)
+    duration_ms: float = 0.0
+    status: int | None = None
+    stacks: Counter = field(default_factory=Counter)
+    sql: list[tuple[str, float]] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 2),
+            "samples": sum(self.stacks.values()),
+            "interval_ms": self.interval_ms,
+            "sql_count": len(self.sql),
+            "sql_total_ms": round(sum(seconds for _, seconds in self.sql) * 1000, 2),
+        }
+
+    def details(self) -> dict:
+        return {
+            **self.summary(),
+            "sql": [
+                {"statement": statement, "ms": round(seconds * 1000, 3)}
+                for statement, seconds in self.sql
+            ],
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format: ``outer;inner;leaf count`` per line."""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            names = ";".join(f"{name} ({_short_path(file)}:{line})" for name, file, line in stack)
+            lines.append(f"{names} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> dict:
+        frames: list[dict] = []
+        index: dict[Frame, int] = {}
+        samples = []
+        for stack, count in self.stacks.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    name, file, line = frame
+                    frames.append({"name": name, "file": file, "line": line})
+                ids.append(index[frame])
+            samples.append((ids, count))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "changepost",
+            "name": f"{self.method} {self.path}",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(count for _, count in samples) * self.interval_ms,
+                "samples": [ids for ids, _ in samples],
+                "weights": [count * self.interval_ms for _, count in samples],
+            }],
+        }
+
+
+def _short_path(file: str) -> str:
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and file.startswith(prefix):
+            return file[len(prefix):].lstrip("/\\")
+    return file
+
+
+_profiles: OrderedDict[str, Profile] = OrderedDict()
+# One profile at a time: concurrent samplers would mostly record each other's requests
+_active = asyncio.Lock()
+
+
+def list_profiles() -> list[dict]:
+    return [profile.summary() for profile in reversed(_profiles.values())]
+
+
+def get_profile(profile_id: str) -> Profile | None:
+    return _profiles.get(profile_id)
+
+
+def clear_profiles() -> None:
+    _profiles.clear()
+
+
+def _store(profile: Profile) -> None:
+    _profiles[profile.id] = profile
+    while len(_profiles) > settings.profiler_keep:
+        _profiles.popitem(last=False)
+
+
+def _requested(scope) -> bool:
+    if PROFILE_FLAG.encode() + b"=1" in scope.get("query_string", b"").split(b"&"):
+        return True
+    return any(
+        name == PROFILE_HEADER.encode() and value == b"1" for name, value in scope["headers"]
+    )
+
+
+async def _is_admin(scope) -> bool:
+    request = Request(scope)
+    token = request.cookies.get("access_token")
+    user_id = decode_access_token(token) if token else None
+    if user_id is None:
+        return False
+    async with session_factory_for(request)() as db:
+        user = await get_cached_user(db, user_id)
+    return user is not None and is_admin(user)
+
+
+class ProfilerMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.profiler_enabled
+            or not _requested(scope)
+            or _active.locked()
+            or not await _is_admin(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async with _active:
+            await self._profile(scope, receive, send)
+
+    async def _profile(self, scope, receive, send):
+        profile = Profile(
+            id=uuid.uuid4().hex[:12],
+            method=scope["method"],
+            path=scope["path"],
+            interval_ms=settings.profiler_interval_ms,
+        )
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile.id)
+            await send(message)
+
+        sampler = StackSampler(threading.get_ident(), settings.profiler_interval_ms / 1000)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            with track_queries(record_timings=True) as stats:
+                await self.app(scope, receive, send_with_id)
+        finally:
+            profile.duration_ms = (time.perf_counter() - start) * 1000
+            await sampler.stop()
+            profile.stacks = sampler.stacks
+            profile.sql = stats.timings
+            _store(profile)
@@ -0,0 +1,147 @@
+"""Per-request SQL statistics.
+
+Engine events time every statement and add it to each ``QueryStats``
+collector open in the current context. ``QueryStatsMiddleware`` opens one
+per HTTP request and reports it in a ``Server-Timing`` header
+(``db;dur=12.4;desc="7 queries"``); with DEBUG on, pages also show it in a
+toolbar. ``track_queries`` opens one anywhere else, which is how the tests
+hold routes to a query budget.
+
+The same statement text run ``N_PLUS_ONE_THRESHOLD`` times (default 10) in
+one request usually means a query inside a loop, and is logged once per route.
+"""
+
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_collectors: ContextVar[tuple["QueryStats", ...]] = ContextVar("query_stats", default=())
+_reported_repeats: set[tuple[str, str]] = set()
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str | None = None
+    statements: Counter = field(default_factory=Counter)
+    # Every statement with its duration, in order; only kept when asked for
+    timings: list[tuple[str, float]] | None = None
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        if self.timings is not None:
+            self.timings.append((statement, seconds))
+        self.total_seconds += seconds
+        self.statements[statement] += 1
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int | None = None) -> list[tuple[str, int]]:
+        """Statements run at least ``threshold`` times, most frequent first."""
+        threshold = threshold or settings.n_plus_one_threshold
+        return [(s, n) for s, n in self.statements.most_common() if n >= threshold]
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_seconds * 1000
+
+    @property
+    def slowest_ms(self) -> float:
+        return self.slowest_seconds * 1000
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_ms:.1f};desc="{self.count} queries"'
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries in {self.total_ms:.1f}ms"]
+        lines += [f"  {n}x {statement}" for statement, n in self.statements.most_common()]
+        return "\n".join(lines)
+
+
+# The start time rides on the execution context rather than the connection,
+# so a statement that raises (and never reaches after_cursor_execute) leaves
+# nothing behind for the next query on that pooled connection.
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if _collectors.get() and context is not None:
+        context._query_stats_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_stats_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    for stats in _collectors.get():
+        stats.add(statement, elapsed)
+
+
+@contextmanager
+def track_queries(record_timings: bool = False):
+    """Collect the statements run in this context (and tasks started from it).
+
+    With ``record_timings`` each statement's duration is kept in ``timings``.
+    """
+    stats = QueryStats(timings=[] if record_timings else None)
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+def current_query_stats() -> QueryStats | None:
+    collectors = _collectors.get()
+    return collectors[-1] if collectors else None
+
+
+def debug_toolbar_stats() -> QueryStats | None:
+    """The current request's stats for the debug toolbar; None outside DEBUG."""
+    return current_query_stats() if settings.debug else None
+
+
+def _report_repeats(scope, stats: QueryStats) -> None:
+    route = scope.get("route")
+    path = getattr(route, "path", scope["path"])
+    for statement, count in stats.repeated():
+        if (path, statement) in _reported_repeats:
+            continue
+        _reported_repeats.add((path, statement))
+        logger.warning(
+            "Possible N+1 query on %s %s: ran %d times: %s",
+            scope["method"], path, count, " ".join(statement.split())[:300],
+        )
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.query_stats_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        with track_queries() as stats:
+            await self.app(scope, receive, send_with_timing)
+        _report_repeats(scope, stats)
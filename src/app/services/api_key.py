@@ -1,13 +1,35 @@
+import asyncio
 import hashlib
+import logging
 import secrets
-import uuid
-from datetime import datetime, timezone
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
 
-from sqlalchemy import select, func
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import metrics
+from app.config import settings
 from app.models.api_key import APIKey
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class VerifiedAPIKey:
+    """The parts of a verified key a request needs, safe to cache across sessions."""
+
+    id: str
+    project_id: str
+
+
+# key_hash -> (verified key, monotonic expiry). Deleting a key evicts it here
+# immediately; other workers drop it when the TTL runs out.
+_verified: dict[str, tuple[VerifiedAPIKey, float]] = {}
+# key_id -> most recent use not yet written to the database
+_pending_last_used: dict[str, datetime] = {}
+
 
 def generate_api_key() -> tuple[str, str, str]:
     """Generate an API key. Returns (raw_key, key_hash, key_prefix)."""
@@ -42,6 +64,7 @@ async def create_api_key(
 async def get_api_keys_for_project(
     db: AsyncSession, project_id: str
 ) -> list[APIKey]:
+    await flush_last_used(db)
     result = await db.execute(
         select(APIKey)
         .where(APIKey.project_id == project_id)
@@ -59,17 +82,93 @@ async def get_api_key_by_id(
 
 async def verify_api_key(
     db: AsyncSession, raw_key: str
-) -> APIKey | None:
-    """Verify an API key and return the APIKey object if valid."""
+) -> VerifiedAPIKey | None:
+    """Verify an API key, serving repeat lookups from memory.
+
+    ``last_used_at`` is recorded in memory and written by ``flush_last_used``.
+    """
     key_hash = hash_api_key(raw_key)
-    result = await db.execute(
-        select(APIKey).where(APIKey.key_hash == key_hash)
-    )
-    api_key = result.scalar_one_or_none()
-    if api_key:
-        api_key.last_used_at = datetime.now(timezone.utc)
-        await db.flush()
-    return api_key
+    cached = _verified.get(key_hash)
+    if cached and cached[1] > time.monotonic():
+        verified = cached[0]
+    else:
+        result = await db.execute(
+            select(APIKey.id, APIKey.project_id).where(APIKey.key_hash == key_hash)
+        )
+        row = result.one_or_none()
+        if row is None:
+            _verified.pop(key_hash, None)
+            return None
+        verified = VerifiedAPIKey(id=row.id, project_id=row.project_id)
+        if len(_verified) >= settings.api_key_cache_max_entries:
+            _verified.clear()
+        _verified[key_hash] = (verified, time.monotonic() + settings.api_key_cache_ttl_seconds)
+
+    _pending_last_used[verified.id] = datetime.now(UTC)
+    return verified
+
+
+async def flush_last_used(db: AsyncSession, commit: bool = False) -> int:
+    """Write buffered ``last_used_at`` values in one statement. Returns rows queued.
+
+    With ``commit`` the session is committed too, and the values stay queued
+    if either step fails.
+    """
+    if not _pending_last_used:
+        return 0
+    pending = list(_pending_last_used.items())
+    _pending_last_used.clear()
+    table = APIKey.__table__
+    try:
+        await db.execute(
+            update(table)
+            .where(table.c.id == bindparam("key_id"))
+            .values(last_used_at=bindparam("used_at")),
+            [{"key_id": key_id, "used_at": used_at} for key_id, used_at in pending],
+        )
+        if commit:
+            await db.commit()
+    except Exception:
+        # Put the values back for the next flush, unless a newer use replaced them
+        for key_id, used_at in pending:
+            _pending_last_used.setdefault(key_id, used_at)
+        raise
+    return len(pending)
+
+
+async def run_last_used_flusher(session_factory, interval: float) -> None:
+    """Periodically persist buffered ``last_used_at`` values until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as db:
+                await flush_last_used(db, commit=True)
+        except Exception:
+            logger.exception("Failed to flush API key last_used_at")
+
+
+def evict_api_keys(key_ids: set[str] | None = None, project_id: str | None = None) -> None:
+    """Drop cached verifications by key id and/or project."""
+    for key_hash, (verified, _) in list(_verified.items()):
+        if (key_ids and verified.id in key_ids) or verified.project_id == project_id:
+            del _verified[key_hash]
+
+
+def pending_last_used_count() -> int:
+    """``last_used_at`` updates waiting for the next flush."""
+    return len(_pending_last_used)
+
+
+metrics.callback(
+    "api_key_last_used_pending",
+    "API key last_used_at updates buffered until the next flush",
+    lambda: {(): pending_last_used_count()},
+)
+
+
+def clear_api_key_cache() -> None:
+    _verified.clear()
+    _pending_last_used.clear()
 
 
 async def delete_api_key(
@@ -86,4 +185,6 @@ async def delete_api_key(
         return False
     await db.delete(api_key)
     await db.flush()
+    evict_api_keys(key_ids={api_key.id})
+    _pending_last_used.pop(api_key.id, None)
     return True
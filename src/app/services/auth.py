@@ -1,10 +1,16 @@
-from datetime import datetime, timedelta, timezone
+import asyncio
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
 
 import bcrypt
 from jose import JWTError, jwt
-from sqlalchemy import select
+from sqlalchemy import event, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 
+from app import metrics
 from app.config import settings
 from app.models.user import User
 
@@ -21,21 +27,135 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(pw_bytes, hashed_bytes)
 
 
+class PasswordHasherBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
+class PasswordHashStats:
+    """Counters and recent latencies for password hashing and logins."""
+
+    def __init__(self, samples: int = 1024) -> None:
+        self.queue_wait_ms: deque[float] = deque(maxlen=samples)
+        self.login_ms: deque[float] = deque(maxlen=samples)
+        self.reset()
+
+    @staticmethod
+    def _percentile(samples: deque[float], pct: float) -> float | None:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 1)
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - settings.password_hash_workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_ms_p50": self._percentile(self.queue_wait_ms, 0.50),
+            "queue_wait_ms_p95": self._percentile(self.queue_wait_ms, 0.95),
+            "login_ms_p50": self._percentile(self.login_ms, 0.50),
+            "login_ms_p95": self._percentile(self.login_ms, 0.95),
+        }
+
+    def reset(self) -> None:
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_ms.clear()
+        self.login_ms.clear()
+
+
+password_hash_stats = PasswordHashStats()
+metrics.callback(
+    "password_hash_in_flight",
+    "Password hashes running or queued",
+    lambda: {(): password_hash_stats.in_flight},
+)
+metrics.callback(
+    "password_hash_rejected_total",
+    "Logins and sign-ups turned away because the hash queue was full",
+    lambda: {(): password_hash_stats.rejected},
+    type="counter",
+)
+_hash_executor: ThreadPoolExecutor | None = None
+
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt"
+        )
+    return _hash_executor
+
+
+def shutdown_password_hasher() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
+async def _run_hashing(func, *args):
+    """Run a bcrypt call on the dedicated executor instead of the event loop.
+
+    bcrypt releases the GIL, so other requests keep being served while it
+    runs. Raises PasswordHasherBusy once ``password_hash_max_pending`` calls
+    are already queued or running.
+    """
+    stats = password_hash_stats
+    if stats.in_flight >= settings.password_hash_max_pending:
+        stats.rejected += 1
+        raise PasswordHasherBusy()
+    stats.in_flight += 1
+    submitted = time.perf_counter()
+
+    def _timed():
+        stats.queue_wait_ms.append((time.perf_counter() - submitted) * 1000)
+        return func(*args)
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_hash_executor(), _timed)
+    finally:
+        stats.in_flight -= 1
+        stats.completed += 1
+
+
 def create_access_token(user_id: str) -> str:
-    expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
+    expire = datetime.now(UTC) + timedelta(minutes=settings.access_token_expire_minutes)
     payload = {"sub": user_id, "exp": expire}
     return jwt.encode(payload, settings.secret_key, algorithm=settings.jwt_algorithm)
 
 
+# Verified token -> (user id, exp timestamp), least recently used first
+_token_claims: OrderedDict[str, tuple[str, float]] = OrderedDict()
+# User id -> (column values, monotonic expiry)
+_users: dict[str, tuple[dict, float]] = {}
+_EVICT_KEY = "pending_user_evictions"
+
+
 def decode_access_token(token: str) -> str | None:
+    """User id from a valid token. Signatures already verified are remembered until expiry."""
+    cached = _token_claims.get(token)
+    if cached is not None:
+        user_id, expires_at = cached
+        if expires_at > time.time():
+            _token_claims.move_to_end(token)
+            return user_id
+        del _token_claims[token]
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
         user_id: str = payload.get("sub")
         if user_id is None:
             return None
-        return user_id
     except JWTError:
         return None
+    if "exp" in payload and settings.token_cache_max_entries > 0:
+        _token_claims[token] = (user_id, float(payload["exp"]))
+        while len(_token_claims) > settings.token_cache_max_entries:
+            _token_claims.popitem(last=False)
+    return user_id
 
 
 async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
@@ -53,13 +173,68 @@ async def get_user_by_id(db: AsyncSession, user_id: str) -> User | None:
     return result.scalar_one_or_none()
 
 
+async def get_cached_user(db: AsyncSession, user_id: str) -> User | None:
+    """Like ``get_user_by_id``, but served from memory for ``user_cache_ttl_seconds``.
+
+    Cached rows are attached to ``db`` without a query, so the returned user
+    behaves like one loaded in this session.
+    """
+    cached = _users.get(user_id)
+    if cached is not None:
+        values, expires_at = cached
+        if expires_at > time.monotonic():
+            user = User(**values)
+            make_transient_to_detached(user)
+            return await db.merge(user, load=False)
+        del _users[user_id]
+
+    user = await get_user_by_id(db, user_id)
+    if user is not None and settings.user_cache_ttl_seconds > 0:
+        while len(_users) >= settings.user_cache_max_entries:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            del _users[next(iter(_users))]
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        _users[user_id] = (values, time.monotonic() + settings.user_cache_ttl_seconds)
+    return user
+
+
+def evict_user(user_id: str) -> None:
+    _users.pop(user_id, None)
+
+
+def clear_auth_caches() -> None:
+    _token_claims.clear()
+    _users.clear()
+
+
+# Changed users are evicted once the change commits: evicting at flush time
+# would let a concurrent request re-cache the old row before the commit
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _queue_user_eviction(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_EVICT_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed_users(session: Session) -> None:
+    for user_id in session.info.pop(_EVICT_KEY, ()):
+        evict_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_evictions(session: Session) -> None:
+    session.info.pop(_EVICT_KEY, None)
+
+
 async def create_user(
     db: AsyncSession, email: str, username: str, password: str, display_name: str | None = None
 ) -> User:
     user = User(
         email=email.lower().strip(),
         username=username.lower().strip(),
-        hashed_password=hash_password(password),
+        hashed_password=await _run_hashing(hash_password, password),
         display_name=display_name or username,
     )
     db.add(user)
@@ -68,9 +243,13 @@ async def create_user(
 
 
 async def authenticate_user(db: AsyncSession, email: str, password: str) -> User | None:
-    user = await get_user_by_email(db, email.lower().strip())
-    if not user:
-        return None
-    if not verify_password(password, user.hashed_password):
-        return None
-    return user
+    started = time.perf_counter()
+    try:
+        user = await get_user_by_email(db, email.lower().strip())
+        if not user:
+            return None
+        if not await _run_hashing(verify_password, password, user.hashed_password):
+            return None
+        return user
+    finally:
+        password_hash_stats.login_ms.append((time.perf_counter() - started) * 1000)
@@ -0,0 +1,252 @@
+"""Import an existing CHANGELOG.md (Keep a Changelog or similar) as posts.
+
+The file is parsed line by line as it streams in: only the entry currently
+being read and one batch of finished entries are held in memory. Each version
+heading (``## [1.2.0] - 2024-05-01``, ``## v1.2.0 (2024-05-01)``, ...) becomes
+one post whose body is everything under it, published at the release date.
+Undated versions are imported as drafts and ``Unreleased`` is skipped. The
+post category comes from the entry's ``###`` sections (Added, Fixed, ...).
+Versions that already exist as post titles are skipped, so an import can be
+re-run safely.
+
+Imported posts are history, not news: they send no live widget events or
+subscriber notifications and are rendered past the render cache.
+
+Every batch is committed on its own, so the database's write lock is only
+held while a batch is inserted, never while the next part of the file is read.
+Callers feeding a network upload should spool it first (``spool_body``) so
+a slow client cannot stretch out an import.
+"""
+
+import codecs
+import re
+import tempfile
+from collections.abc import AsyncIterable, AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.post import Post
+from app.services.post import create_posts
+
+IMPORT_BATCH_SIZE = 200
+READ_CHUNK_BYTES = 256 * 1024
+# Uploads larger than this are spooled to a temporary file instead of memory
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+SECTION_CATEGORIES = {
+    "added": "new_feature",
+    "new": "new_feature",
+    "features": "new_feature",
+    "new features": "new_feature",
+    "changed": "improvement",
+    "improved": "improvement",
+    "improvements": "improvement",
+    "performance": "improvement",
+    "fixed": "bugfix",
+    "fixes": "bugfix",
+    "bug fixes": "bugfix",
+    "security": "bugfix",
+    "deprecated": "announcement",
+    "removed": "announcement",
+}
+# When an entry has several sections, the first of these present wins
+CATEGORY_PRIORITY = ("new_feature", "improvement", "bugfix", "announcement")
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_VERSION = re.compile(r"^\[?(unreleased|v?\d+(?:\.\d+)+[0-9A-Za-z.+-]*)\]?", re.IGNORECASE)
+_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_VERSION_LINK = re.compile(
+    r"^\s*\[(unreleased|v?\d+(?:\.\d+)+[0-9A-Za-z.+-]*)\]:\s*\S+", re.IGNORECASE
+)
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+@dataclass
+class ChangelogEntry:
+    version: str
+    released_at: datetime | None
+    lines: list[str] = field(default_factory=list)
+    categories: set[str] = field(default_factory=set)
+
+    @property
+    def is_unreleased(self) -> bool:
+        return self.version.lower() == "unreleased"
+
+    @property
+    def body_markdown(self) -> str:
+        return "\n".join(self.lines).strip()
+
+    @property
+    def category(self) -> str:
+        for category in CATEGORY_PRIORITY:
+            if category in self.categories:
+                return category
+        return "improvement"
+
+
+def _parse_date(text: str) -> datetime | None:
+    match = _DATE.search(text)
+    if not match:
+        return None
+    try:
+        return datetime(*map(int, match.groups()), tzinfo=UTC)
+    except ValueError:
+        return None
+
+
+class ChangelogParser:
+    """Incremental parser: ``feed`` one line at a time, then ``close``.
+
+    Both return the entry that was just completed, if any.
+    """
+
+    def __init__(self) -> None:
+        self._entry: ChangelogEntry | None = None
+        self._in_fence = False
+
+    def feed(self, line: str) -> ChangelogEntry | None:
+        line = line.rstrip("\r\n")
+        if _FENCE.match(line):
+            self._in_fence = not self._in_fence
+        elif not self._in_fence:
+            heading = _HEADING.match(line)
+            if heading and len(heading.group(1)) <= 2:
+                version = _VERSION.match(heading.group(2))
+                if version:
+                    finished = self._entry
+                    self._entry = ChangelogEntry(
+                        version=version.group(1),
+                        released_at=_parse_date(heading.group(2)[version.end():]),
+                    )
+                    return finished
+            if _VERSION_LINK.match(line):
+                return None
+            if heading and self._entry is not None:
+                category = SECTION_CATEGORIES.get(heading.group(2).strip().lower())
+                if category:
+                    self._entry.categories.add(category)
+        if self._entry is not None:
+            self._entry.lines.append(line)
+        return None
+
+    def close(self) -> ChangelogEntry | None:
+        finished, self._entry = self._entry, None
+        return finished
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream as UTF-8 and yield it line by line."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_file_chunks(f) -> AsyncIterator[bytes]:
+    """Read an open binary file in chunks."""
+    while chunk := f.read(READ_CHUNK_BYTES):
+        yield chunk
+
+
+class BodyTooLarge(ValueError):
+    """More bytes arrived than ``spool_body`` was allowed to keep."""
+
+
+@asynccontextmanager
+async def spool_body(
+    chunks: AsyncIterable[bytes], max_bytes: int
+) -> AsyncIterator[tempfile.SpooledTemporaryFile]:
+    """Copy a byte stream into a temporary file, yielded rewound to the start.
+
+    Raises BodyTooLarge once more than ``max_bytes`` arrive.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES) as spool:
+        received = 0
+        async for chunk in chunks:
+            received += len(chunk)
+            if received > max_bytes:
+                raise BodyTooLarge
+            spool.write(chunk)
+        spool.seek(0)
+        yield spool
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    drafts: int = 0
+    skipped: int = 0
+
+
+async def _import_batch(
+    db: AsyncSession, project_id: str, batch: list[ChangelogEntry], result: ImportResult
+) -> None:
+    titles = [entry.version for entry in batch]
+    existing = await db.execute(
+        select(Post.title).where(Post.project_id == project_id).where(Post.title.in_(set(titles)))
+    )
+    seen = set(existing.scalars().all())
+    entries = []
+    for entry in batch:
+        if entry.version in seen:
+            result.skipped += 1
+            continue
+        seen.add(entry.version)
+        entries.append({
+            "title": entry.version,
+            "body_markdown": entry.body_markdown,
+            "category": entry.category,
+            "is_published": entry.released_at is not None,
+            "published_at": entry.released_at,
+        })
+    # History, not news: no live events, and bodies that won't be rendered
+    # again stay out of the render cache
+    posts = await create_posts(db, project_id, entries, announce=False, use_cache=False)
+    for post in posts:
+        result.imported += 1
+        if not post.is_published:
+            result.drafts += 1
+        # Keep the session's identity map from growing with the file
+        db.expunge(post)
+    await db.commit()
+
+
+async def import_changelog(
+    db: AsyncSession,
+    project_id: str,
+    chunks: AsyncIterable[bytes],
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportResult:
+    """Stream a changelog into posts for a project, committing after every batch."""
+    result = ImportResult()
+    parser = ChangelogParser()
+    batch: list[ChangelogEntry] = []
+
+    async def _add(entry: ChangelogEntry | None) -> None:
+        if entry is None:
+            return
+        if entry.is_unreleased or not entry.body_markdown:
+            result.skipped += 1
+            return
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            await _import_batch(db, project_id, batch, result)
+            batch.clear()
+
+    async for line in iter_lines(chunks):
+        await _add(parser.feed(line))
+    await _add(parser.close())
+    if batch:
+        await _import_batch(db, project_id, batch, result)
+    return result
@@ -1,9 +1,12 @@
 import asyncio
+import html
 import logging
 import smtplib
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+from app import metrics
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -19,10 +22,18 @@ def _build_html_email(
     accent_color: str,
     unsubscribe_token: str,
 ) -> str:
-    """Build a beautiful HTML email for a new post notification."""
+    """Build a beautiful HTML email for a new post notification.
+
+    ``post_body_html`` is the sanitised rendered body; every other value is
+    escaped here.
+    """
     base_url = settings.base_url.rstrip("/")
-    post_url = f"{base_url}/changelog/{project_slug}/{post_slug}"
-    unsubscribe_url = f"{base_url}/unsubscribe/{unsubscribe_token}"
+    post_url = html.escape(f"{base_url}/changelog/{project_slug}/{post_slug}")
+    unsubscribe_url = html.escape(f"{base_url}/unsubscribe/{unsubscribe_token}")
+    project_name = html.escape(project_name)
+    post_title = html.escape(post_title)
+    post_category_label = html.escape(post_category_label)
+    accent_color = html.escape(accent_color)
 
     return f"""<!DOCTYPE html>
 <html>
@@ -73,20 +84,79 @@ def _build_html_email(
 </html>"""
 
 
+def _build_digest_email(
+    project_name: str,
+    project_slug: str,
+    posts: list[dict],
+    accent_color: str,
+    unsubscribe_token: str,
+) -> str:
+    """Build one HTML email announcing several posts published together."""
+    base_url = settings.base_url.rstrip("/")
+    changelog_url = html.escape(f"{base_url}/changelog/{project_slug}")
+    unsubscribe_url = html.escape(f"{base_url}/unsubscribe/{unsubscribe_token}")
+    project_name = html.escape(project_name)
+    accent_color = html.escape(accent_color)
+    items = "".join(
+        f"""
+                <a href="{changelog_url}/{html.escape(post['slug'])}" style="display: block; padding: 14px 0; border-bottom: 1px solid #f3f4f6; text-decoration: none;">
+                    <span style="display: inline-block; font-size: 11px; font-weight: 600; text-transform: uppercase; letter-spacing: 0.5px; padding: 3px 8px; border-radius: 4px; background-color: {accent_color}15; color: {accent_color};">{html.escape(post['category_label'])}</span>
+                    <span style="display: block; font-size: 16px; font-weight: 600; color: #111827; margin-top: 6px;">{html.escape(post['title'])}</span>
+                </a>"""
+        for post in posts
+    )
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+</head>
+<body style="margin: 0; padding: 0; background-color: #f9fafb; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;">
+    <div style="max-width: 600px; margin: 0 auto; padding: 40px 20px;">
+        <div style="background: #ffffff; border-radius: 12px; border: 1px solid #e5e7eb; overflow: hidden;">
+            <div style="padding: 24px 32px; border-bottom: 1px solid #f3f4f6;">
+                <span style="font-size: 16px; font-weight: 700; color: #111827;">{project_name}</span>
+                <span style="display: block; font-size: 12px; color: #9ca3af;">{len(posts)} new updates published</span>
+            </div>
+            <div style="padding: 16px 32px 32px;">{items}
+                <div style="margin-top: 24px;">
+                    <a href="{changelog_url}" style="display: inline-block; padding: 10px 20px; background-color: {accent_color}; color: #ffffff; text-decoration: none; border-radius: 8px; font-size: 14px; font-weight: 600;">View changelog</a>
+                </div>
+            </div>
+        </div>
+        <div style="text-align: center; padding: 24px 0;">
+            <p style="font-size: 12px; color: #9ca3af; margin: 0;">
+                You're receiving this because you subscribed to {project_name} updates.
+            </p>
+            <p style="font-size: 12px; margin: 8px 0 0 0;">
+                <a href="{unsubscribe_url}" style="color: #9ca3af; text-decoration: underline;">Unsubscribe</a>
+            </p>
+        </div>
+    </div>
+</body>
+</html>"""
+
+
 async def send_email(to_email: str, subject: str, html_body: str) -> bool:
     """Send an email via SMTP. Returns True on success."""
     if not settings.smtp_host:
         logger.warning("SMTP not configured, skipping email to %s", to_email)
         return False
 
+    start = time.perf_counter()
     try:
         loop = asyncio.get_event_loop()
         await loop.run_in_executor(None, _send_email_sync, to_email, subject, html_body)
         logger.info("Email sent to %s", to_email)
+        metrics.email_sent.inc()
         return True
-    except Exception as e:
-        logger.error("Failed to send email to %s: %s", to_email, str(e))
+    except Exception:
+        logger.exception("Failed to send email to %s", to_email)
+        metrics.email_failed.inc()
         return False
+    finally:
+        metrics.email_send_duration.observe(time.perf_counter() - start)
 
 
 def _send_email_sync(to_email: str, subject: str, html_body: str) -> None:
@@ -149,3 +219,36 @@ async def send_post_notification(
 
     logger.info("Sent %d/%d notification emails for post '%s'", sent_count, len(subscribers), post_title)
     return sent_count
+
+
+async def send_digest_notification(
+    subscribers: list,
+    project_name: str,
+    project_slug: str,
+    posts: list[dict],
+    accent_color: str,
+) -> int:
+    """Send one email per subscriber covering several new posts.
+    Each post dict has ``title``, ``slug`` and ``category_label``.
+    Returns the count of successfully sent emails."""
+    if not settings.smtp_host:
+        logger.warning("SMTP not configured, skipping digest for %d subscribers", len(subscribers))
+        return 0
+
+    subject = f"{len(posts)} new updates — {project_name}"
+    sent_count = 0
+
+    for subscriber in subscribers:
+        html_body = _build_digest_email(
+            project_name=project_name,
+            project_slug=project_slug,
+            posts=posts,
+            accent_color=accent_color,
+            unsubscribe_token=subscriber.unsubscribe_token,
+        )
+        success = await send_email(subscriber.email, subject, html_body)
+        if success:
+            sent_count += 1
+
+    logger.info("Sent %d/%d digest emails covering %d posts", sent_count, len(subscribers), len(posts))
+    return sent_count
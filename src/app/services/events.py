@@ -0,0 +1,118 @@
+"""In-process fan-out of post publish/unpublish events to Server-Sent Events clients.
+
+Services call ``queue_event`` while they modify a post. Events ride on the
+session and are only broadcast once that session commits, so listeners never
+hear about a publish that was rolled back. Each SSE connection owns a small
+bounded queue of already-encoded frames; nothing else is kept per connection.
+
+Widget cache invalidation rides on the same hook (``invalidate_widgets``):
+dropping snapshots before the commit would let a widget request in between
+cache the old rows under the new generation.
+
+The hub lives in one process. Under several uvicorn workers a client only sees
+events published by the worker it is connected to.
+"""
+
+import asyncio
+import json
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import metrics
+from app.config import settings
+from app.services import widget_cache
+
+_PENDING_KEY = "pending_post_events"
+_INVALIDATE_KEY = "pending_widget_invalidations"
+
+HEARTBEAT = ": ping\n\n"
+
+
+def format_event(name: str, data: dict) -> str:
+    """Encode one SSE frame."""
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class EventHub:
+    def __init__(self) -> None:
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._count = 0
+
+    @property
+    def connection_count(self) -> int:
+        return self._count
+
+    def project_connection_count(self, project_id: str) -> int:
+        return len(self._subscribers.get(project_id, ()))
+
+    def subscribe(self, project_id: str) -> asyncio.Queue | None:
+        """Register a listener. Returns None when a connection cap is reached."""
+        if self._count >= settings.sse_max_connections:
+            return None
+        if self.project_connection_count(project_id) >= settings.sse_max_connections_per_project:
+            return None
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.sse_queue_size)
+        self._subscribers.setdefault(project_id, set()).add(queue)
+        self._count += 1
+        return queue
+
+    def unsubscribe(self, project_id: str, queue: asyncio.Queue) -> None:
+        listeners = self._subscribers.get(project_id)
+        if not listeners or queue not in listeners:
+            return
+        listeners.discard(queue)
+        self._count -= 1
+        if not listeners:
+            del self._subscribers[project_id]
+
+    def publish(self, project_id: str, name: str, data: dict) -> int:
+        """Send an event to every listener of a project. Returns the number reached."""
+        listeners = self._subscribers.get(project_id)
+        if not listeners:
+            return 0
+        frame = format_event(name, data)
+        for queue in listeners:
+            if queue.full():
+                # Slow consumer: drop its oldest frame rather than block everyone
+                queue.get_nowait()
+            queue.put_nowait(frame)
+        return len(listeners)
+
+    def clear(self) -> None:
+        self._subscribers.clear()
+        self._count = 0
+
+
+hub = EventHub()
+metrics.callback(
+    "sse_connections", "Open widget event streams", lambda: {(): hub.connection_count}
+)
+
+
+def queue_event(db: AsyncSession, project_id: str, name: str, data: dict) -> None:
+    """Schedule an event to be broadcast when ``db`` commits."""
+    db.info.setdefault(_PENDING_KEY, []).append((project_id, name, data))
+    invalidate_widgets(db, project_id)
+
+
+def invalidate_widgets(db: AsyncSession, project_id: str) -> None:
+    """Drop a project's cached widget responses when ``db`` commits."""
+    db.info.setdefault(_INVALIDATE_KEY, set()).add(project_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending_events(session: Session) -> None:
+    # Invalidate first, so a client refetching in response to an event never
+    # reads a stale snapshot
+    for project_id in session.info.pop(_INVALIDATE_KEY, ()):
+        widget_cache.invalidate_project(project_id)
+    for project_id, name, data in session.info.pop(_PENDING_KEY, ()):
+        hub.publish(project_id, name, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_INVALIDATE_KEY, None)
@@ -0,0 +1,143 @@
+"""Idempotency-Key support for programmatic post creation.
+
+The first response for a ``(project, key)`` pair is stored in the
+``idempotency_keys`` table for ``idempotency_key_ttl_hours`` and replayed for
+retries with the same request. Recently used keys are also kept in an
+in-memory LRU, filled only once the creating transaction has committed so a
+rolled-back request is never replayed.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.idempotency_key import IdempotencyKey
+
+_PENDING_KEY = "pending_idempotent_responses"
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    body: str
+    expires_at: datetime
+
+
+_recent: OrderedDict[tuple[str, str], StoredResponse] = OrderedDict()
+
+
+def request_fingerprint(method: str, path: str, payload) -> str:
+    """Hash of the parts of a request that must match for a replay."""
+    canonical = json.dumps([method, path, payload], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _remember(cache_key: tuple[str, str], stored: StoredResponse) -> None:
+    _recent[cache_key] = stored
+    _recent.move_to_end(cache_key)
+    while len(_recent) > settings.idempotency_cache_max_entries:
+        _recent.popitem(last=False)
+
+
+async def get_stored_response(
+    db: AsyncSession, project_id: str, key: str
+) -> StoredResponse | None:
+    """The unexpired response recorded for ``key``, if any."""
+    now = datetime.now(UTC)
+    cache_key = (project_id, key)
+    stored = _recent.get(cache_key)
+    if stored is not None:
+        if stored.expires_at > now:
+            _recent.move_to_end(cache_key)
+            return stored
+        del _recent[cache_key]
+
+    result = await db.execute(
+        select(IdempotencyKey)
+        .where(IdempotencyKey.project_id == project_id)
+        .where(IdempotencyKey.key == key)
+    )
+    record = result.scalar_one_or_none()
+    if record is None:
+        return None
+    expires_at = record.expires_at.replace(tzinfo=UTC)
+    if expires_at <= now:
+        # Free the key so this request can claim it
+        await db.delete(record)
+        await db.flush()
+        return None
+    stored = StoredResponse(
+        fingerprint=record.request_fingerprint,
+        status_code=record.status_code,
+        body=record.response_body,
+        expires_at=expires_at,
+    )
+    _remember(cache_key, stored)
+    return stored
+
+
+async def store_response(
+    db: AsyncSession,
+    project_id: str,
+    key: str,
+    fingerprint: str,
+    status_code: int,
+    body: str,
+) -> bool:
+    """Record the response for ``key``.
+
+    Returns False if another request claimed the key first; the caller should
+    abandon its transaction.
+    """
+    expires_at = datetime.now(UTC) + timedelta(hours=settings.idempotency_key_ttl_hours)
+    db.add(IdempotencyKey(
+        project_id=project_id,
+        key=key,
+        request_fingerprint=fingerprint,
+        status_code=status_code,
+        response_body=body,
+        expires_at=expires_at,
+    ))
+    try:
+        await db.flush()
+    except IntegrityError:
+        return False
+    db.info.setdefault(_PENDING_KEY, []).append((
+        (project_id, key),
+        StoredResponse(
+            fingerprint=fingerprint, status_code=status_code, body=body, expires_at=expires_at
+        ),
+    ))
+    return True
+
+
+async def purge_expired_idempotency_keys(db: AsyncSession) -> int:
+    """Delete expired keys. Returns the number of rows removed."""
+    result = await db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(UTC))
+    )
+    return result.rowcount
+
+
+def clear_idempotency_cache() -> None:
+    _recent.clear()
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_responses(session: Session) -> None:
+    for cache_key, stored in session.info.pop(_PENDING_KEY, ()):
+        _remember(cache_key, stored)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_responses(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
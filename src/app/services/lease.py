@@ -0,0 +1,58 @@
+"""Leases that keep singleton background jobs to one worker at a time."""
+
+import os
+import socket
+import uuid
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.lease import Lease
+
+# Identifies this process as a lease owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def utcnow() -> datetime:
+    """Naive UTC, the form DateTime columns come back in from SQLite."""
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+async def acquire_lease(
+    db: AsyncSession, name: str, seconds: float, owner: str = WORKER_ID
+) -> bool:
+    """Take or renew the lease ``name`` for ``seconds``; False if another owner holds it.
+
+    The caller commits. Until then the row is write-locked, so work done in
+    the same transaction cannot overlap with another worker's.
+    """
+    now = utcnow()
+    expires_at = now + timedelta(seconds=seconds)
+    result = await db.execute(
+        update(Lease)
+        .where(Lease.name == name)
+        .where(or_(Lease.owner == owner, Lease.expires_at < now))
+        .values(owner=owner, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        return True
+    try:
+        async with db.begin_nested():
+            db.add(Lease(name=name, owner=owner, expires_at=expires_at))
+    except IntegrityError:
+        # Row exists and is held by someone else
+        return False
+    return True
+
+
+async def release_lease(db: AsyncSession, name: str, owner: str = WORKER_ID) -> None:
+    """Let another worker take the lease right away instead of waiting for it to expire."""
+    await db.execute(
+        update(Lease)
+        .where(Lease.name == name, Lease.owner == owner)
+        .values(expires_at=datetime(1970, 1, 1))
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,267 @@
+"""Periodic SQLite upkeep, run by one worker at a time.
+
+Without it the database file only grows and the query planner works from
+statistics gathered once, if ever. Jobs:
+
+- ``optimize``: ``ANALYZE`` on first run, ``PRAGMA optimize`` afterwards,
+  both bounded by ``PRAGMA analysis_limit``.
+- ``vacuum``: ``PRAGMA incremental_vacuum`` in small steps to return free
+  pages to the filesystem. Needs ``auto_vacuum=INCREMENTAL``, which new
+  databases get from ``init_db``; convert an existing one once with
+  ``python -m app.cli maintenance --full-vacuum``.
+- ``checkpoint``: a passive WAL checkpoint, or ``TRUNCATE`` once the WAL is
+  over ``MAINTENANCE_WAL_MAX_BYTES``. Skipped unless the database is in WAL
+  mode.
+- ``purge``: deletes expired idempotency keys and long-expired leases in
+  batches.
+
+Each job stops after ``MAINTENANCE_JOB_BUDGET_SECONDS``: work is split into
+short transactions and checked against the deadline between them, and the
+WAL checkpoint waits for readers no longer than that. Whatever is left is
+picked up on the next run. The time of each job's last run and its result
+are kept in a ``JobCheckpoint`` row, so a restarted worker does not repeat
+jobs that just ran.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.models.idempotency_key import IdempotencyKey
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.lease import Lease
+from app.services.lease import acquire_lease, utcnow
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "maintenance"
+CHECKPOINT_PREFIX = "maintenance:"
+# Leases unused for this long belong to jobs that no longer run
+STALE_LEASE_AGE = timedelta(days=1)
+
+
+@dataclass
+class MaintenanceJob:
+    name: str
+    interval: Callable[[], float]
+    run: Callable[[AsyncEngine, float], Awaitable[dict]]
+
+
+def _is_sqlite(engine: AsyncEngine) -> bool:
+    return engine.dialect.name == "sqlite"
+
+
+async def optimize(engine: AsyncEngine, deadline: float) -> dict:
+    """Refresh planner statistics for tables that need it."""
+    if not _is_sqlite(engine):
+        return {"skipped": "not SQLite"}
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql(f"PRAGMA analysis_limit={settings.maintenance_analysis_limit}")
+        analyzed = (await conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        )).scalar()
+        # PRAGMA optimize only re-analyzes tables it has seen queried; the
+        # first run needs statistics for everything
+        await conn.exec_driver_sql("PRAGMA optimize" if analyzed else "ANALYZE")
+        await conn.commit()
+    return {"statement": "PRAGMA optimize" if analyzed else "ANALYZE"}
+
+
+async def incremental_vacuum(engine: AsyncEngine, deadline: float) -> dict:
+    """Release free pages a step at a time until none are left or time runs out."""
+    if not _is_sqlite(engine):
+        return {"skipped": "not SQLite"}
+    async with engine.connect() as conn:
+        if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() != 2:
+            return {"skipped": "auto_vacuum is not INCREMENTAL"}
+        start = remaining = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+        await conn.commit()
+        raw = await conn.get_raw_connection()
+        while remaining and time.monotonic() < deadline:
+            pages = min(remaining, settings.maintenance_vacuum_step_pages)
+            # A plain cursor steps the pragma once and frees a single page;
+            # executescript runs it to completion in its own transaction
+            await raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({pages})")
+            before, remaining = remaining, (
+                await conn.exec_driver_sql("PRAGMA freelist_count")
+            ).scalar()
+            await conn.commit()
+            if remaining >= before:
+                break
+    # Measured rather than requested: a step can free fewer pages than asked,
+    # and other writers can free or reuse pages while this runs
+    freed = max(start - remaining, 0)
+    return {"pages_freed": freed, "pages_free": remaining}
+
+
+def _wal_size(engine: AsyncEngine) -> int:
+    database = engine.url.database
+    if not database or database == ":memory:":
+        return 0
+    try:
+        return os.path.getsize(f"{database}-wal")
+    except OSError:
+        return 0
+
+
+async def wal_checkpoint(engine: AsyncEngine, deadline: float) -> dict:
+    """Copy the WAL back into the database, truncating it once it is over the cap."""
+    if not _is_sqlite(engine):
+        return {"skipped": "not SQLite"}
+    async with engine.connect() as conn:
+        if (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar() != "wal":
+            await conn.commit()
+            return {"skipped": "not in WAL mode"}
+        wal_bytes = _wal_size(engine)
+        mode = "TRUNCATE" if wal_bytes > settings.maintenance_wal_max_bytes else "PASSIVE"
+        await conn.exec_driver_sql(f"PRAGMA journal_size_limit={settings.maintenance_wal_max_bytes}")
+        # TRUNCATE waits for readers to move off the old WAL; never for longer
+        # than the budget. The connection goes back to the pool, so restore it after
+        busy_timeout = (await conn.exec_driver_sql("PRAGMA busy_timeout")).scalar()
+        budget_ms = max(int((deadline - time.monotonic()) * 1000), 0)
+        await conn.exec_driver_sql(f"PRAGMA busy_timeout={budget_ms}")
+        await conn.commit()
+        try:
+            busy, wal_pages, checkpointed = (
+                await conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})")
+            ).one()
+            await conn.commit()
+        finally:
+            await conn.exec_driver_sql(f"PRAGMA busy_timeout={busy_timeout}")
+    return {
+        "mode": mode,
+        "wal_bytes": wal_bytes,
+        "busy": bool(busy),
+        "wal_pages": wal_pages,
+        "checkpointed_pages": checkpointed,
+    }
+
+
+async def _delete_in_batches(engine: AsyncEngine, column, where, deadline: float) -> int:
+    """Delete matching rows ``MAINTENANCE_PURGE_BATCH_SIZE`` at a time, one transaction each."""
+    deleted = 0
+    while time.monotonic() < deadline:
+        batch = select(column).where(where).limit(settings.maintenance_purge_batch_size)
+        async with engine.begin() as conn:
+            result = await conn.execute(delete(column.table).where(column.in_(batch)))
+        deleted += result.rowcount
+        if result.rowcount < settings.maintenance_purge_batch_size:
+            break
+    return deleted
+
+
+async def purge_expired(engine: AsyncEngine, deadline: float) -> dict:
+    now = utcnow()
+    return {
+        "idempotency_keys": await _delete_in_batches(
+            engine, IdempotencyKey.id, IdempotencyKey.expires_at <= now, deadline
+        ),
+        "leases": await _delete_in_batches(
+            engine, Lease.name, Lease.expires_at <= now - STALE_LEASE_AGE, deadline
+        ),
+    }
+
+
+async def enable_incremental_vacuum(engine: AsyncEngine) -> None:
+    """Switch an existing database to ``auto_vacuum=INCREMENTAL``.
+
+    Takes a full ``VACUUM``, which rewrites the whole file and blocks writers
+    until done: run it from the CLI in a quiet moment, not from a worker.
+    """
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+
+
+JOBS = [
+    MaintenanceJob("optimize", lambda: settings.maintenance_interval_seconds, optimize),
+    MaintenanceJob("vacuum", lambda: settings.maintenance_interval_seconds, incremental_vacuum),
+    MaintenanceJob("checkpoint", lambda: settings.maintenance_checkpoint_seconds, wal_checkpoint),
+    MaintenanceJob("purge", lambda: settings.maintenance_interval_seconds, purge_expired),
+]
+
+
+async def run_job(engine: AsyncEngine, session_factory: Callable, job: MaintenanceJob) -> dict:
+    """Run one job within its time budget and record the outcome."""
+    start = time.monotonic()
+    try:
+        result = await job.run(engine, start + settings.maintenance_job_budget_seconds)
+    except Exception as exc:
+        logger.exception("Maintenance job %s failed", job.name)
+        result = {"error": str(exc)}
+    result["seconds"] = round(time.monotonic() - start, 3)
+    async with session_factory() as db:
+        checkpoint = await db.get(JobCheckpoint, CHECKPOINT_PREFIX + job.name)
+        if checkpoint is None:
+            checkpoint = JobCheckpoint(name=CHECKPOINT_PREFIX + job.name)
+            db.add(checkpoint)
+        checkpoint.position = utcnow().isoformat()
+        checkpoint.state = json.dumps(result)
+        await db.commit()
+    logger.info("Maintenance job %s: %s", job.name, result)
+    return result
+
+
+async def job_status(session_factory: Callable) -> dict[str, dict]:
+    """Last run time and result of each job, for the admin page."""
+    async with session_factory() as db:
+        rows = (await db.execute(
+            select(JobCheckpoint).where(JobCheckpoint.name.startswith(CHECKPOINT_PREFIX))
+        )).scalars().all()
+    by_name = {row.name.removeprefix(CHECKPOINT_PREFIX): row for row in rows}
+    return {
+        job.name: {
+            "last_run": by_name[job.name].position if job.name in by_name else None,
+            "result": json.loads(by_name[job.name].state) if job.name in by_name else None,
+            "interval_seconds": job.interval(),
+        }
+        for job in JOBS
+    }
+
+
+async def run_due_jobs(engine: AsyncEngine, session_factory: Callable) -> float:
+    """Run every job whose interval has passed; returns seconds until the next one is due."""
+    async with session_factory() as db:
+        held = await acquire_lease(db, LEASE_NAME, settings.maintenance_lease_seconds)
+        rows = (await db.execute(
+            select(JobCheckpoint.name, JobCheckpoint.position)
+            .where(JobCheckpoint.name.startswith(CHECKPOINT_PREFIX))
+        )).all()
+        await db.commit()
+    if not held:
+        return settings.maintenance_lease_seconds / 2
+
+    last_runs = {
+        name.removeprefix(CHECKPOINT_PREFIX): datetime.fromisoformat(position)
+        for name, position in rows
+        if position
+    }
+    waits = []
+    for job in JOBS:
+        last = last_runs.get(job.name)
+        if last is None or (utcnow() - last).total_seconds() >= job.interval():
+            await run_job(engine, session_factory, job)
+            waits.append(job.interval())
+        else:
+            waits.append(job.interval() - (utcnow() - last).total_seconds())
+    # Renew the lease before it lapses even when no job is due sooner
+    return max(1.0, min(*waits, settings.maintenance_lease_seconds / 2))
+
+
+async def run_maintenance(engine: AsyncEngine, session_factory: Callable) -> None:
+    while True:
+        try:
+            wait = await run_due_jobs(engine, session_factory)
+        except Exception:
+            logger.exception("Maintenance pass failed")
+            wait = settings.maintenance_lease_seconds / 2
+        await asyncio.sleep(wait)
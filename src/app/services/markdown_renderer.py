@@ -0,0 +1,278 @@
+"""Markdown to sanitized HTML.
+
+Building a ``markdown.Markdown`` (and loading its extensions) and a bleach
+``Cleaner`` costs more than converting a typical post, so ``MarkdownRenderer``
+keeps one of each per thread and resets them between documents. Neither is
+thread-safe, which is why they are not shared; the render thread and process
+pools each get their own on first use.
+
+``render`` adds a content-addressed cache in front of the shared renderer:
+entries are keyed by a hash of the markdown and the renderer's
+``config_version``, so changing the extensions, the allow-lists or
+``RENDER_VERSION`` makes every old entry unreachable.
+
+``render_preview`` serves the editor's live preview. It splits the document
+at top-level block boundaries and renders each block through its own cache,
+so a keystroke re-renders only the block being edited.
+
+markdown and bleach are imported on first render rather than at import time:
+most workers only serve stored HTML and never need them.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from app import metrics
+from app.config import settings
+
+if TYPE_CHECKING:
+    import bleach
+    import markdown
+
+# Bump when rendering changes in a way the config fingerprint cannot see,
+# e.g. the dangerous-tag patterns below
+RENDER_VERSION = 1
+
+EXTENSIONS = ("fenced_code", "tables", "nl2br", "sane_lists")
+
+ALLOWED_TAGS = [
+    "a", "abbr", "b", "blockquote", "br", "code", "dd", "del", "details",
+    "div", "dl", "dt", "em", "h1", "h2", "h3", "h4", "h5", "h6", "hr",
+    "i", "img", "kbd", "li", "ol", "p", "pre", "s", "small", "span",
+    "strong", "sub", "summary", "sup", "table", "tbody", "td", "th",
+    "thead", "tr", "ul",
+]
+
+ALLOWED_ATTRIBUTES = {
+    "a": ["href", "title", "rel"],
+    "img": ["src", "alt", "title", "width", "height"],
+    "td": ["align"],
+    "th": ["align"],
+    "code": ["class"],
+    "div": ["class"],
+    "span": ["class"],
+    "pre": ["class"],
+}
+
+_DANGEROUS = r"script|style|iframe|object|embed|form|input|textarea|button"
+# Dangerous tags AND their content, removed before bleach sees the markup
+_DANGEROUS_BLOCKS = re.compile(
+    rf"<\s*({_DANGEROUS})[\s>].*?</\s*\1\s*>", re.DOTALL | re.IGNORECASE
+)
+# Self-closing / unclosed leftovers
+_DANGEROUS_TAGS = re.compile(rf"<\s*/?({_DANGEROUS})\b[^>]*>", re.IGNORECASE)
+
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_LIST_ITEM = re.compile(r"^ {0,3}([-*+]|\d+[.)])\s")
+_QUOTE = re.compile(r"^ {0,3}>")
+# Constructs whose meaning can cross blank lines: link reference definitions
+# and raw HTML blocks. Documents using them are previewed whole.
+_CROSS_BLOCK = re.compile(r"^ {0,3}(\[[^\]]+\]:|<[A-Za-z!/])", re.MULTILINE)
+
+
+class MarkdownRenderer:
+    def __init__(
+        self,
+        extensions=EXTENSIONS,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+    ) -> None:
+        self.extensions = list(extensions)
+        self.tags = list(tags)
+        self.attributes = attributes
+        self._local = threading.local()
+
+    @functools.cached_property
+    def config_version(self) -> str:
+        import bleach
+        import markdown
+
+        fingerprint = json.dumps(
+            [
+                RENDER_VERSION,
+                markdown.__version__,
+                bleach.__version__,
+                self.extensions,
+                sorted(self.tags),
+                {tag: sorted(attrs) for tag, attrs in self.attributes.items()},
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+    def _converters(self) -> tuple[markdown.Markdown, bleach.Cleaner]:
+        local = self._local
+        if not hasattr(local, "markdown"):
+            import bleach
+            import markdown
+
+            local.markdown = markdown.Markdown(extensions=self.extensions)
+            local.cleaner = bleach.Cleaner(tags=self.tags, attributes=self.attributes, strip=True)
+        return local.markdown, local.cleaner
+
+    def render(self, text: str) -> str:
+        md, cleaner = self._converters()
+        # Reset before converting so a previous failure cannot leak state
+        raw_html = md.reset().convert(text)
+        raw_html = _DANGEROUS_BLOCKS.sub("", raw_html)
+        raw_html = _DANGEROUS_TAGS.sub("", raw_html)
+        return cleaner.clean(raw_html)
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered HTML bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, str] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str, config_version: str) -> bytes:
+        return hashlib.sha256(f"{config_version}\0{text}".encode()).digest()
+
+    def get(self, key: bytes) -> str | None:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key: bytes, html: str) -> None:
+        size = len(html)
+        # One huge document should not flush everything else out
+        if size > self.max_bytes // 8:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = html
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+def _block_kind(line: str) -> str | None:
+    if _LIST_ITEM.match(line):
+        return "list"
+    if _QUOTE.match(line):
+        return "quote"
+    return None
+
+
+def split_blocks(text: str) -> list[str]:
+    """Split markdown at blank lines that end a top-level block.
+
+    Fenced code stays whole, and a blank line does not end a list or quote
+    that carries on after it, or a block followed by indented content, since
+    rendering those parts apart would change the HTML. Joining the rendered
+    blocks with newlines gives the same HTML as rendering the whole text.
+    """
+    blocks: list[str] = []
+    current: list[str] = []
+    kinds: set[str] = set()
+    fence = None
+    after_blank = False
+    for line in text.replace("\r\n", "\n").split("\n"):
+        if fence is not None:
+            current.append(line)
+            stripped = line.strip()
+            if stripped.startswith(fence) and set(stripped) == {fence[0]}:
+                fence = None
+            continue
+        if not line.strip():
+            if current:
+                after_blank = True
+                current.append(line)
+            continue
+        if after_blank:
+            continues = line[:1] in (" ", "\t") or _block_kind(line) in kinds
+            if not continues:
+                blocks.append("\n".join(current).strip("\n"))
+                current = []
+                kinds = set()
+            after_blank = False
+        kind = _block_kind(line)
+        if kind is not None:
+            kinds.add(kind)
+        opening = _FENCE.match(line)
+        if opening:
+            fence = opening.group(1)
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current).strip("\n"))
+    return blocks
+
+
+renderer = MarkdownRenderer()
+render_cache = RenderCache(settings.render_cache_max_entries, settings.render_cache_max_bytes)
+# Kept apart so half-typed preview blocks do not evict rendered posts
+preview_cache = RenderCache(settings.preview_cache_max_entries, settings.preview_cache_max_bytes)
+metrics.register_cache(
+    "render",
+    lambda: {"hit": render_cache.hits, "miss": render_cache.misses},
+    lambda: len(render_cache),
+)
+metrics.register_cache(
+    "preview",
+    lambda: {"hit": preview_cache.hits, "miss": preview_cache.misses},
+    lambda: len(preview_cache),
+)
+
+
+def cached_html(text: str) -> tuple[bytes, str | None]:
+    """Cache key for ``text`` and its cached HTML, if any."""
+    key = RenderCache.key(text, renderer.config_version)
+    return key, render_cache.get(key)
+
+
+def render(text: str) -> str:
+    """Render with the shared renderer, reusing the HTML of identical input."""
+    key, html = cached_html(text)
+    if html is None:
+        html = renderer.render(text)
+        render_cache.put(key, html)
+    return html
+
+
+def render_preview(text: str) -> str:
+    """Render ``text`` for the editor preview, re-rendering only changed blocks."""
+    if _CROSS_BLOCK.search(text):
+        return render(text)
+    parts = []
+    for block in split_blocks(text):
+        key = RenderCache.key(block, renderer.config_version)
+        html = preview_cache.get(key)
+        if html is None:
+            html = renderer.render(block)
+            preview_cache.put(key, html)
+        parts.append(html)
+    return "\n".join(parts)
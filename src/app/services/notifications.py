@@ -0,0 +1,57 @@
+"""Subscriber emails for newly published posts."""
+
+from collections.abc import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.email import send_digest_notification, send_post_notification
+from app.services.post import CATEGORIES
+from app.services.project import get_project_by_id
+from app.services.subscriber import get_subscribers_for_project
+
+
+def _category_label(post) -> str:
+    return CATEGORIES.get(post.category, {}).get("label", post.category)
+
+
+async def queue_post_notifications(
+    add_task: Callable,
+    db: AsyncSession,
+    project_id: str,
+    posts: list,
+) -> None:
+    """Queue one notification for newly published posts: a single-post email or a digest.
+
+    ``add_task(func, **kwargs)`` schedules the send, e.g. ``BackgroundTasks.add_task``.
+    """
+    if not posts:
+        return
+    subscribers = await get_subscribers_for_project(db, project_id)
+    if not subscribers:
+        return
+    project = await get_project_by_id(db, project_id)
+    if len(posts) == 1:
+        post = posts[0]
+        add_task(
+            send_post_notification,
+            subscribers=subscribers,
+            project_name=project.name,
+            project_slug=project.slug,
+            post_title=post.title,
+            post_slug=post.slug,
+            post_body_html=post.body_html,
+            post_category_label=_category_label(post),
+            accent_color=project.accent_color,
+        )
+        return
+    add_task(
+        send_digest_notification,
+        subscribers=subscribers,
+        project_name=project.name,
+        project_slug=project.slug,
+        posts=[
+            {"title": post.title, "slug": post.slug, "category_label": _category_label(post)}
+            for post in posts
+        ],
+        accent_color=project.accent_color,
+    )
@@ -1,13 +1,19 @@
+import asyncio
+import base64
+import json
+import multiprocessing
 import re
 import uuid
-from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, datetime
 
-import bleach
-import markdown
-from sqlalchemy import select, func
+from sqlalchemy import String, and_, case, func, or_, select, type_coerce
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, load_only
 
+from app.config import settings
 from app.models.post import Post
+from app.services import events, markdown_renderer
 
 CATEGORIES = {
     "new_feature": {"label": "New Feature", "color": "emerald"},
@@ -16,6 +22,10 @@ CATEGORIES = {
     "announcement": {"label": "Announcement", "color": "purple"},
 }
 
+# Set on a session whose commit changes when the next post is due, so the
+# scheduler re-reads it instead of sleeping through it
+SCHEDULE_CHANGED_KEY = "post_schedule_changed"
+
 
 def slugify(text: str) -> str:
     text = text.lower().strip()
@@ -25,53 +35,77 @@ def slugify(text: str) -> str:
     return text.strip("-")
 
 
-ALLOWED_TAGS = [
-    "a", "abbr", "b", "blockquote", "br", "code", "dd", "del", "details",
-    "div", "dl", "dt", "em", "h1", "h2", "h3", "h4", "h5", "h6", "hr",
-    "i", "img", "kbd", "li", "ol", "p", "pre", "s", "small", "span",
-    "strong", "sub", "summary", "sup", "table", "tbody", "td", "th",
-    "thead", "tr", "ul",
-]
-
-ALLOWED_ATTRIBUTES = {
-    "a": ["href", "title", "rel"],
-    "img": ["src", "alt", "title", "width", "height"],
-    "td": ["align"],
-    "th": ["align"],
-    "code": ["class"],
-    "div": ["class"],
-    "span": ["class"],
-    "pre": ["class"],
-}
+def render_markdown(text: str) -> str:
+    return markdown_renderer.render(text)
 
 
-def render_markdown(text: str) -> str:
-    raw_html = markdown.markdown(
-        text,
-        extensions=["fenced_code", "tables", "nl2br", "sane_lists"],
-    )
-    # Strip dangerous tags AND their content before bleach processes remaining tags
-    dangerous_tags = re.compile(
-        r"<\s*(script|style|iframe|object|embed|form|input|textarea|button)"
-        r"[\s>].*?</\s*\1\s*>",
-        re.DOTALL | re.IGNORECASE,
-    )
-    raw_html = dangerous_tags.sub("", raw_html)
-    # Also strip self-closing / unclosed dangerous tags
-    raw_html = re.sub(
-        r"<\s*/?(script|style|iframe|object|embed|form|input|textarea|button)\b[^>]*>",
-        "",
-        raw_html,
-        flags=re.IGNORECASE,
-    )
-    return bleach.clean(
-        raw_html,
-        tags=ALLOWED_TAGS,
-        attributes=ALLOWED_ATTRIBUTES,
-        strip=True,
+def _render_uncached(text: str) -> str:
+    # Runs in pool workers, whose own cache would never be read again
+    return markdown_renderer.renderer.render(text)
+
+
+_render_pool: ProcessPoolExecutor | None = None
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(
+            max_workers=settings.render_pool_workers or None,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(cancel_futures=True)
+        _render_pool = None
+
+
+async def _render_off_loop(texts: list[str]) -> list[str]:
+    loop = asyncio.get_running_loop()
+    if settings.render_pool_workers < 0 or len(texts) < settings.render_pool_min_batch:
+        return await loop.run_in_executor(None, lambda: [_render_uncached(t) for t in texts])
+    pool = _get_render_pool()
+    return await loop.run_in_executor(
+        None, lambda: list(pool.map(_render_uncached, texts, chunksize=16))
     )
 
 
+async def render_markdown_many(texts: list[str], use_cache: bool = True) -> list[str]:
+    """Render many documents off the event loop.
+
+    Documents already in the render cache, and repeats within the batch, are
+    rendered once at most. Large batches of the rest are spread across a
+    process pool; small ones run in a thread, where process start-up and
+    pickling would cost more than they save. Pass ``use_cache=False`` for
+    one-off passes over many documents that would only churn the cache.
+    """
+    if not use_cache:
+        return await _render_off_loop(texts)
+    lookups = [markdown_renderer.cached_html(text) for text in texts]
+    missing = list(dict.fromkeys(t for t, (_, html) in zip(texts, lookups) if html is None))
+    fresh = {}
+    if missing:
+        fresh = dict(zip(missing, await _render_off_loop(missing)))
+        for text, (key, html) in zip(texts, lookups):
+            if html is None:
+                markdown_renderer.render_cache.put(key, fresh[text])
+    return [html if html is not None else fresh[text] for text, (_, html) in zip(texts, lookups)]
+
+
+def _event_data(post: Post) -> dict:
+    """Payload pushed to live widget listeners when a post changes state."""
+    return {
+        "title": post.title,
+        "slug": post.slug,
+        "category": post.category,
+        "published_at": post.published_at.isoformat() if post.published_at else None,
+    }
+
+
 async def get_posts_for_project(
     db: AsyncSession,
     project_id: str,
@@ -79,7 +113,7 @@ async def get_posts_for_project(
 ) -> list[Post]:
     query = select(Post).where(Post.project_id == project_id)
     if published_only:
-        query = query.where(Post.is_published == True)  # noqa: E712
+        query = query.where(Post.is_published == True)
         query = query.order_by(Post.published_at.desc())
     else:
         query = query.order_by(Post.created_at.desc())
@@ -95,7 +129,7 @@ async def get_published_posts_for_project(
     query = (
         select(Post)
         .where(Post.project_id == project_id)
-        .where(Post.is_published == True)  # noqa: E712
+        .where(Post.is_published == True)
     )
     if category and category in CATEGORIES:
         query = query.where(Post.category == category)
@@ -104,6 +138,136 @@ async def get_published_posts_for_project(
     return list(result.scalars().all())
 
 
+async def get_latest_published_posts_for_projects(
+    db: AsyncSession,
+    project_ids: list[str],
+    limit: int,
+) -> dict[str, list[Post]]:
+    """Top ``limit`` published posts per project, newest first, in one query."""
+    posts_by_project: dict[str, list[Post]] = {project_id: [] for project_id in project_ids}
+    if not project_ids:
+        return posts_by_project
+    ranked = (
+        select(
+            Post,
+            func.row_number()
+            .over(partition_by=Post.project_id, order_by=Post.published_at.desc())
+            .label("rank"),
+        )
+        .where(Post.project_id.in_(project_ids))
+        .where(Post.is_published == True)
+        .subquery()
+    )
+    ranked_post = aliased(Post, ranked)
+    result = await db.execute(
+        select(ranked_post)
+        .where(ranked.c.rank <= limit)
+        .order_by(ranked.c.project_id, ranked.c.rank)
+    )
+    for post in result.scalars().all():
+        posts_by_project[post.project_id].append(post)
+    return posts_by_project
+
+
+def encode_cursor(sort_key: str, post_id: str) -> str:
+    raw = json.dumps([sort_key, post_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+class InvalidCursor(ValueError):
+    """A pagination cursor that ``encode_cursor`` did not produce."""
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Inverse of ``encode_cursor``. Raises InvalidCursor for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_key, post_id = json.loads(raw)
+    except Exception as exc:
+        raise InvalidCursor from exc
+    if not isinstance(sort_key, str) or not isinstance(post_id, str):
+        raise InvalidCursor
+    return sort_key, post_id
+
+
+def _filter_posts(
+    query,
+    project_id: str,
+    published: bool | None,
+    category: str | None,
+    updated_since: datetime | None,
+):
+    query = query.where(Post.project_id == project_id)
+    if published is not None:
+        query = query.where(Post.is_published == published)
+    if category is not None:
+        query = query.where(Post.category == category)
+    if updated_since is not None:
+        if updated_since.tzinfo is not None:
+            updated_since = updated_since.astimezone(UTC).replace(tzinfo=None)
+        # Compare as stored text so rows written by the server default (whole
+        # seconds) and by Python (microseconds) both match the same second.
+        query = query.where(
+            type_coerce(Post.updated_at, String) >= updated_since.strftime("%Y-%m-%d %H:%M:%S")
+        )
+    return query
+
+
+async def get_posts_page(
+    db: AsyncSession,
+    project_id: str,
+    limit: int,
+    cursor: str | None = None,
+    published: bool | None = None,
+    category: str | None = None,
+    updated_since: datetime | None = None,
+    columns: list[str] | None = None,
+) -> tuple[list[Post], str | None]:
+    """One keyset-paginated page of a project's posts, newest first.
+
+    Published-only listings are ordered by ``published_at``, everything else by
+    ``created_at``; ``id`` breaks ties. ``columns`` limits which attributes are
+    loaded. Returns the posts and the cursor for the next page, if any.
+    """
+    sort_column = Post.published_at if published else Post.created_at
+    # Keyset on the stored text: it is what SQLite orders by, so comparisons
+    # stay consistent with ORDER BY whatever timestamp format a row has.
+    sort_key = type_coerce(sort_column, String)
+
+    query = _filter_posts(
+        select(Post, sort_key.label("sort_key")), project_id, published, category, updated_since
+    )
+    if columns is not None:
+        query = query.options(load_only(*(getattr(Post, c) for c in columns)))
+    if cursor is not None:
+        after_key, after_id = decode_cursor(cursor)
+        query = query.where(
+            or_(sort_key < after_key, and_(sort_key == after_key, Post.id < after_id))
+        )
+    query = query.order_by(sort_column.desc(), Post.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_post, last_key = rows[-1]
+        next_cursor = encode_cursor(last_key, last_post.id)
+    return [post for post, _ in rows], next_cursor
+
+
+async def count_posts(
+    db: AsyncSession,
+    project_id: str,
+    published: bool | None = None,
+    category: str | None = None,
+    updated_since: datetime | None = None,
+) -> int:
+    query = _filter_posts(
+        select(func.count(Post.id)), project_id, published, category, updated_since
+    )
+    return (await db.execute(query)).scalar_one()
+
+
 async def get_post_by_id(db: AsyncSession, post_id: str) -> Post | None:
     result = await db.execute(select(Post).where(Post.id == post_id))
     return result.scalar_one_or_none()
@@ -121,23 +285,15 @@ async def get_post_by_slug(
 
 
 async def get_post_counts_for_project(db: AsyncSession, project_id: str) -> dict:
-    total_result = await db.execute(
-        select(func.count(Post.id)).where(Post.project_id == project_id)
-    )
-    published_result = await db.execute(
-        select(func.count(Post.id))
-        .where(Post.project_id == project_id)
-        .where(Post.is_published == True)  # noqa: E712
-    )
-    views_result = await db.execute(
-        select(func.coalesce(func.sum(Post.view_count), 0))
-        .where(Post.project_id == project_id)
+    result = await db.execute(
+        select(
+            func.count(Post.id),
+            func.coalesce(func.sum(case((Post.is_published == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(Post.view_count), 0),
+        ).where(Post.project_id == project_id)
     )
-    return {
-        "total": total_result.scalar_one(),
-        "published": published_result.scalar_one(),
-        "total_views": views_result.scalar_one(),
-    }
+    total, published, total_views = result.one()
+    return {"total": total, "published": published, "total_views": total_views}
 
 
 async def create_post(
@@ -147,6 +303,7 @@ async def create_post(
     body_markdown: str,
     category: str = "improvement",
     is_published: bool = False,
+    scheduled_at: datetime | None = None,
 ) -> Post:
     slug = slugify(title)
     existing = await get_post_by_slug(db, project_id, slug)
@@ -162,14 +319,86 @@ async def create_post(
         body_html=body_html,
         category=category if category in CATEGORIES else "improvement",
         is_published=is_published,
-        published_at=datetime.now(timezone.utc) if is_published else None,
+        published_at=datetime.now(UTC) if is_published else None,
+        scheduled_at=None if is_published else scheduled_at,
         project_id=project_id,
     )
     db.add(post)
     await db.flush()
+    if post.scheduled_at is not None:
+        db.info[SCHEDULE_CHANGED_KEY] = True
+    if is_published:
+        events.queue_event(db, project_id, "published", _event_data(post))
     return post
 
 
+async def create_posts(
+    db: AsyncSession,
+    project_id: str,
+    entries: list[dict],
+    announce: bool = True,
+    use_cache: bool = True,
+) -> list[Post]:
+    """Create many posts with one slug lookup, parallel rendering and one flush.
+
+    Each entry has ``title``, ``body_markdown`` and optionally ``category``,
+    ``is_published``, ``published_at`` (defaults to now when published) and
+    ``scheduled_at`` (ignored for published posts).
+    Published posts produce a single live event for the newest of them, unless
+    ``announce`` is off; widgets are refreshed either way. ``use_cache`` is
+    passed to ``render_markdown_many``.
+    """
+    if not entries:
+        return []
+
+    base_slugs = [slugify(entry["title"]) for entry in entries]
+    result = await db.execute(
+        select(Post.slug)
+        .where(Post.project_id == project_id)
+        .where(Post.slug.in_(set(base_slugs)))
+    )
+    taken = set(result.scalars().all())
+    slugs = []
+    for slug in base_slugs:
+        if slug in taken:
+            slug = f"{slug}-{uuid.uuid4().hex[:6]}"
+        taken.add(slug)
+        slugs.append(slug)
+
+    bodies_html = await render_markdown_many(
+        [entry["body_markdown"] for entry in entries], use_cache=use_cache
+    )
+
+    now = datetime.now(UTC)
+    posts = []
+    for entry, slug, body_html in zip(entries, slugs, bodies_html):
+        is_published = entry.get("is_published", False)
+        category = entry.get("category", "improvement")
+        posts.append(Post(
+            title=entry["title"],
+            slug=slug,
+            body_markdown=entry["body_markdown"],
+            body_html=body_html,
+            category=category if category in CATEGORIES else "improvement",
+            is_published=is_published,
+            published_at=(entry.get("published_at") or now) if is_published else None,
+            scheduled_at=None if is_published else entry.get("scheduled_at"),
+            project_id=project_id,
+        ))
+    db.add_all(posts)
+    await db.flush()
+    if any(post.scheduled_at is not None for post in posts):
+        db.info[SCHEDULE_CHANGED_KEY] = True
+
+    published = [post for post in posts if post.is_published]
+    if published and announce:
+        newest = max(published, key=lambda post: post.published_at)
+        events.queue_event(db, project_id, "published", _event_data(newest))
+    elif published:
+        events.invalidate_widgets(db, project_id)
+    return posts
+
+
 async def update_post(
     db: AsyncSession,
     post: Post,
@@ -179,12 +408,14 @@ async def update_post(
 ) -> Post:
     if title is not None:
         post.title = title
-    if body_markdown is not None:
+    if body_markdown is not None and body_markdown != post.body_markdown:
         post.body_markdown = body_markdown
         post.body_html = render_markdown(body_markdown)
     if category is not None and category in CATEGORIES:
         post.category = category
     await db.flush()
+    if post.is_published:
+        events.invalidate_widgets(db, post.project_id)
     return post
 
 
@@ -194,14 +425,83 @@ async def toggle_publish(db: AsyncSession, post: Post) -> Post:
         post.published_at = None
     else:
         post.is_published = True
-        post.published_at = datetime.now(timezone.utc)
+        post.published_at = datetime.now(UTC)
+        if post.scheduled_at is not None:
+            post.scheduled_at = None
+            db.info[SCHEDULE_CHANGED_KEY] = True
+    await db.flush()
+    events.queue_event(
+        db,
+        post.project_id,
+        "published" if post.is_published else "unpublished",
+        _event_data(post),
+    )
+    return post
+
+
+def parse_schedule_time(value: str, now: datetime | None = None) -> datetime:
+    """Parse an ISO 8601 publish time into naive UTC; naive input is taken as UTC.
+
+    Raises ValueError if it is malformed or not in the future.
+    """
+    try:
+        when = datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError("scheduled time must be an ISO 8601 date and time")
+    if when.tzinfo is not None:
+        when = when.astimezone(UTC).replace(tzinfo=None)
+    now = now or datetime.now(UTC).replace(tzinfo=None)
+    if when <= now:
+        raise ValueError("scheduled time must be in the future")
+    return when
+
+
+async def schedule_post(db: AsyncSession, post: Post, when: datetime) -> Post:
+    """Have the scheduler publish an unpublished post at ``when`` (naive UTC)."""
+    if post.is_published:
+        raise ValueError("post is already published")
+    post.scheduled_at = when
     await db.flush()
+    db.info[SCHEDULE_CHANGED_KEY] = True
     return post
 
 
+async def unschedule_post(db: AsyncSession, post: Post) -> Post:
+    post.scheduled_at = None
+    await db.flush()
+    db.info[SCHEDULE_CHANGED_KEY] = True
+    return post
+
+
+async def publish_due_posts(db: AsyncSession, now: datetime) -> list[Post]:
+    """Publish every post scheduled at or before ``now`` (naive UTC).
+
+    Nothing is committed: the caller publishes the whole set in one
+    transaction. ``published_at`` is the scheduled time, not the moment the
+    scheduler got to it.
+    """
+    result = await db.execute(
+        select(Post)
+        .where(Post.scheduled_at <= now)
+        .where(Post.is_published == False)
+        .order_by(Post.scheduled_at, Post.id)
+    )
+    posts = list(result.scalars().all())
+    for post in posts:
+        post.is_published = True
+        post.published_at = post.scheduled_at
+        post.scheduled_at = None
+    await db.flush()
+    for post in posts:
+        events.queue_event(db, post.project_id, "published", _event_data(post))
+    return posts
+
+
 async def delete_post(db: AsyncSession, post: Post) -> None:
     await db.delete(post)
     await db.flush()
+    if post.is_published:
+        events.queue_event(db, post.project_id, "unpublished", _event_data(post))
 
 
 async def increment_view_count(db: AsyncSession, post: Post) -> None:
@@ -1,10 +1,12 @@
 import re
 import uuid
 
-from sqlalchemy import select, func
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.project import Project
+from app.services import events
+from app.services.api_key import evict_api_keys
 
 
 def slugify(text: str) -> str:
@@ -32,6 +34,13 @@ async def get_project_by_slug(db: AsyncSession, slug: str) -> Project | None:
     return result.scalar_one_or_none()
 
 
+async def get_projects_by_slugs(db: AsyncSession, slugs: list[str]) -> list[Project]:
+    if not slugs:
+        return []
+    result = await db.execute(select(Project).where(Project.slug.in_(slugs)))
+    return list(result.scalars().all())
+
+
 async def get_project_count_for_user(db: AsyncSession, user_id: str) -> int:
     result = await db.execute(
         select(func.count(Project.id)).where(Project.owner_id == user_id)
@@ -83,9 +92,12 @@ async def update_project(
     if accent_color is not None:
         project.accent_color = accent_color
     await db.flush()
+    events.invalidate_widgets(db, project.id)
     return project
 
 
 async def delete_project(db: AsyncSession, project: Project) -> None:
     await db.delete(project)
     await db.flush()
+    events.invalidate_widgets(db, project.id)
+    evict_api_keys(project_id=project.id)
@@ -0,0 +1,195 @@
+"""Regenerate every stored ``Post.body_html`` with the current renderer.
+
+Needed after the allow-lists or markdown extensions change. Posts are read
+in keyset batches ordered by id, rendered across the process pool and
+written back one short transaction per batch, so the site keeps serving
+between batches. Each transaction also records the last id in a
+``JobCheckpoint`` row, and a later run with the same renderer config resumes
+from there. A post edited while its batch is in flight is left alone: the
+write only applies if ``body_markdown`` is still what was rendered.
+The search index is refreshed for the rewritten posts in the same
+transaction.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.post import Post
+from app.services import events, markdown_renderer, search
+from app.services.post import render_markdown_many
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "rerender_posts"
+
+
+@dataclass
+class RerenderProgress:
+    total: int = 0
+    processed: int = 0
+    changed: int = 0
+    resumed_from: str | None = None
+    resumed_processed: int = 0
+    finished: bool = False
+    error: str | None = None
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def posts_per_second(self) -> float:
+        done_this_run = self.processed - self.resumed_processed
+        return done_this_run / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "processed": self.processed,
+            "changed": self.changed,
+            "resumed_from": self.resumed_from,
+            "finished": self.finished,
+            "error": self.error,
+            "elapsed_seconds": round(self.elapsed, 2),
+            "posts_per_second": round(self.posts_per_second, 1),
+        }
+
+
+async def _load_checkpoint(db: AsyncSession, config_version: str) -> tuple[str | None, dict]:
+    checkpoint = await db.get(JobCheckpoint, JOB_NAME)
+    if checkpoint is None:
+        return None, {}
+    state = json.loads(checkpoint.state)
+    if state.get("config_version") != config_version:
+        # Rendered with another config: those rows need rendering again
+        return None, {}
+    return checkpoint.position, state
+
+
+async def rerender_posts(
+    session_factory,
+    batch_size: int | None = None,
+    restart: bool = False,
+    on_batch: Callable[[RerenderProgress], None] | None = None,
+    progress: RerenderProgress | None = None,
+) -> RerenderProgress:
+    """Re-render all posts, resuming from the last checkpoint unless ``restart``."""
+    batch_size = batch_size or settings.rerender_batch_size
+    progress = progress or RerenderProgress()
+    config_version = markdown_renderer.renderer.config_version
+
+    async with session_factory() as db:
+        last_id, state = (None, {}) if restart else await _load_checkpoint(db, config_version)
+        progress.total = (await db.execute(select(func.count(Post.id)))).scalar()
+    progress.resumed_from = last_id
+    progress.processed = progress.resumed_processed = state.get("processed", 0)
+    progress.changed = state.get("changed", 0)
+
+    write = (
+        update(Post.__table__)
+        .where(Post.__table__.c.id == bindparam("post_id"))
+        .where(Post.__table__.c.body_markdown == bindparam("rendered_markdown"))
+        # Re-rendering isn't an edit: keep updated_at so the API's
+        # updated_since filter doesn't report every post as changed
+        .values(body_html=bindparam("new_html"), updated_at=Post.__table__.c.updated_at)
+    )
+    while True:
+        async with session_factory() as db:
+            query = select(Post.id, Post.project_id, Post.body_markdown, Post.body_html)
+            if last_id is not None:
+                query = query.where(Post.id > last_id)
+            rows = (await db.execute(query.order_by(Post.id).limit(batch_size))).all()
+            if not rows:
+                break
+            # End the read transaction so writers are not held up while rendering
+            await db.commit()
+
+            rendered = await render_markdown_many(
+                [row.body_markdown for row in rows], use_cache=False
+            )
+            changes = [
+                {"post_id": row.id, "rendered_markdown": row.body_markdown, "new_html": html}
+                for row, html in zip(rows, rendered)
+                if html != row.body_html
+            ]
+            if changes:
+                await db.execute(write, changes)
+                await search.reindex_posts(db, [c["post_id"] for c in changes])
+                changed_ids = {c["post_id"] for c in changes}
+                for project_id in {row.project_id for row in rows if row.id in changed_ids}:
+                    events.invalidate_widgets(db, project_id)
+            last_id = rows[-1].id
+            progress.processed += len(rows)
+            progress.changed += len(changes)
+            await db.merge(JobCheckpoint(
+                name=JOB_NAME,
+                position=last_id,
+                state=json.dumps({
+                    "config_version": config_version,
+                    "processed": progress.processed,
+                    "changed": progress.changed,
+                }),
+            ))
+            await db.commit()
+        if on_batch is not None:
+            on_batch(progress)
+        # Let requests waiting on the loop (and the database) in between batches
+        await asyncio.sleep(0)
+
+    async with session_factory() as db:
+        await db.execute(delete(JobCheckpoint).where(JobCheckpoint.name == JOB_NAME))
+        await db.commit()
+    progress.finished = True
+    progress.finished_at = time.monotonic()
+    return progress
+
+
+# Admin-triggered runs inside the web process
+_job: asyncio.Task | None = None
+_job_progress: RerenderProgress | None = None
+
+
+def rerender_job_running() -> bool:
+    return _job is not None and not _job.done()
+
+
+def rerender_job_status() -> dict | None:
+    if _job_progress is None:
+        return None
+    return {"running": rerender_job_running(), **_job_progress.as_dict()}
+
+
+def start_rerender_job(session_factory, restart: bool = False) -> bool:
+    """Start a background re-render. Returns False if one is already running."""
+    global _job, _job_progress
+    if rerender_job_running():
+        return False
+    _job_progress = progress = RerenderProgress()
+
+    async def _run() -> None:
+        try:
+            await rerender_posts(session_factory, restart=restart, progress=progress)
+        except Exception as exc:
+            progress.error = str(exc)
+            progress.finished_at = time.monotonic()
+            logger.exception("Post re-render job failed")
+
+    _job = asyncio.create_task(_run())
+    return True
+
+
+def clear_rerender_job() -> None:
+    global _job, _job_progress
+    _job = None
+    _job_progress = None
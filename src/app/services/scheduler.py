@@ -0,0 +1,112 @@
+"""Publishes posts when their ``scheduled_at`` comes due.
+
+The scheduler sleeps until the earliest ``scheduled_at`` (one lookup on
+``ix_posts_scheduled_at``) rather than polling, and with nothing scheduled
+until it is woken. A commit that schedules, reschedules or unschedules a post
+in this worker wakes it early. If another worker holds the lease at that
+point, it tries again once the lease has run out, so the change is seen even
+while the holder sleeps until a later post. ``SCHEDULER_MAX_SLEEP_SECONDS``
+optionally bounds the sleep for workers that accept schedule changes without
+running a scheduler themselves.
+
+Each pass runs in one transaction. It renews the ``scheduler`` lease, flips
+every due post to published and reads the next due time, so only one worker
+publishes at a time and a post is never published twice. Subscribers are
+notified once the transaction has committed. When several posts of a
+project come due together they get one digest.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import Callable
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.post import Post
+from app.services.lease import acquire_lease, utcnow
+from app.services.notifications import queue_post_notifications
+from app.services.post import SCHEDULE_CHANGED_KEY, publish_due_posts
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "scheduler"
+# Wait after a failed pass before trying again
+RETRY_SECONDS = 30.0
+
+_wake = asyncio.Event()
+# Notification sends in flight, referenced so they are not garbage collected
+_sending: set[asyncio.Task] = set()
+
+
+def wake() -> None:
+    """Make the scheduler re-read the next due time now."""
+    _wake.set()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_on_schedule_change(session: Session) -> None:
+    if session.info.pop(SCHEDULE_CHANGED_KEY, False):
+        wake()
+
+
+async def next_due_at(db: AsyncSession):
+    # Same predicate as publish_due_posts, or a published row with a stale
+    # scheduled_at would wake the loop for nothing, over and over
+    return (await db.execute(
+        select(func.min(Post.scheduled_at)).where(Post.is_published == False)
+    )).scalar()
+
+
+def _capped(wait: float | None) -> float | None:
+    max_sleep = settings.scheduler_max_sleep_seconds
+    if max_sleep <= 0:
+        return wait
+    return max_sleep if wait is None else min(wait, max_sleep)
+
+
+async def run_due(session_factory: Callable) -> float | None:
+    """Publish whatever is due; returns how long to sleep, or None to wait for a wake."""
+    sends = []
+    async with session_factory() as db:
+        if not await acquire_lease(db, LEASE_NAME, settings.scheduler_lease_seconds):
+            await db.rollback()
+            # The holder may be asleep until a later post; take over once its lease runs out
+            return _capped(settings.scheduler_lease_seconds)
+        posts = await publish_due_posts(db, utcnow())
+        by_project = defaultdict(list)
+        for post in posts:
+            by_project[post.project_id].append(post)
+        for project_id, project_posts in by_project.items():
+            await queue_post_notifications(
+                lambda send, **kwargs: sends.append((send, kwargs)), db, project_id, project_posts
+            )
+        due = await next_due_at(db)
+        await db.commit()
+
+    if posts:
+        logger.info("Published %d scheduled posts", len(posts))
+    for send, kwargs in sends:
+        task = asyncio.create_task(send(**kwargs))
+        _sending.add(task)
+        task.add_done_callback(_sending.discard)
+    if due is None:
+        return _capped(None)
+    return _capped(max(0.0, (due - utcnow()).total_seconds()))
+
+
+async def run_scheduler(session_factory: Callable) -> None:
+    while True:
+        try:
+            wait = await run_due(session_factory)
+        except Exception:
+            logger.exception("Scheduled publishing failed")
+            wait = RETRY_SECONDS
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=wait)
+        except TimeoutError:
+            pass
+        _wake.clear()
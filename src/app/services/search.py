@@ -0,0 +1,313 @@
+"""Full-text search over post titles and bodies with SQLite FTS5.
+
+``post_search`` holds each post's title, the plain text of its rendered body
+and scope tokens for its project. The FTS5 index ``post_search_fts`` is an
+external-content table over it, kept in sync by triggers. Rows of
+``post_search`` are written from the ORM's flush events, since turning
+``body_html`` into text needs Python, so every change that goes through the
+session is indexed in the same transaction. Core statements that bypass the
+ORM (the bulk re-render) call ``reindex_posts``.
+
+``post_search`` has an INTEGER PRIMARY KEY, so its rowids survive ``VACUUM``.
+A search runs two queries. The first lets FTS5 rank every match in the
+project with bm25, weighing title matches ten times body matches, and keeps
+the best ``limit``. Its cost grows with the number of matching posts, so a
+word found in most of a large project's posts is the slow case. The second
+loads the winning posts with their highlighted title and snippet, which
+would otherwise be built for every match before sorting.
+
+Databases other than SQLite fall back to ``LIKE`` over title and body,
+newest first and without highlighting.
+"""
+
+import html
+import re
+
+from markupsafe import Markup
+from sqlalchemy import column, event, func, inspect, literal_column, or_, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import register_schema_hook
+from app.models.post import Post
+
+CONTENT_TABLE = "post_search"
+FTS_TABLE = "post_search_fts"
+# Title, body, scope: title hits count ten times a body hit
+BM25_WEIGHTS = (10.0, 1.0, 0.0)
+SNIPPET_TOKENS = 16
+BACKFILL_BATCH = 1000
+MAX_QUERY_TERMS = 8
+# Words in nearly every post: they barely change the ranking, but bm25 reads
+# their whole posting list to weigh them
+STOP_WORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in",
+    "is", "it", "of", "on", "or", "that", "the", "this", "to", "was", "we", "with",
+})
+
+# Wrap highlighted terms while the text is still unescaped
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+_TAG = re.compile(r"<[^>]*>")
+_SPACE = re.compile(r"\s+")
+_TERM = re.compile(r"(\w+)(\*?)")
+
+_SCHEMA = [
+    f"""CREATE TABLE {CONTENT_TABLE} (
+        rowid INTEGER PRIMARY KEY,
+        post_id VARCHAR(36) NOT NULL UNIQUE,
+        title TEXT NOT NULL,
+        body TEXT NOT NULL,
+        scope TEXT NOT NULL
+    )""",
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body, scope,
+        content='{CONTENT_TABLE}', content_rowid='rowid',
+        prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {CONTENT_TABLE}_ai AFTER INSERT ON {CONTENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, title, body, scope)
+        VALUES (new.rowid, new.title, new.body, new.scope);
+    END""",
+    f"""CREATE TRIGGER {CONTENT_TABLE}_ad AFTER DELETE ON {CONTENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, body, scope)
+        VALUES ('delete', old.rowid, old.title, old.body, old.scope);
+    END""",
+    f"""CREATE TRIGGER {CONTENT_TABLE}_au AFTER UPDATE ON {CONTENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, body, scope)
+        VALUES ('delete', old.rowid, old.title, old.body, old.scope);
+        INSERT INTO {FTS_TABLE} (rowid, title, body, scope)
+        VALUES (new.rowid, new.title, new.body, new.scope);
+    END""",
+]
+
+_UPSERT = text(
+    f"INSERT INTO {CONTENT_TABLE} (post_id, title, body, scope) "
+    "VALUES (:post_id, :title, :body, :scope) "
+    "ON CONFLICT (post_id) DO UPDATE SET "
+    "title = excluded.title, body = excluded.body, scope = excluded.scope"
+)
+_DELETE = text(f"DELETE FROM {CONTENT_TABLE} WHERE post_id = :post_id")
+_fts = table(FTS_TABLE, column("rowid"))
+_content = table(CONTENT_TABLE, column("rowid"), column("post_id"))
+_fts_ref = literal_column(FTS_TABLE)
+
+
+def html_to_text(value: str) -> str:
+    """Visible text of rendered post HTML."""
+    return _SPACE.sub(" ", html.unescape(_TAG.sub(" ", value))).strip()
+
+
+def scope_token(project_id: str, published: bool = False) -> str:
+    """One FTS token for all of a project's posts, or for its published posts only."""
+    return "p" + project_id.replace("-", "") + ("pub" if published else "")
+
+
+def build_match_query(query: str) -> str | None:
+    """Turn user input into an FTS5 query, or None if it has nothing to search for.
+
+    Every word must match; a word ending in ``*`` also matches as a prefix.
+    Stop words are dropped unless nothing else is left. Words are quoted, so
+    other FTS5 syntax in the input is searched for literally.
+    """
+    terms = _TERM.findall(query.lower())
+    terms = [term for term in terms if term[0] not in STOP_WORDS] or terms
+    if not terms:
+        return None
+    return " ".join(f'"{word}"{star}' for word, star in terms[:MAX_QUERY_TERMS])
+
+
+def _is_sqlite(connection) -> bool:
+    return connection.dialect.name == "sqlite"
+
+
+def _indexed_columns():
+    return Post.id, Post.title, Post.body_html, Post.project_id, Post.is_published
+
+
+def _index_rows(connection, rows) -> None:
+    """Write the search rows for rows of ``_indexed_columns()``."""
+    params = [
+        {
+            "post_id": post_id,
+            "title": title,
+            "body": html_to_text(body_html),
+            "scope": " ".join(
+                scope_token(project_id, published) for published in {False, is_published}
+            ),
+        }
+        for post_id, title, body_html, project_id, is_published in rows
+    ]
+    if params:
+        connection.execute(_UPSERT, params)
+
+
+def create_search_index(connection) -> None:
+    """Create the search tables if missing and fill them from existing posts."""
+    if not _is_sqlite(connection):
+        return
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (FTS_TABLE,)
+    ).scalar()
+    if exists:
+        return
+    for statement in _SCHEMA:
+        connection.exec_driver_sql(statement)
+    # Oldest first, so rowids follow creation order
+    post_ids = connection.execute(
+        select(Post.id).order_by(Post.created_at, Post.id)
+    ).scalars().all()
+    for start in range(0, len(post_ids), BACKFILL_BATCH):
+        batch = post_ids[start:start + BACKFILL_BATCH]
+        rows = {
+            row.id: row
+            for row in connection.execute(select(*_indexed_columns()).where(Post.id.in_(batch)))
+        }
+        _index_rows(connection, [rows[post_id] for post_id in batch])
+    # One segment instead of the many a bulk load leaves behind
+    connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def drop_search_index(connection) -> None:
+    if _is_sqlite(connection):
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {CONTENT_TABLE}")
+
+
+register_schema_hook(FTS_TABLE, create_search_index)
+
+
+@event.listens_for(Post.__table__, "after_create")
+def _create_with_posts(target, connection, **kw) -> None:
+    # Fresh databases (and test fixtures) get the index from create_all
+    create_search_index(connection)
+
+
+@event.listens_for(Post.__table__, "before_drop")
+def _drop_with_posts(target, connection, **kw) -> None:
+    drop_search_index(connection)
+
+
+def _row(post: Post) -> tuple:
+    return post.id, post.title, post.body_html, post.project_id, post.is_published
+
+
+@event.listens_for(Post, "after_insert")
+def _index_inserted(mapper, connection, post: Post) -> None:
+    if _is_sqlite(connection):
+        _index_rows(connection, [_row(post)])
+
+
+@event.listens_for(Post, "after_update")
+def _index_updated(mapper, connection, post: Post) -> None:
+    # View counts and scheduling leave the index alone
+    attrs = inspect(post).attrs
+    if _is_sqlite(connection) and any(
+        getattr(attrs, name).history.has_changes()
+        for name in ("title", "body_html", "is_published")
+    ):
+        _index_rows(connection, [_row(post)])
+
+
+@event.listens_for(Post, "after_delete")
+def _unindex_deleted(mapper, connection, post: Post) -> None:
+    if _is_sqlite(connection):
+        connection.execute(_DELETE, {"post_id": post.id})
+
+
+async def reindex_posts(db: AsyncSession, post_ids: list[str]) -> None:
+    """Re-read and re-index posts changed by statements that bypass the ORM."""
+    if not post_ids or db.bind.dialect.name != "sqlite":
+        return
+    rows = (await db.execute(
+        select(*_indexed_columns()).where(Post.id.in_(post_ids))
+    )).all()
+    connection = await db.connection()
+    await connection.run_sync(_index_rows, rows)
+
+
+def highlight_snippet(value: str) -> Markup:
+    """Escape FTS5 output, turning the term markers into ``<mark>``."""
+    escaped = html.escape(value, quote=False)
+    return Markup(escaped.replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>"))
+
+
+async def search_posts(
+    db: AsyncSession,
+    project_id: str,
+    query: str,
+    published_only: bool = False,
+    category: str | None = None,
+    limit: int = 20,
+) -> list[tuple[Post, Markup, Markup]]:
+    """Best-matching posts of a project for ``query``, optionally in one category.
+
+    Returns ``(post, title, snippet)`` tuples, best first. ``title`` and
+    ``snippet`` are safe HTML with the matched terms in ``<mark>``; the
+    snippet is the part of the body with the most matches, or empty when
+    only the title matched.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+    if db.bind.dialect.name != "sqlite":
+        return await _search_posts_like(db, project_id, query, published_only, category, limit)
+
+    scoped = f'scope : "{scope_token(project_id, published_only)}" AND ({match})'
+    statement = (
+        select(_fts.c.rowid)
+        .where(_fts_ref.match(scoped))
+        .order_by(func.bm25(_fts_ref, *BM25_WEIGHTS))
+        .limit(limit)
+    )
+    if category is not None:
+        statement = (
+            statement
+            .join(_content, _content.c.rowid == _fts.c.rowid)
+            .join(Post, Post.id == _content.c.post_id)
+            .where(Post.category == category)
+        )
+    ranked = (await db.execute(statement)).scalars().all()
+    if not ranked:
+        return []
+    rows = await db.execute(
+        select(
+            _fts.c.rowid,
+            Post,
+            func.highlight(_fts_ref, 0, _MARK_OPEN, _MARK_CLOSE),
+            func.snippet(_fts_ref, 1, _MARK_OPEN, _MARK_CLOSE, "…", SNIPPET_TOKENS),
+        )
+        .select_from(_fts)
+        .join(_content, _content.c.rowid == _fts.c.rowid)
+        .join(Post, Post.id == _content.c.post_id)
+        .where(_fts_ref.match(match))
+        .where(_fts.c.rowid.in_(ranked))
+    )
+    by_rowid = {rowid: (post, title, snippet) for rowid, post, title, snippet in rows}
+    return [
+        (
+            by_rowid[rowid][0],
+            highlight_snippet(by_rowid[rowid][1]),
+            highlight_snippet(by_rowid[rowid][2] if _MARK_OPEN in by_rowid[rowid][2] else ""),
+        )
+        for rowid in ranked
+        if rowid in by_rowid
+    ]
+
+
+async def _search_posts_like(
+    db: AsyncSession,
+    project_id: str,
+    query: str,
+    published_only: bool,
+    category: str | None,
+    limit: int,
+) -> list[tuple[Post, Markup, Markup]]:
+    statement = select(Post).where(Post.project_id == project_id)
+    for word, _ in _TERM.findall(query.lower())[:MAX_QUERY_TERMS]:
+        pattern = f"%{word}%"
+        statement = statement.where(or_(Post.title.ilike(pattern), Post.body_html.ilike(pattern)))
+    if published_only:
+        statement = statement.where(Post.is_published == True)
+    if category is not None:
+        statement = statement.where(Post.category == category)
+    posts = (await db.execute(statement.order_by(Post.created_at.desc()).limit(limit))).scalars()
+    return [(post, Markup.escape(post.title), Markup("")) for post in posts]
@@ -1,7 +1,7 @@
 import re
 import uuid
 
-from sqlalchemy import select, func, delete
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.subscriber import Subscriber
@@ -0,0 +1,134 @@
+"""In-process cache of pre-encoded widget JSON responses.
+
+Entries are keyed by ``(project_slug, variant)``, where the variant is the post
+limit or a name such as ``"latest"``, and hold the exact bytes sent to the
+browser. An entry is fresh for ``widget_cache_ttl_seconds``; after that it is
+still served for up to ``widget_cache_stale_seconds`` while a single background
+task rebuilds it. Writes that change what a widget shows call
+``events.invalidate_widgets``, which runs ``invalidate_project`` once the
+write commits, so it is visible immediately on this worker.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+Key = tuple[str, int | str]
+
+
+@dataclass
+class Snapshot:
+    project_id: str
+    body: bytes
+    created_at: float
+
+
+_snapshots: dict[Key, Snapshot] = {}
+_generations: dict[str, int] = {}
+_refreshing: set[Key] = set()
+_tasks: set[asyncio.Task] = set()
+# Lookups by result since start, for /metrics
+lookups: dict[str, int] = {FRESH: 0, STALE: 0, MISS: 0}
+
+
+def lookup(key: Key) -> tuple[Snapshot | None, str]:
+    """Return the cached snapshot for ``key`` and whether it is fresh or stale."""
+    snapshot, state = _lookup(key)
+    lookups[state] += 1
+    return snapshot, state
+
+
+def _lookup(key: Key) -> tuple[Snapshot | None, str]:
+    if not settings.widget_cache_enabled:
+        return None, MISS
+    snapshot = _snapshots.get(key)
+    if snapshot is None:
+        return None, MISS
+    age = time.monotonic() - snapshot.created_at
+    if age < settings.widget_cache_ttl_seconds:
+        return snapshot, FRESH
+    if age < settings.widget_cache_ttl_seconds + settings.widget_cache_stale_seconds:
+        return snapshot, STALE
+    del _snapshots[key]
+    return None, MISS
+
+
+def size() -> int:
+    return len(_snapshots)
+
+
+metrics.register_cache(
+    "widget",
+    lambda: {"hit": lookups[FRESH], "stale": lookups[STALE], "miss": lookups[MISS]},
+    size,
+)
+
+
+def generation(project_id: str) -> int:
+    """Current invalidation generation for a project.
+
+    Capture it before reading from the database and pass it to ``store`` so a
+    build that raced with a write is discarded instead of cached.
+    """
+    return _generations.get(project_id, 0)
+
+
+def store(key: Key, project_id: str, body: bytes, built_at_generation: int) -> None:
+    if not settings.widget_cache_enabled:
+        return
+    if generation(project_id) != built_at_generation:
+        return
+    _snapshots.pop(key, None)
+    while len(_snapshots) >= settings.widget_cache_max_entries:
+        # Dicts keep insertion order, so the first key is the oldest entry
+        del _snapshots[next(iter(_snapshots))]
+    _snapshots[key] = Snapshot(project_id=project_id, body=body, created_at=time.monotonic())
+
+
+def invalidate_project(project_id: str) -> None:
+    """Drop every cached snapshot for a project."""
+    _generations[project_id] = generation(project_id) + 1
+    for key in [k for k, s in _snapshots.items() if s.project_id == project_id]:
+        del _snapshots[key]
+
+
+def refresh_in_background(key: Key, refresh: Callable[[], Awaitable[None]]) -> bool:
+    """Start ``refresh`` unless one is already running for ``key``.
+
+    Returns True if a new task was started.
+    """
+    if key in _refreshing:
+        return False
+    _refreshing.add(key)
+
+    async def _run() -> None:
+        try:
+            await refresh()
+        except Exception:
+            logger.exception("Widget snapshot refresh failed for %s", key)
+        finally:
+            _refreshing.discard(key)
+
+    task = asyncio.create_task(_run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return True
+
+
+def clear() -> None:
+    _snapshots.clear()
+    _generations.clear()
+    _refreshing.clear()
+    for state in lookups:
+        lookups[state] = 0
@@ -0,0 +1,194 @@
+"""Slow-query log.
+
+Every statement slower than ``SLOW_QUERY_MS`` (default 100) is recorded with
+the shape of its bound parameters (types and lengths, never values), the
+route of the request that ran it and SQLite's ``EXPLAIN QUERY PLAN``, so a
+``SCAN`` where a ``SEARCH ... USING INDEX`` was expected points straight at
+a missing index. The last ``SLOW_QUERY_KEEP`` entries are kept in memory
+for ``/admin/slow-queries``; with ``SLOW_QUERY_LOG_FILE`` set they are also
+appended to that file as JSON lines, rotated at ``SLOW_QUERY_LOG_MAX_BYTES``.
+
+Plans are cached per statement text, so a statement that is slow on every
+request is only explained once.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+_PLAN_CACHE_SIZE = 256
+
+_scope: ContextVar[dict | None] = ContextVar("slow_query_scope", default=None)
+_entries: deque["SlowQuery"] = deque()
+_plans: OrderedDict[str, list[str]] = OrderedDict()
+_file_logger: logging.Logger | None = None
+
+
+@dataclass
+class SlowQuery:
+    at: float
+    duration_ms: float
+    statement: str
+    parameters: str
+    route: str
+    plan: list[str]
+
+
+def _value_shape(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """Describe bound parameters by type and length without their values."""
+    if executemany:
+        rows = list(parameters)
+        return f"{len(rows)} x {parameter_shape(rows[0])}" if rows else "0 x ()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {_value_shape(v)}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (tuple, list)):
+        return "(" + ", ".join(_value_shape(v) for v in parameters) + ")"
+    return _value_shape(parameters)
+
+
+def _format_plan(rows) -> list[str]:
+    """Indent SQLite's (id, parent, notused, detail) rows into a tree."""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def _explain(conn, statement: str, parameters) -> list[str]:
+    if statement in _plans:
+        _plans.move_to_end(statement)
+        return _plans[statement]
+    if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            plan = _format_plan(cursor.fetchall())
+        finally:
+            cursor.close()
+    except conn.dialect.dbapi.Error as exc:
+        # Never let diagnostics break the query that was just run
+        plan = [f"EXPLAIN failed: {exc}"]
+    _plans[statement] = plan
+    while len(_plans) > _PLAN_CACHE_SIZE:
+        _plans.popitem(last=False)
+    return plan
+
+
+def _route() -> str:
+    scope = _scope.get()
+    if scope is None:
+        return "-"
+    path = getattr(scope.get("route"), "path", None) or scope["path"]
+    return f"{scope['method']} {path}"
+
+
+def _log_to_file(entry: SlowQuery) -> None:
+    global _file_logger
+    if not settings.slow_query_log_file:
+        return
+    if _file_logger is None:
+        from logging.handlers import RotatingFileHandler
+
+        _file_logger = logging.getLogger(f"{__name__}.file")
+        _file_logger.propagate = False
+        _file_logger.setLevel(logging.INFO)
+        _file_logger.addHandler(RotatingFileHandler(
+            settings.slow_query_log_file,
+            maxBytes=settings.slow_query_log_max_bytes,
+            backupCount=settings.slow_query_log_backups,
+        ))
+    # A short blocking write, but only for statements that were already slow
+    _file_logger.info(json.dumps(asdict(entry)))
+
+
+def record(entry: SlowQuery) -> None:
+    _entries.append(entry)
+    while len(_entries) > settings.slow_query_keep:
+        _entries.popleft()
+    logger.warning(
+        "Slow query (%.1fms) on %s: %s", entry.duration_ms, entry.route,
+        " ".join(entry.statement.split())[:300],
+    )
+    _log_to_file(entry)
+
+
+def recent() -> list[dict]:
+    """Recorded slow queries, newest first."""
+    return [asdict(entry) for entry in reversed(_entries)]
+
+
+def clear() -> None:
+    global _file_logger
+    _entries.clear()
+    _plans.clear()
+    if _file_logger is not None:
+        for handler in _file_logger.handlers[:]:
+            _file_logger.removeHandler(handler)
+            handler.close()
+        _file_logger = None
+
+
+# Timed on the execution context, so a statement that raises leaves nothing
+# behind on the pooled connection
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if settings.slow_query_ms > 0 and context is not None:
+        context._slow_query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _check_duration(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_slow_query_started", None)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms < settings.slow_query_ms:
+        return
+    record(SlowQuery(
+        at=time.time(),
+        duration_ms=round(elapsed_ms, 3),
+        statement=statement,
+        parameters=parameter_shape(parameters, executemany),
+        route=_route(),
+        plan=[] if executemany else _explain(conn, statement, parameters),
+    ))
+
+
+class SlowQueryMiddleware:
+    """Remembers the current request so slow statements can name their route."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope.reset(token)
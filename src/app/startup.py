@@ -0,0 +1,115 @@
+"""Where a worker's boot time goes.
+
+``startup_profile`` records how long importing the app and each lifespan
+step took in this process; it is logged once the app is ready and reported
+under ``startup`` in ``GET /admin/runtime``. ``profile_cold_start`` boots
+the app in a fresh interpreter under ``python -X importtime`` to break the
+import down per module, for ``python -m app.cli startup-profile``.
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Import of app.main plus the fast-boot lifespan, enforced by tests/test_startup.py
+COLD_START_BUDGET_SECONDS = 3.0
+
+
+@dataclass
+class StartupProfile:
+    steps: dict[str, float] = field(default_factory=dict)
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = time.perf_counter() - start
+
+    def record(self, name: str, seconds: float) -> None:
+        self.steps[name] = seconds
+
+    @property
+    def total(self) -> float:
+        return sum(self.steps.values())
+
+    def snapshot(self) -> dict:
+        return {
+            "steps_ms": {name: round(s * 1000, 1) for name, s in self.steps.items()},
+            "total_ms": round(self.total * 1000, 1),
+        }
+
+    def log(self) -> None:
+        steps = ", ".join(f"{name} {s * 1000:.0f}ms" for name, s in self.steps.items())
+        logger.info("Started in %.0fms (%s)", self.total * 1000, steps)
+
+
+startup_profile = StartupProfile()
+
+
+@dataclass
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+@dataclass
+class ColdStart:
+    steps: dict[str, float]
+    imports: list[ImportTime]
+
+    @property
+    def total(self) -> float:
+        return sum(self.steps.values())
+
+
+_BOOT_SCRIPT = """
+import asyncio, json
+from app.main import app, lifespan
+from app.startup import startup_profile
+
+async def boot():
+    async with lifespan(app):
+        pass
+
+asyncio.run(boot())
+print(json.dumps(startup_profile.steps))
+"""
+
+
+def profile_cold_start(env: dict[str, str] | None = None) -> ColdStart:
+    """Boot the app in a fresh interpreter and return its startup profile.
+
+    Runs under ``python -X importtime`` so every module imported on the way
+    is timed too. ``env`` is added to the current environment.
+    """
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, sys.path)),
+        **(env or {}),
+    }
+    try:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _BOOT_SCRIPT],
+            capture_output=True, text=True, env=env, check=True,
+        )
+    except subprocess.CalledProcessError as exc:
+        raise RuntimeError(
+            f"Boot failed with exit code {exc.returncode}:\n{exc.stderr[-2000:]}"
+        ) from exc
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append(ImportTime(name.strip(), int(self_us), int(cumulative_us)))
+    return ColdStart(json.loads(result.stdout.splitlines()[-1]), imports)
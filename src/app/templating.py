@@ -0,0 +1,52 @@
+"""The one Jinja environment every router renders with.
+
+Routers used to build their own ``Jinja2Templates``, so each page was parsed
+and compiled once per router and held in several template caches. Sharing
+one environment compiles each template once per process; the bytecode cache
+lets new workers load the compiled code from disk instead of re-parsing, and
+``precompile_templates`` runs at startup so no request pays for compilation.
+Outside debug mode templates are never re-checked against the filesystem.
+"""
+
+from pathlib import Path
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from app.config import settings
+from app.query_stats import debug_toolbar_stats
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+
+def _bytecode_cache() -> FileSystemBytecodeCache:
+    if not settings.template_bytecode_cache_dir:
+        # Per-user directory under the system temp dir
+        return FileSystemBytecodeCache()
+    directory = Path(settings.template_bytecode_cache_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    return FileSystemBytecodeCache(str(directory))
+
+
+def create_environment() -> Environment:
+    return Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        bytecode_cache=_bytecode_cache(),
+        auto_reload=settings.debug,
+        # Keep every compiled template; the set is small and fixed
+        cache_size=-1,
+    )
+
+
+env = create_environment()
+env.globals["debug_toolbar_stats"] = debug_toolbar_stats
+templates = Jinja2Templates(env=env)
+
+
+def precompile_templates() -> int:
+    """Load every template into the environment's cache; returns the count."""
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
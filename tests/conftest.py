@@ -1,9 +1,41 @@
+from contextlib import contextmanager
+
 import pytest
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from app import metrics, slow_queries
 from app.database import Base, get_db
 from app.main import app
+from app.profiler import clear_profiles
+from app.query_stats import track_queries
+from app.services import events, markdown_renderer, widget_cache
+from app.services.api_key import clear_api_key_cache
+from app.services.auth import clear_auth_caches, password_hash_stats
+from app.services.idempotency import clear_idempotency_cache
+from app.services.rerender import clear_rerender_job
+
+
+def _clear_caches():
+    widget_cache.clear()
+    events.hub.clear()
+    clear_api_key_cache()
+    clear_idempotency_cache()
+    password_hash_stats.reset()
+    clear_auth_caches()
+    markdown_renderer.render_cache.clear()
+    markdown_renderer.preview_cache.clear()
+    clear_rerender_job()
+    metrics.reset()
+    clear_profiles()
+    slow_queries.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    _clear_caches()
+    yield
+    _clear_caches()
 
 
 @pytest.fixture
@@ -42,3 +74,18 @@ async def client(db_engine):
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def query_budget():
+    """``with query_budget(n): ...`` fails if the block runs more than n statements."""
+
+    @contextmanager
+    def budget(max_queries: int):
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, (
+            f"query budget of {max_queries} exceeded:\n{stats.report()}"
+        )
+
+    return budget
@@ -2,6 +2,18 @@ import re
 
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app.services.api_key import (
+    create_api_key,
+    delete_api_key,
+    flush_last_used,
+    pending_last_used_count,
+    verify_api_key,
+)
+from app.services.auth import create_user
+from app.services.project import create_project
 
 
 async def _setup_project(client: AsyncClient) -> dict:
@@ -139,3 +151,116 @@ async def test_api_key_other_user_denied(client: AsyncClient):
 
     resp = await client.get(f"/projects/{info['project_id']}/api-keys")
     assert resp.status_code == 404
+
+
+# --- Verification cache ---
+
+async def _make_key(db_session):
+    user = await create_user(db_session, "cache@test.com", "cacheuser", "password123")
+    project = await create_project(db_session, name="Cache Project", owner_id=user.id)
+    api_key, raw_key = await create_api_key(db_session, project.id, "CI")
+    await db_session.commit()
+    return project, api_key, raw_key
+
+
+def _count_queries(db_session) -> list:
+    statements = []
+    event.listen(
+        db_session.bind.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+async def test_verify_api_key_cached_without_db_round_trip(db_session):
+    """A repeat verification is answered from memory."""
+    project, _, raw_key = await _make_key(db_session)
+    first = await verify_api_key(db_session, raw_key)
+    assert first.project_id == project.id
+
+    statements = _count_queries(db_session)
+    second = await verify_api_key(db_session, raw_key)
+    assert second == first
+    assert statements == []
+
+
+async def test_verify_api_key_invalid(db_session):
+    await _make_key(db_session)
+    assert await verify_api_key(db_session, "cpk_not_a_real_key") is None
+
+
+async def test_delete_api_key_evicts_cache(db_session):
+    """A deleted key stops verifying immediately."""
+    project, api_key, raw_key = await _make_key(db_session)
+    assert await verify_api_key(db_session, raw_key) is not None
+    assert await delete_api_key(db_session, api_key.id, project.id)
+    await db_session.commit()
+    assert await verify_api_key(db_session, raw_key) is None
+
+
+async def test_last_used_at_flushed_in_batch(db_session):
+    """Uses are buffered and written by a single flush."""
+    _, api_key, raw_key = await _make_key(db_session)
+    for _ in range(3):
+        await verify_api_key(db_session, raw_key)
+    await db_session.refresh(api_key)
+    assert api_key.last_used_at is None
+
+    assert await flush_last_used(db_session) == 1
+    await db_session.commit()
+    await db_session.refresh(api_key)
+    assert api_key.last_used_at is not None
+    assert await flush_last_used(db_session) == 0
+
+
+async def test_failed_flush_keeps_buffered_last_used(db_session, monkeypatch):
+    """A flush that fails leaves its values queued for the next one."""
+    _, api_key, raw_key = await _make_key(db_session)
+    await verify_api_key(db_session, raw_key)
+
+    async def failing_execute(*args, **kwargs):
+        raise OperationalError("UPDATE api_keys", {}, Exception("database is locked"))
+
+    with monkeypatch.context() as m:
+        m.setattr(db_session, "execute", failing_execute)
+        with pytest.raises(OperationalError):
+            await flush_last_used(db_session)
+    assert pending_last_used_count() == 1
+
+    assert await flush_last_used(db_session) == 1
+    await db_session.commit()
+    await db_session.refresh(api_key)
+    assert api_key.last_used_at is not None
+
+
+async def test_failed_commit_keeps_buffered_last_used(db_session, monkeypatch):
+    """A batch whose commit fails is retried by the next flush."""
+    _, api_key, raw_key = await _make_key(db_session)
+    await verify_api_key(db_session, raw_key)
+
+    async def failing_commit():
+        raise OperationalError("COMMIT", {}, Exception("database is locked"))
+
+    with monkeypatch.context() as m:
+        m.setattr(db_session, "commit", failing_commit)
+        with pytest.raises(OperationalError):
+            await flush_last_used(db_session, commit=True)
+    assert pending_last_used_count() == 1
+    await db_session.rollback()
+
+    assert await flush_last_used(db_session, commit=True) == 1
+    await db_session.refresh(api_key)
+    assert api_key.last_used_at is not None
+    assert pending_last_used_count() == 0
+
+
+async def test_api_keys_page_shows_buffered_last_used(client: AsyncClient):
+    """The dashboard flushes pending usage before listing keys."""
+    info = await _setup_project(client)
+    resp = await client.post(
+        f"/projects/{info['project_id']}/api-keys", data={"name": "Usage Key"}
+    )
+    raw_key = re.search(r"(cpk_[A-Za-z0-9_-]+)", resp.text).group(1)
+    await client.get("/api/v1/posts", headers={"Authorization": f"Bearer {raw_key}"})
+    resp = await client.get(f"/projects/{info['project_id']}/api-keys")
+    assert "Last used" in resp.text
@@ -1,4 +1,12 @@
+import asyncio
+import time
+
 import pytest
+from sqlalchemy import event, select
+
+from app.config import settings
+from app.models import User
+from app.services import auth as auth_service
 
 
 @pytest.mark.asyncio
@@ -204,7 +212,7 @@ async def test_login_empty_fields(client):
 @pytest.mark.asyncio
 async def test_logout(client):
     # Register and get auth cookie
-    reg_response = await client.post(
+    await client.post(
         "/register",
         data={
             "email": "test@example.com",
@@ -313,3 +321,148 @@ async def test_404_page_renders_html(client):
     assert response.status_code == 404
     assert "Page not found" in response.text
     assert "Go to Dashboard" in response.text
+
+
+async def _register(client, email="test@example.com", username="testuser"):
+    return await client.post(
+        "/register",
+        data={"email": email, "username": username, "password": "securepass123"},
+        follow_redirects=False,
+    )
+
+
+@pytest.mark.asyncio
+async def test_login_does_not_block_event_loop(client, monkeypatch):
+    """Password checks run off the loop, so other requests are served meanwhile."""
+    await _register(client)
+    real_verify = auth_service.verify_password
+
+    def slow_verify(plain, hashed):
+        time.sleep(0.5)
+        return real_verify(plain, hashed)
+
+    monkeypatch.setattr(auth_service, "verify_password", slow_verify)
+    login = asyncio.create_task(client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "securepass123"},
+        follow_redirects=False,
+    ))
+    await asyncio.sleep(0.1)
+    started = time.perf_counter()
+    health = await client.get("/health")
+    assert time.perf_counter() - started < 0.3
+    assert health.status_code == 200
+    assert auth_service.password_hash_stats.in_flight == 1
+    assert (await login).status_code == 302
+
+    stats = auth_service.password_hash_stats.snapshot()
+    assert stats["in_flight"] == 0
+    assert stats["login_ms_p50"] >= 500
+
+
+@pytest.mark.asyncio
+async def test_login_returns_503_when_hashing_queue_full(client, monkeypatch):
+    await _register(client)
+    monkeypatch.setattr(settings, "password_hash_max_pending", 0)
+    response = await client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "securepass123"},
+        follow_redirects=False,
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    assert "try again" in response.text
+    assert auth_service.password_hash_stats.snapshot()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_register_returns_503_when_hashing_queue_full(client, monkeypatch):
+    monkeypatch.setattr(settings, "password_hash_max_pending", 0)
+    response = await _register(client)
+    assert response.status_code == 503
+    assert "access_token" not in response.cookies
+
+
+def _user_queries(engine) -> list:
+    statements = []
+    event.listen(
+        engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement)
+        if "FROM users" in statement else None,
+    )
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_authenticated_requests_skip_users_query(client, db_engine):
+    reg = await _register(client)
+    client.cookies.set("access_token", reg.cookies.get("access_token"))
+    assert (await client.get("/dashboard")).status_code == 200
+
+    statements = _user_queries(db_engine)
+    response = await client.get("/dashboard")
+    assert response.status_code == 200
+    assert "testuser" in response.text.lower()
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_user_cache_evicted_on_update(client, db_session):
+    reg = await _register(client)
+    client.cookies.set("access_token", reg.cookies.get("access_token"))
+    await client.get("/dashboard")
+
+    user = (await db_session.execute(select(User))).scalar_one()
+    user.display_name = "Renamed Person"
+    await db_session.commit()
+
+    response = await client.get("/dashboard")
+    assert "Renamed Person" in response.text
+
+
+@pytest.mark.asyncio
+async def test_user_cache_evicted_only_after_commit(client, db_session):
+    reg = await _register(client)
+    client.cookies.set("access_token", reg.cookies.get("access_token"))
+    await client.get("/dashboard")
+    user = (await db_session.execute(select(User))).scalar_one()
+    user_id = user.id
+    assert user_id in auth_service._users
+
+    user.display_name = "Flushed Only"
+    await db_session.flush()
+    assert user_id in auth_service._users
+    await db_session.rollback()
+    assert user_id in auth_service._users
+
+    user = await db_session.get(User, user_id)
+    user.display_name = "Committed"
+    await db_session.flush()
+    assert user_id in auth_service._users
+    await db_session.commit()
+    assert user_id not in auth_service._users
+
+
+@pytest.mark.asyncio
+async def test_user_cache_expires(client, monkeypatch):
+    monkeypatch.setattr(settings, "user_cache_ttl_seconds", 0)
+    reg = await _register(client)
+    client.cookies.set("access_token", reg.cookies.get("access_token"))
+    assert (await client.get("/dashboard")).status_code == 200
+    assert auth_service._users == {}
+
+
+def test_decode_access_token_remembers_verified_tokens(monkeypatch):
+    token = auth_service.create_access_token("user-1")
+    assert auth_service.decode_access_token(token) == "user-1"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("signature should not be verified again")
+
+    monkeypatch.setattr(auth_service.jwt, "decode", fail)
+    assert auth_service.decode_access_token(token) == "user-1"
+
+
+def test_decode_access_token_rejects_tampered_token():
+    token = auth_service.create_access_token("user-1")
+    assert auth_service.decode_access_token(token[:-2] + "xx") is None
@@ -0,0 +1,52 @@
+import random
+
+from app.config import settings
+from benchmarks.load.data import markdown_body
+from benchmarks.load.report import compare, percentile, summarize
+from benchmarks.load.runner import run
+from benchmarks.load.scenarios import SCENARIOS
+
+
+def test_markdown_generator_is_seeded():
+    first = [markdown_body(random.Random(7)) for _ in range(3)]
+    assert first == [markdown_body(random.Random(7)) for _ in range(3)]
+    rng = random.Random(7)
+    sizes = sorted(len(markdown_body(rng)) for _ in range(200))
+    assert 500 < sizes[100] < 2500
+    assert sizes[-1] <= 51_000
+
+
+def test_summary_percentiles():
+    assert percentile([1, 2, 3, 4], 50) == 2
+    summary = summarize([i / 1000 for i in range(1, 101)], errors=1, elapsed=2.0)
+    assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (50.0, 95.0, 99.0)
+    assert summary["throughput_rps"] == 50.0
+    assert summary["errors"] == 1
+
+
+def test_compare_flags_regressions():
+    def report(p95, rps):
+        return {"scenarios": {"widget_polling": {
+            "p50_ms": 1.0, "p95_ms": p95, "p99_ms": 3.0, "throughput_rps": rps,
+        }}}
+
+    _, regressions = compare(report(10.0, 100.0), report(10.5, 98.0), threshold_pct=10)
+    assert regressions == []
+    _, regressions = compare(report(10.0, 100.0), report(12.0, 100.0), threshold_pct=10)
+    assert regressions == ["widget_polling"]
+    rows, regressions = compare(report(10.0, 100.0), report(10.0, 80.0), threshold_pct=10)
+    assert regressions == ["widget_polling"]
+    assert rows[0]["throughput_rps"] == (100.0, 80.0, -20.0)
+
+
+async def test_every_scenario_runs():
+    smtp_host = settings.smtp_host
+    report = await run(
+        seed=3, scale="small", scenarios=list(SCENARIOS), concurrency=2, requests=2, warmup=0
+    )
+    assert settings.smtp_host == smtp_host
+    for name, result in report["scenarios"].items():
+        assert result["requests"] == 2
+        assert result["errors"] == 0, name
+    fanout = report["scenarios"]["publish_fanout"]
+    assert fanout["emails_delivered"] == fanout["emails_expected"] == 40
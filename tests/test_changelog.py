@@ -81,7 +81,7 @@ async def test_public_changelog_page(client):
 @pytest.mark.asyncio
 async def test_public_changelog_shows_project_name(client):
     await register_and_login(client)
-    project_id, slug = await create_project_with_slug(client, name="Awesome App")
+    _, slug = await create_project_with_slug(client, name="Awesome App")
 
     client.cookies.clear()
     response = await client.get(f"/changelog/{slug}")
@@ -131,7 +131,7 @@ async def test_public_changelog_filter_by_category(client):
 @pytest.mark.asyncio
 async def test_public_changelog_empty(client):
     await register_and_login(client)
-    project_id, slug = await create_project_with_slug(client)
+    _, slug = await create_project_with_slug(client)
 
     client.cookies.clear()
     response = await client.get(f"/changelog/{slug}")
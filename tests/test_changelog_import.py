@@ -0,0 +1,186 @@
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+
+from app.cli import main as cli_main
+from app.models import Post
+from app.services import events, markdown_renderer
+from app.services.auth import create_user
+from app.services.changelog_import import ChangelogParser, import_changelog
+from app.services.project import create_project
+from tests.test_programmatic_api import _setup_project_with_api_key
+
+KEEP_A_CHANGELOG = """# Changelog
+All notable changes to this project will be documented in this file.
+
+## [Unreleased]
+### Added
+- Something in progress
+
+## [1.1.0] - 2024-03-05
+### Fixed
+- Crash on startup
+
+### Added
+- Dark mode
+
+```
+## [9.9.9] - 2099-01-01
+```
+
+## [1.0.1] - 2024-02-01
+### Fixed
+- Typo in the **settings** page
+
+## 1.0.0
+Initial release.
+
+[unreleased]: https://example.com/compare/v1.1.0...HEAD
+[1.1.0]: https://example.com/compare/v1.0.1...v1.1.0
+"""
+
+
+async def _chunks(text: str, size: int = 7):
+    data = text.encode()
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _parse(text: str):
+    parser = ChangelogParser()
+    entries = [parser.feed(line) for line in text.splitlines()]
+    entries.append(parser.close())
+    return [entry for entry in entries if entry is not None]
+
+
+def test_parser_splits_versions_and_maps_sections():
+    entries = _parse(KEEP_A_CHANGELOG)
+    assert [e.version for e in entries] == ["Unreleased", "1.1.0", "1.0.1", "1.0.0"]
+
+    minor = entries[1]
+    assert minor.released_at == datetime(2024, 3, 5, tzinfo=minor.released_at.tzinfo)
+    assert minor.categories == {"bugfix", "new_feature"}
+    assert minor.category == "new_feature"
+    # Headings inside code fences are content, not new versions
+    assert "## [9.9.9] - 2099-01-01" in minor.body_markdown
+
+    assert entries[2].category == "bugfix"
+    assert entries[3].released_at is None
+    assert entries[3].category == "improvement"
+    # Version link references are dropped
+    assert "example.com" not in entries[3].body_markdown
+
+
+def test_parser_accepts_common_heading_styles():
+    entries = _parse("# v2.0.0 (2023-12-31)\n- Big\n## 1.9.0-beta.1 – 2023-11-02\n- Beta\n")
+    assert [e.version for e in entries] == ["v2.0.0", "1.9.0-beta.1"]
+    assert entries[0].released_at.year == 2023
+    assert entries[1].released_at.month == 11
+
+
+async def test_import_changelog_creates_posts(db_session):
+    user = await create_user(db_session, "import@test.com", "importer", "password123")
+    project = await create_project(db_session, name="Import Project", owner_id=user.id)
+
+    result = await import_changelog(db_session, project.id, _chunks(KEEP_A_CHANGELOG))
+    await db_session.commit()
+    assert (result.imported, result.drafts, result.skipped) == (3, 1, 1)
+
+    posts = {
+        post.title: post
+        for post in (await db_session.execute(select(Post).where(Post.project_id == project.id)))
+        .scalars()
+    }
+    assert set(posts) == {"1.1.0", "1.0.1", "1.0.0"}
+    assert posts["1.0.1"].is_published
+    assert posts["1.0.1"].published_at.date().isoformat() == "2024-02-01"
+    assert "<strong>settings</strong>" in posts["1.0.1"].body_html
+    assert not posts["1.0.0"].is_published
+
+    # Re-importing skips versions that already exist
+    again = await import_changelog(db_session, project.id, _chunks(KEEP_A_CHANGELOG))
+    assert (again.imported, again.skipped) == (0, 4)
+
+
+async def test_import_changelog_is_not_announced(db_session):
+    user = await create_user(db_session, "quiet@test.com", "quiet", "password123")
+    project = await create_project(db_session, name="Quiet Project", owner_id=user.id)
+    await db_session.commit()
+    listener = events.hub.subscribe(project.id)
+    try:
+        result = await import_changelog(db_session, project.id, _chunks(KEEP_A_CHANGELOG))
+        assert result.imported == 3
+        assert listener.empty()
+    finally:
+        events.hub.unsubscribe(project.id, listener)
+    assert len(markdown_renderer.render_cache) == 0
+
+
+async def test_import_changelog_in_batches(db_session):
+    user = await create_user(db_session, "batch@test.com", "batcher", "password123")
+    project = await create_project(db_session, name="Batch Project", owner_id=user.id)
+    text = "".join(
+        f"## [1.{i}.0] - 2020-01-{i % 28 + 1:02d}\n### Changed\n- Change {i}\n\n" for i in range(45)
+    )
+    result = await import_changelog(db_session, project.id, _chunks(text, 1024), batch_size=10)
+    assert result.imported == 45
+
+
+async def test_import_changelog_commits_each_batch(db_session):
+    user = await create_user(db_session, "commit@test.com", "committer", "password123")
+    project = await create_project(db_session, name="Commit Project", owner_id=user.id)
+    await db_session.commit()
+    text = "".join(f"## [2.{i}.0] - 2021-01-01\n- Change {i}\n\n" for i in range(25))
+
+    async def _broken_upload():
+        yield text.encode()
+        raise ConnectionError("client went away")
+
+    with pytest.raises(ConnectionError):
+        await import_changelog(db_session, project.id, _broken_upload(), batch_size=10)
+    await db_session.rollback()
+    count = await db_session.scalar(select(func.count()).where(Post.project_id == project.id))
+    assert count == 20
+
+
+async def test_api_import_changelog(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}", "Content-Type": "text/markdown"}
+    resp = await client.post("/api/v1/posts:import", headers=headers, content=KEEP_A_CHANGELOG)
+    assert resp.status_code == 201
+    assert resp.json() == {"imported": 3, "drafts": 1, "skipped": 1}
+
+    resp = await client.get(
+        "/api/v1/posts?published=true", headers={"Authorization": f"Bearer {info['api_key']}"}
+    )
+    assert [p["title"] for p in resp.json()["posts"]] == ["1.1.0", "1.0.1"]
+
+
+async def test_api_import_rejects_oversized_body_before_writing(client: AsyncClient, monkeypatch):
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}"}
+    monkeypatch.setattr("app.api.programmatic.MAX_IMPORT_BYTES", len(KEEP_A_CHANGELOG) - 1)
+    resp = await client.post("/api/v1/posts:import", headers=headers, content=KEEP_A_CHANGELOG)
+    assert resp.status_code == 413
+
+    resp = await client.get("/api/v1/posts", headers=headers)
+    assert resp.json()["posts"] == []
+
+
+def test_cli_requires_known_project(tmp_path, capsys, monkeypatch):
+    path = tmp_path / "CHANGELOG.md"
+    path.write_text(KEEP_A_CHANGELOG)
+    monkeypatch.setattr("app.cli.init_db", _noop)
+    monkeypatch.setattr("app.cli.get_project_by_slug", _no_project)
+    assert cli_main(["import-changelog", "missing", str(path)]) == 1
+    assert "missing" in capsys.readouterr().err
+
+
+async def _noop():
+    return None
+
+
+async def _no_project(db, slug):
+    return None
@@ -0,0 +1,163 @@
+from httpx import AsyncClient
+
+from app.api.widget import _event_stream
+from app.config import settings
+from app.services import events, widget_cache
+from app.services.auth import create_user
+from app.services.post import create_post, delete_post, toggle_publish, update_post
+from app.services.project import create_project, update_project
+
+
+async def _make_project(db_session):
+    user = await create_user(db_session, "events@test.com", "eventsuser", "password123")
+    project = await create_project(db_session, name="Events Project", owner_id=user.id)
+    await db_session.commit()
+    return project
+
+
+# --- Hub ---
+
+async def test_hub_fans_out_to_project_listeners():
+    """Published events reach every listener of that project only."""
+    a = events.hub.subscribe("p1")
+    b = events.hub.subscribe("p1")
+    other = events.hub.subscribe("p2")
+    reached = events.hub.publish("p1", "published", {"slug": "hello"})
+    assert reached == 2
+    assert a.get_nowait() == b.get_nowait() == 'event: published\ndata: {"slug":"hello"}\n\n'
+    assert other.empty()
+
+
+async def test_hub_connection_caps(monkeypatch):
+    """Subscriptions beyond the global or per-project cap are refused."""
+    monkeypatch.setattr(settings, "sse_max_connections_per_project", 2)
+    monkeypatch.setattr(settings, "sse_max_connections", 3)
+    assert events.hub.subscribe("p1") is not None
+    assert events.hub.subscribe("p1") is not None
+    assert events.hub.subscribe("p1") is None
+    assert events.hub.subscribe("p2") is not None
+    assert events.hub.subscribe("p3") is None
+    assert events.hub.connection_count == 3
+
+
+async def test_hub_unsubscribe_frees_slot():
+    queue = events.hub.subscribe("p1")
+    events.hub.unsubscribe("p1", queue)
+    events.hub.unsubscribe("p1", queue)
+    assert events.hub.connection_count == 0
+    assert events.hub.project_connection_count("p1") == 0
+
+
+async def test_hub_drops_oldest_for_slow_consumer(monkeypatch):
+    monkeypatch.setattr(settings, "sse_queue_size", 2)
+    queue = events.hub.subscribe("p1")
+    for i in range(3):
+        events.hub.publish("p1", "published", {"n": i})
+    assert queue.qsize() == 2
+    assert '"n":1' in queue.get_nowait()
+
+
+# --- Dispatch on commit ---
+
+async def test_publish_event_sent_after_commit(db_session):
+    """Events are broadcast only once the session commits."""
+    project = await _make_project(db_session)
+    queue = events.hub.subscribe(project.id)
+    post = await create_post(
+        db_session, project.id, "Live", "Body", is_published=True,
+    )
+    assert queue.empty()
+    await db_session.commit()
+    frame = queue.get_nowait()
+    assert frame.startswith("event: published\n")
+    assert '"slug":"live"' in frame
+
+    await toggle_publish(db_session, post)
+    await db_session.commit()
+    assert queue.get_nowait().startswith("event: unpublished\n")
+
+
+async def test_no_event_after_rollback(db_session):
+    project = await _make_project(db_session)
+    queue = events.hub.subscribe(project.id)
+    await create_post(db_session, project.id, "Oops", "Body", is_published=True)
+    await db_session.rollback()
+    await db_session.commit()
+    assert queue.empty()
+
+
+async def test_widget_cache_invalidated_only_on_commit(db_session):
+    """Edits drop cached widgets once committed, never before, and not on rollback."""
+    project = await _make_project(db_session)
+    post = await create_post(db_session, project.id, "Live", "Body", is_published=True)
+    await db_session.commit()
+    project_id = project.id
+    generation = widget_cache.generation(project_id)
+
+    await update_post(db_session, post, title="Renamed")
+    await update_project(db_session, project, name="Renamed Project")
+    assert widget_cache.generation(project_id) == generation
+    await db_session.rollback()
+    assert widget_cache.generation(project_id) == generation
+
+    await db_session.refresh(post)
+    await update_post(db_session, post, title="Renamed")
+    await db_session.commit()
+    assert widget_cache.generation(project_id) > generation
+
+
+async def test_draft_changes_send_no_event(db_session):
+    project = await _make_project(db_session)
+    queue = events.hub.subscribe(project.id)
+    post = await create_post(db_session, project.id, "Draft", "Body")
+    await delete_post(db_session, post)
+    await db_session.commit()
+    assert queue.empty()
+
+
+# --- Stream ---
+
+async def test_event_stream_heartbeat_and_events(monkeypatch):
+    """The stream sends a retry hint, heartbeats while idle, then events."""
+    monkeypatch.setattr(settings, "sse_heartbeat_seconds", 0.01)
+    queue = events.hub.subscribe("p1")
+    stream = _event_stream("p1", queue)
+    assert (await anext(stream)).startswith("retry: ")
+    assert await anext(stream) == events.HEARTBEAT
+    events.hub.publish("p1", "published", {"slug": "x"})
+    assert (await anext(stream)).startswith("event: published")
+    await stream.aclose()
+    assert events.hub.connection_count == 0
+
+
+async def test_events_endpoint_nonexistent_project(client: AsyncClient):
+    resp = await client.get("/api/widget/no-such-project/events")
+    assert resp.status_code == 404
+
+
+async def test_events_endpoint_over_capacity(client: AsyncClient, monkeypatch):
+    """A full hub answers 503 with Retry-After instead of holding the connection."""
+    await client.post(
+        "/register",
+        data={"email": "sse@test.com", "username": "sseuser", "password": "password123"},
+    )
+    await client.post("/login", data={"email": "sse@test.com", "password": "password123"})
+    await client.post("/projects/new", data={"name": "SSE Test"})
+    monkeypatch.setattr(settings, "sse_max_connections", 0)
+    resp = await client.get("/api/widget/sse-test/events")
+    assert resp.status_code == 503
+    assert "retry-after" in resp.headers
+
+
+async def test_widget_embed_js_subscribes_to_events(client: AsyncClient):
+    await client.post(
+        "/register",
+        data={"email": "sse2@test.com", "username": "sseuser2", "password": "password123"},
+    )
+    await client.post("/login", data={"email": "sse2@test.com", "password": "password123"})
+    await client.post("/projects/new", data={"name": "SSE Embed"})
+    resp = await client.get("/api/widget/sse-embed/embed.js")
+    assert "EventSource" in resp.text
+    assert "/events" in resp.text
+    # Refetches after an event must not be answered from the browser cache
+    assert "cache: 'no-store'" in resp.text
@@ -0,0 +1,153 @@
+import time
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database import Base
+from app.models import IdempotencyKey, JobCheckpoint, Lease
+from app.services import maintenance
+from app.services.auth import create_user
+from app.services.lease import utcnow
+from app.services.project import create_project
+
+
+@pytest.fixture
+async def file_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'maintenance.db'}")
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+def _deadline() -> float:
+    return time.monotonic() + 5
+
+
+async def _scalar(engine, sql: str):
+    async with engine.connect() as conn:
+        return (await conn.exec_driver_sql(sql)).scalar()
+
+
+async def test_optimize_analyzes_first_then_optimizes(file_engine):
+    assert (await maintenance.optimize(file_engine, _deadline()))["statement"] == "ANALYZE"
+    assert (await maintenance.optimize(file_engine, _deadline()))["statement"] == "PRAGMA optimize"
+
+
+async def test_incremental_vacuum_frees_pages_within_budget(file_engine, monkeypatch):
+    async with file_engine.begin() as conn:
+        await conn.exec_driver_sql("CREATE TABLE filler (x TEXT)")
+        await conn.exec_driver_sql(
+            "INSERT INTO filler SELECT hex(randomblob(2000)) FROM "
+            "(WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000) "
+            "SELECT i FROM n)"
+        )
+    async with file_engine.begin() as conn:
+        await conn.exec_driver_sql("DELETE FROM filler")
+    free = await _scalar(file_engine, "PRAGMA freelist_count")
+    assert free > 500
+
+    monkeypatch.setattr(settings, "maintenance_vacuum_step_pages", 100)
+    expired = await maintenance.incremental_vacuum(file_engine, time.monotonic() - 1)
+    assert expired == {"pages_freed": 0, "pages_free": free}
+
+    result = await maintenance.incremental_vacuum(file_engine, _deadline())
+    assert result == {"pages_freed": free, "pages_free": 0}
+
+
+async def test_vacuum_skipped_without_incremental_auto_vacuum(db_engine):
+    result = await maintenance.incremental_vacuum(db_engine, _deadline())
+    assert result == {"skipped": "auto_vacuum is not INCREMENTAL"}
+
+
+async def test_wal_checkpoint_truncates_over_cap(file_engine, monkeypatch):
+    assert await maintenance.wal_checkpoint(file_engine, _deadline()) == {"skipped": "not in WAL mode"}
+
+    async with file_engine.connect() as conn:
+        await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        await conn.exec_driver_sql("CREATE TABLE filler (x TEXT)")
+        await conn.exec_driver_sql("INSERT INTO filler VALUES (hex(randomblob(50000)))")
+        await conn.commit()
+    monkeypatch.setattr(settings, "maintenance_wal_max_bytes", 1)
+
+    result = await maintenance.wal_checkpoint(file_engine, _deadline())
+    assert result["mode"] == "TRUNCATE"
+    assert result["wal_bytes"] > 1
+    assert result["busy"] is False
+    assert maintenance._wal_size(file_engine) == 0
+
+
+async def test_purge_deletes_expired_rows_in_batches(db_engine, db_session, monkeypatch):
+    user = await create_user(db_session, "purge@test.com", "purger", "password123")
+    project = await create_project(db_session, name="Purge", owner_id=user.id)
+    now = utcnow()
+    for i in range(7):
+        db_session.add(IdempotencyKey(
+            project_id=project.id, key=f"old-{i}", request_fingerprint="f", status_code=201,
+            response_body="{}", expires_at=now - timedelta(hours=1),
+        ))
+    db_session.add(IdempotencyKey(
+        project_id=project.id, key="fresh", request_fingerprint="f", status_code=201,
+        response_body="{}", expires_at=now + timedelta(hours=1),
+    ))
+    db_session.add(Lease(name="gone", owner="x", expires_at=now - timedelta(days=2)))
+    db_session.add(Lease(name="live", owner="x", expires_at=now + timedelta(minutes=1)))
+    await db_session.commit()
+    monkeypatch.setattr(settings, "maintenance_purge_batch_size", 3)
+
+    result = await maintenance.purge_expired(db_engine, _deadline())
+
+    assert result == {"idempotency_keys": 7, "leases": 1}
+    assert (await db_session.execute(select(IdempotencyKey.key))).scalars().all() == ["fresh"]
+    assert (await db_session.execute(select(Lease.name))).scalars().all() == ["live"]
+
+
+async def test_run_due_jobs_records_results_and_waits(db_engine, db_session):
+    session_factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+    wait = await maintenance.run_due_jobs(db_engine, session_factory)
+    assert 0 < wait <= settings.maintenance_checkpoint_seconds
+    status = await maintenance.job_status(session_factory)
+    assert set(status) == {"optimize", "vacuum", "checkpoint", "purge"}
+    assert all(entry["last_run"] for entry in status.values())
+    assert status["purge"]["result"]["idempotency_keys"] == 0
+
+    # Nothing is due again straight away
+    before = (await db_session.execute(select(JobCheckpoint.state))).scalars().all()
+    await maintenance.run_due_jobs(db_engine, session_factory)
+    assert (await db_session.execute(select(JobCheckpoint.state))).scalars().all() == before
+
+
+async def test_run_due_jobs_waits_for_other_workers_lease(db_engine, db_session):
+    db_session.add(Lease(
+        name=maintenance.LEASE_NAME, owner="other", expires_at=utcnow() + timedelta(minutes=5)
+    ))
+    await db_session.commit()
+    session_factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+    await maintenance.run_due_jobs(db_engine, session_factory)
+
+    count = (await db_session.execute(select(func.count()).select_from(JobCheckpoint))).scalar()
+    assert count == 0
+
+
+async def test_admin_can_run_and_inspect_jobs(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", "boss@example.com")
+    resp = await client.post(
+        "/register",
+        data={"email": "boss@example.com", "username": "boss", "password": "password123"},
+        follow_redirects=False,
+    )
+    client.cookies.set("access_token", resp.cookies.get("access_token"))
+
+    resp = await client.post("/admin/maintenance/purge")
+    assert resp.status_code == 200
+    assert resp.json()["idempotency_keys"] == 0
+    assert (await client.post("/admin/maintenance/nope")).status_code == 404
+    status = (await client.get("/admin/maintenance")).json()
+    assert status["purge"]["last_run"] is not None
+    assert status["optimize"]["last_run"] is None
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from app import metrics
+from app.config import settings
+from app.services import email
+
+SCRAPE_HEADERS = {"Authorization": "Bearer s3cret"}
+
+
+@pytest.fixture(autouse=True)
+def _metrics_token(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "s3cret")
+
+
+def _sample(text: str, line_start: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_start + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_start} not in metrics")
+
+
+@pytest.mark.asyncio
+async def test_metrics_counts_requests_per_route(client):
+    await client.get("/health")
+    await client.get("/health")
+    await client.get("/changelog/missing")
+
+    resp = await client.get("/metrics", headers=SCRAPE_HEADERS)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = resp.text
+    assert _sample(text, 'http_requests_total{method="GET",route="/health",status="200"}') == 2
+    assert _sample(
+        text, 'http_requests_total{method="GET",route="/changelog/{project_slug}",status="404"}'
+    ) == 1
+    assert _sample(
+        text, 'http_request_duration_seconds_count{method="GET",route="/health"}'
+    ) == 2
+    assert _sample(
+        text, 'http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"}'
+    ) == 2
+
+
+def test_histogram_buckets_are_cumulative():
+    latency = metrics.Histogram("test_seconds", "test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    merged = metrics.aggregate([{
+        "pid": os.getpid(),
+        "metrics": {"test_seconds": {
+            "type": "histogram", "help": "test", "labelnames": [], "buckets": [0.1, 1.0],
+            "samples": [[[], latency.values[()]]],
+        }},
+    }])
+    text = metrics.render_prometheus(merged)
+    assert 'test_seconds_bucket{le="0.1"} 2' in text
+    assert 'test_seconds_bucket{le="1.0"} 3' in text
+    assert 'test_seconds_bucket{le="+Inf"} 4' in text
+    assert "test_seconds_count 4" in text
+    assert "test_seconds_sum 3.65" in text
+
+
+def test_snapshot_does_not_share_live_samples(monkeypatch):
+    latency = metrics.Histogram("test_snapshot_seconds", "test", buckets=(0.1,))
+    monkeypatch.setitem(metrics._registry, latency.name, latency)
+    latency.observe(0.05)
+    taken = metrics.snapshot()["metrics"]["test_snapshot_seconds"]["samples"]
+    latency.observe(0.05)
+    assert taken == [[[], [1, 0, 0.05]]]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_writer_collects_on_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_dir", str(tmp_path))
+    collected_on = []
+    real_snapshot = metrics.snapshot
+
+    def snapshot():
+        collected_on.append(threading.get_ident())
+        return real_snapshot()
+
+    monkeypatch.setattr(metrics, "snapshot", snapshot)
+    writer = asyncio.create_task(metrics.run_snapshot_writer(0.01))
+    path = tmp_path / f"worker-{os.getpid()}.json"
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if path.exists():
+            break
+    writer.cancel()
+    assert path.exists()
+    assert set(collected_on) == {threading.get_ident()}
+
+
+@pytest.mark.asyncio
+async def test_metrics_aggregate_worker_snapshots(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_dir", str(tmp_path))
+    other = {
+        "pid": os.getppid(),
+        "metrics": {
+            "http_requests_total": {
+                "type": "counter", "help": "HTTP responses by route and status",
+                "labelnames": ["method", "route", "status"], "buckets": [],
+                "samples": [[["GET", "/health", "200"], 5]],
+            },
+            "sse_connections": {
+                "type": "gauge", "help": "Open widget event streams",
+                "labelnames": [], "buckets": [], "samples": [[[], 7]],
+            },
+        },
+    }
+    (tmp_path / f"worker-{os.getppid()}.json").write_text(json.dumps(other))
+    # A worker that has exited: its counters still count, its gauges do not
+    gone = json.loads(json.dumps(other))
+    gone["pid"] = 2**22 + 12345
+    (tmp_path / f"worker-{gone['pid']}.json").write_text(json.dumps(gone))
+
+    await client.get("/health")
+    text = (await client.get("/metrics", headers=SCRAPE_HEADERS)).text
+    assert _sample(text, 'http_requests_total{method="GET",route="/health",status="200"}') == 11
+    assert _sample(text, "sse_connections") == 7
+    assert (tmp_path / f"worker-{os.getpid()}.json").exists()
+
+
+@pytest.mark.asyncio
+async def test_widget_cache_hit_ratio(client):
+    await client.get("/api/widget/nope/posts")
+    text = (await client.get("/metrics", headers=SCRAPE_HEADERS)).text
+    assert _sample(text, 'cache_requests_total{cache="widget",result="miss"}') >= 1
+    assert 'cache_hit_ratio{cache="widget"}' in text
+    for cache in ("widget", "render", "preview"):
+        assert f'cache_entries{{cache="{cache}"}}' in text
+
+
+@pytest.mark.asyncio
+async def test_email_send_metrics(monkeypatch):
+    monkeypatch.setattr(settings, "smtp_host", "smtp.test")
+    monkeypatch.setattr(email, "_send_email_sync", lambda *args: None)
+    assert await email.send_email("a@example.com", "Hi", "<p>Hi</p>")
+
+    def refuse(*args):
+        raise ConnectionRefusedError("no smtp")
+
+    monkeypatch.setattr(email, "_send_email_sync", refuse)
+    assert not await email.send_email("b@example.com", "Hi", "<p>Hi</p>")
+
+    text = metrics.exposition()
+    assert _sample(text, "email_sent_total") == 1
+    assert _sample(text, "email_failed_total") == 1
+    assert _sample(text, "email_send_seconds_count") == 2
+
+
+@pytest.mark.asyncio
+async def test_metrics_token(client):
+    assert (await client.get("/metrics")).status_code == 403
+    resp = await client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert resp.status_code == 403
+    assert (await client.get("/metrics", headers=SCRAPE_HEADERS)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_metrics_admin_only_without_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "")
+    monkeypatch.setattr(settings, "admin_emails", "boss@example.com")
+    assert (await client.get("/metrics")).status_code == 403
+    # An empty token must not match an empty bearer
+    assert (await client.get("/metrics", headers={"Authorization": "Bearer "})).status_code == 403
+
+    resp = await client.post(
+        "/register",
+        data={"email": "boss@example.com", "username": "boss", "password": "password123"},
+        follow_redirects=False,
+    )
+    client.cookies.set("access_token", resp.cookies.get("access_token"))
+    assert (await client.get("/metrics")).status_code == 200
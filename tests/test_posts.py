@@ -1,5 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
+from app.services import markdown_renderer
+from app.services.auth import create_user
+from app.services.markdown_renderer import (
+    MarkdownRenderer,
+    RenderCache,
+    render_preview,
+    split_blocks,
+)
+from app.services.post import create_post, render_markdown, render_markdown_many, update_post
+from app.services.project import create_project
+
 
 async def register_and_login(client, email="test@example.com", username="testuser"):
     reg_response = await client.post(
@@ -305,3 +318,152 @@ async def test_multiple_posts_listing(client):
     assert "Update 1" in response.text
     assert "Update 2" in response.text
     assert "3 total" in response.text
+
+
+def test_renderer_reuse_does_not_leak_state():
+    """A reused renderer gives the same output as a fresh one, whatever came before."""
+    renderer = MarkdownRenderer()
+    docs = [
+        "# Title\n\n```py\nx = 1\n```",
+        "<script>alert(1)</script>**safe**<iframe src=x></iframe>",
+        "| a | b |\n|---|---|\n| 1 | 2 |",
+        "line one\nline two\n\n1. first\n2. second",
+    ]
+    expected = [MarkdownRenderer().render(doc) for doc in docs]
+    assert [renderer.render(doc) for doc in docs + docs] == expected + expected
+    assert "script" not in expected[1] and "<strong>safe</strong>" in expected[1]
+
+
+def test_renderer_is_safe_across_threads():
+    renderer = MarkdownRenderer()
+    docs = [f"## Release {i}\n\n- item **{i}**\n- `code`" for i in range(40)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        rendered = list(pool.map(renderer.render, docs))
+    assert rendered == [renderer.render(doc) for doc in docs]
+
+
+def _count_renders(monkeypatch) -> list:
+    calls = []
+    real_render = markdown_renderer.renderer.render
+
+    def counting_render(text):
+        calls.append(text)
+        return real_render(text)
+
+    monkeypatch.setattr(markdown_renderer.renderer, "render", counting_render)
+    return calls
+
+
+def test_render_cache_skips_identical_input(monkeypatch):
+    calls = _count_renders(monkeypatch)
+    first = render_markdown("**cached**")
+    second = render_markdown("**cached**")
+    assert first == second == "<p><strong>cached</strong></p>"
+    assert calls == ["**cached**"]
+    assert markdown_renderer.render_cache.hits == 1
+
+
+async def test_render_markdown_many_renders_each_text_once(monkeypatch):
+    render_markdown("already cached")
+    calls = _count_renders(monkeypatch)
+    rendered = await render_markdown_many(["a", "already cached", "a", "b"])
+    assert rendered == [render_markdown(t) for t in ["a", "already cached", "a", "b"]]
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_render_cache_bounds():
+    cache = RenderCache(max_entries=2, max_bytes=800)
+    for name in ("a", "b", "c"):
+        cache.put(name.encode(), name * 10)
+    assert len(cache) == 2 and cache.get(b"a") is None
+
+    cache.put(b"big", "x" * 101)  # over an eighth of max_bytes: not cached
+    assert cache.get(b"big") is None
+
+    cache = RenderCache(max_entries=100, max_bytes=250)
+    for i in range(10):
+        cache.put(str(i).encode(), "y" * 30)
+    assert cache._bytes <= 250
+    assert len(cache) == 8
+
+
+def test_render_config_change_changes_cache_key(monkeypatch):
+    default = MarkdownRenderer()
+    no_images = MarkdownRenderer(tags=[t for t in markdown_renderer.ALLOWED_TAGS if t != "img"])
+    assert default.config_version != no_images.config_version
+    assert RenderCache.key("x", default.config_version) != RenderCache.key(
+        "x", no_images.config_version
+    )
+
+    monkeypatch.setattr(markdown_renderer, "RENDER_VERSION", markdown_renderer.RENDER_VERSION + 1)
+    assert MarkdownRenderer().config_version != default.config_version
+
+
+async def test_update_post_with_unchanged_body_skips_render(db_session, monkeypatch):
+    user = await create_user(db_session, "render@test.com", "renderer", "password123")
+    project = await create_project(db_session, name="Render Project", owner_id=user.id)
+    post = await create_post(db_session, project.id, "Title", "Some **body**")
+    calls = _count_renders(monkeypatch)
+    markdown_renderer.render_cache.clear()
+    await update_post(db_session, post, title="New title", body_markdown="Some **body**")
+    assert post.title == "New title"
+    assert post.body_html == "<p>Some <strong>body</strong></p>"
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_preview_renders_sanitized_html(client):
+    await register_and_login(client)
+    project_id = await create_test_project(client)
+    response = await client.post(
+        f"/projects/{project_id}/posts/preview",
+        data={"body_markdown": "## Hi\n\n**bold** <script>alert(1)</script>"},
+    )
+    assert response.status_code == 200
+    assert "<h2>Hi</h2>" in response.text
+    assert "<strong>bold</strong>" in response.text
+    assert "script" not in response.text
+
+    response = await client.post(f"/projects/{project_id}/posts/preview", data={"body_markdown": " "})
+    assert "Nothing to preview" in response.text
+
+
+@pytest.mark.asyncio
+async def test_preview_requires_project_owner(client):
+    await register_and_login(client, email="user1@test.com", username="user1")
+    project_id = await create_test_project(client)
+    client.cookies.clear()
+    await register_and_login(client, email="user2@test.com", username="user2")
+    response = await client.post(
+        f"/projects/{project_id}/posts/preview", data={"body_markdown": "x"}
+    )
+    assert response.status_code == 404
+
+
+def test_preview_rerenders_only_changed_blocks(monkeypatch):
+    blocks = [f"## Section {i}\n\n- item {i}\n- more {i}" for i in range(20)]
+    render_preview("\n\n".join(blocks))
+
+    calls = _count_renders(monkeypatch)
+    blocks[7] = "## Section 7\n\n- item 7\n- edited"
+    html = render_preview("\n\n".join(blocks))
+    assert calls == ["- item 7\n- edited"]
+    assert html == MarkdownRenderer().render("\n\n".join(blocks))
+
+
+def test_preview_matches_full_render():
+    docs = [
+        "# Title\n\nPara\nline two\n\n- a\n- b\n\n- c\n\n> q1\n\n> q2",
+        "```\ncode\n\nmore\n```\n\n    indented\n\n    more\n\nend *text*",
+        "- item\n\n    continued\n\n- next\n\n| a | b |\n|---|---|\n| 1 | 2 |",
+        "Ref [link][1]\n\n[1]: https://example.com",
+        "<div>\n\nraw\n\n</div>",
+    ]
+    for doc in docs:
+        assert render_preview(doc) == MarkdownRenderer().render(doc)
+
+
+def test_split_blocks_keeps_fences_and_lists_together():
+    assert split_blocks("a\n\n```\nx\n\ny\n```\n\n- 1\n\n- 2\n\nb") == [
+        "a", "```\nx\n\ny\n```", "- 1\n\n- 2", "b",
+    ]
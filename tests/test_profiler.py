@@ -0,0 +1,108 @@
+import threading
+import time
+
+from app import profiler
+from app.config import settings
+
+
+async def _login(client, email: str) -> None:
+    resp = await client.post(
+        "/register",
+        data={"email": email, "username": email.split("@")[0], "password": "password123"},
+        follow_redirects=False,
+    )
+    client.cookies.set("access_token", resp.cookies.get("access_token"))
+
+
+def _busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def test_stack_sampler_counts_stacks_of_target_thread():
+    sampler = profiler.StackSampler(threading.get_ident(), 0.001)
+    sampler.start()
+    _busy(0.05)
+    await sampler.stop()
+
+    assert sum(sampler.stacks.values()) > 0
+    assert any(stack[-1][0] == "_busy" for stack in sampler.stacks)
+
+
+def test_profile_exports():
+    frame_a = ("handler", "/srv/app/api.py", 10)
+    frame_b = ("render", "/srv/app/templating.py", 20)
+    profile = profiler.Profile(id="abc", method="GET", path="/dashboard", interval_ms=5)
+    profile.stacks[(frame_a, frame_b)] = 3
+    profile.stacks[(frame_a,)] = 1
+
+    speedscope = profile.speedscope()
+    frames = speedscope["shared"]["frames"]
+    assert [f["name"] for f in frames] == ["handler", "render"]
+    sampled = speedscope["profiles"][0]
+    assert sampled["type"] == "sampled"
+    assert sampled["samples"] == [[0, 1], [0]]
+    assert sampled["weights"] == [15, 5]
+    assert sampled["endValue"] == 20
+
+    lines = profile.collapsed().splitlines()
+    assert lines[0].startswith("handler (")
+    assert lines[0].endswith(";render (/srv/app/templating.py:20) 3")
+    assert lines[1].endswith(" 1")
+
+
+async def test_admin_can_profile_a_request(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", "boss@example.com")
+    monkeypatch.setattr(settings, "profiler_enabled", True)
+    monkeypatch.setattr(settings, "profiler_interval_ms", 1.0)
+    await _login(client, "boss@example.com")
+
+    resp = await client.get("/dashboard?_profile=1")
+    assert resp.status_code == 200
+    profile_id = resp.headers["x-profile-id"]
+
+    listed = (await client.get("/admin/profiles")).json()
+    assert [p["id"] for p in listed] == [profile_id]
+
+    details = (await client.get(f"/admin/profiles/{profile_id}")).json()
+    assert details["path"] == "/dashboard"
+    assert details["status"] == 200
+    assert details["sql_count"] == len(details["sql"]) > 0
+    assert all(q["ms"] >= 0 for q in details["sql"])
+
+    speedscope = (await client.get(f"/admin/profiles/{profile_id}/speedscope.json")).json()
+    assert speedscope["profiles"][0]["type"] == "sampled"
+    resp = await client.get(f"/admin/profiles/{profile_id}/collapsed.txt")
+    assert resp.status_code == 200
+
+    resp = await client.get("/dashboard", headers={"X-Profile": "1"})
+    assert "x-profile-id" in resp.headers
+    assert len((await client.get("/admin/profiles")).json()) == 2
+
+
+async def test_profiling_ignored_for_non_admins_and_when_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", "boss@example.com")
+    await _login(client, "someone@example.com")
+
+    resp = await client.get("/dashboard?_profile=1")
+    assert "x-profile-id" not in resp.headers
+
+    monkeypatch.setattr(settings, "profiler_enabled", True)
+    resp = await client.get("/dashboard?_profile=1")
+    assert resp.status_code == 200
+    assert "x-profile-id" not in resp.headers
+    assert profiler.list_profiles() == []
+    assert (await client.get("/admin/profiles")).status_code == 403
+
+
+async def test_profiles_are_bounded(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", "boss@example.com")
+    monkeypatch.setattr(settings, "profiler_enabled", True)
+    monkeypatch.setattr(settings, "profiler_keep", 2)
+    await _login(client, "boss@example.com")
+
+    ids = [(await client.get("/health?_profile=1")).headers["x-profile-id"] for _ in range(3)]
+
+    assert [p["id"] for p in profiler.list_profiles()] == ids[:0:-1]
+    assert (await client.get(f"/admin/profiles/{ids[0]}")).status_code == 404
@@ -1,8 +1,12 @@
 import re
 
-import pytest
 from httpx import AsyncClient
 
+from app.config import settings
+from app.services import notifications
+from app.services.idempotency import clear_idempotency_cache
+from app.services.post import render_markdown, render_markdown_many, shutdown_render_pool
+
 
 async def _setup_project_with_api_key(client: AsyncClient) -> dict:
     """Create a user, project, and API key."""
@@ -345,3 +349,346 @@ async def test_api_create_published_post_with_subscribers(client: AsyncClient):
     assert resp.status_code == 201
     data = resp.json()
     assert data["post"]["is_published"] is True
+
+
+# --- Pagination, fields and filters ---
+
+async def _create_api_posts(client: AsyncClient, api_key: str, count: int, **overrides) -> list[str]:
+    ids = []
+    for i in range(count):
+        resp = await client.post(
+            "/api/v1/posts",
+            headers={"Authorization": f"Bearer {api_key}"},
+            json={
+                "title": f"Paged Post {i}",
+                "body_markdown": f"Body {i}",
+                "category": "improvement",
+                **overrides,
+            },
+        )
+        ids.append(resp.json()["post"]["id"])
+    return ids
+
+
+async def test_api_list_posts_cursor_pagination(client: AsyncClient):
+    """Following next_cursor visits every post exactly once."""
+    info = await _setup_project_with_api_key(client)
+    created = await _create_api_posts(client, info["api_key"], 7)
+    headers = {"Authorization": f"Bearer {info['api_key']}"}
+
+    resp = await client.get("/api/v1/posts?limit=3", headers=headers)
+    data = resp.json()
+    assert len(data["posts"]) == 3
+    assert data["total"] == 7
+    seen = [p["id"] for p in data["posts"]]
+
+    while data["next_cursor"]:
+        resp = await client.get(
+            f"/api/v1/posts?limit=3&cursor={data['next_cursor']}", headers=headers
+        )
+        data = resp.json()
+        assert "total" not in data
+        seen.extend(p["id"] for p in data["posts"])
+
+    assert len(seen) == len(set(seen)) == 7
+    assert set(seen) == set(created)
+
+
+async def test_api_list_posts_omits_bodies_by_default(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    await _create_api_posts(client, info["api_key"], 1)
+    resp = await client.get(
+        "/api/v1/posts", headers={"Authorization": f"Bearer {info['api_key']}"}
+    )
+    post = resp.json()["posts"][0]
+    assert "body_markdown" not in post
+    assert "body_html" not in post
+    assert post["title"] == "Paged Post 0"
+    assert post["category_label"] == "Improvement"
+
+
+async def test_api_list_posts_fields_projection(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    await _create_api_posts(client, info["api_key"], 1)
+    resp = await client.get(
+        "/api/v1/posts?fields=id,title,body_markdown",
+        headers={"Authorization": f"Bearer {info['api_key']}"},
+    )
+    post = resp.json()["posts"][0]
+    assert set(post) == {"id", "title", "body_markdown"}
+    assert post["body_markdown"] == "Body 0"
+
+
+async def test_api_list_posts_invalid_fields(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    resp = await client.get(
+        "/api/v1/posts?fields=title,password",
+        headers={"Authorization": f"Bearer {info['api_key']}"},
+    )
+    assert resp.status_code == 422
+
+
+async def test_api_list_posts_invalid_cursor(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    resp = await client.get(
+        "/api/v1/posts?cursor=not-a-cursor",
+        headers={"Authorization": f"Bearer {info['api_key']}"},
+    )
+    assert resp.status_code == 400
+
+
+async def test_api_list_posts_filters(client: AsyncClient):
+    """published=false returns drafts only; category narrows further."""
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}"}
+    await _create_api_posts(client, info["api_key"], 2, category="bugfix")
+    await _create_api_posts(client, info["api_key"], 1, is_published=True)
+
+    drafts = (await client.get("/api/v1/posts?published=false", headers=headers)).json()
+    assert drafts["total"] == 2
+    assert all(p["is_published"] is False for p in drafts["posts"])
+
+    bugfixes = (await client.get("/api/v1/posts?category=bugfix", headers=headers)).json()
+    assert bugfixes["total"] == 2
+
+    resp = await client.get("/api/v1/posts?category=nope", headers=headers)
+    assert resp.status_code == 422
+
+
+async def test_api_list_posts_updated_since(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}"}
+    await _create_api_posts(client, info["api_key"], 2)
+
+    resp = await client.get("/api/v1/posts?updated_since=2000-01-01T00:00:00Z", headers=headers)
+    assert len(resp.json()["posts"]) == 2
+    resp = await client.get("/api/v1/posts?updated_since=2999-01-01T00:00:00", headers=headers)
+    assert resp.json()["posts"] == []
+
+
+async def test_api_count_posts(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}"}
+    await _create_api_posts(client, info["api_key"], 3)
+    await _create_api_posts(client, info["api_key"], 1, is_published=True)
+
+    resp = await client.get("/api/v1/posts/count", headers=headers)
+    assert resp.json() == {"total": 4}
+    resp = await client.get("/api/v1/posts/count?published=true", headers=headers)
+    assert resp.json() == {"total": 1}
+
+
+# --- Batch create ---
+
+async def test_api_batch_create_posts(client: AsyncClient):
+    """Batch endpoint creates every post in one request."""
+    info = await _setup_project_with_api_key(client)
+    resp = await client.post(
+        "/api/v1/posts:batch",
+        headers={"Authorization": f"Bearer {info['api_key']}"},
+        json={"posts": [
+            {"title": "v1.0", "body_markdown": "**First** release", "is_published": True},
+            {"title": "v1.1", "body_markdown": "Fixes", "category": "bugfix"},
+            {"title": "v1.0", "body_markdown": "Same title again"},
+        ]},
+    )
+    assert resp.status_code == 201
+    data = resp.json()
+    assert data["count"] == 3
+    slugs = [p["slug"] for p in data["posts"]]
+    assert slugs[0] == "v10"
+    assert slugs[2].startswith("v10-")
+    assert len(set(slugs)) == 3
+    assert data["posts"][0]["is_published"] is True
+    assert data["posts"][1]["category"] == "bugfix"
+
+    resp = await client.get(
+        f"/api/v1/posts/{data['posts'][0]['id']}",
+        headers={"Authorization": f"Bearer {info['api_key']}"},
+    )
+    assert "<strong>First</strong>" in resp.json()["post"]["body_html"]
+
+
+async def test_api_batch_slug_collides_with_existing(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}"}
+    await _create_api_posts(client, info["api_key"], 1)
+    resp = await client.post(
+        "/api/v1/posts:batch",
+        headers=headers,
+        json={"posts": [{"title": "Paged Post 0", "body_markdown": "Again"}]},
+    )
+    assert resp.json()["posts"][0]["slug"].startswith("paged-post-0-")
+
+
+async def test_api_batch_validates_everything_first(client: AsyncClient):
+    """One invalid entry rejects the whole batch and nothing is written."""
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}"}
+    resp = await client.post(
+        "/api/v1/posts:batch",
+        headers=headers,
+        json={"posts": [
+            {"title": "Fine", "body_markdown": "Body"},
+            {"title": "", "body_markdown": "Body"},
+            {"title": "Bad category", "body_markdown": "Body", "category": "nope"},
+        ]},
+    )
+    assert resp.status_code == 422
+    errors = resp.json()["detail"]["errors"]
+    assert any(e.startswith("posts[1]:") for e in errors)
+    assert any(e.startswith("posts[2]:") for e in errors)
+
+    resp = await client.get("/api/v1/posts/count", headers=headers)
+    assert resp.json()["total"] == 0
+
+
+async def test_api_batch_requires_posts_list(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}"}
+    resp = await client.post("/api/v1/posts:batch", headers=headers, json={"posts": []})
+    assert resp.status_code == 400
+    resp = await client.post("/api/v1/posts:batch", headers=headers, json=[{"title": "x"}])
+    assert resp.status_code == 400
+
+
+async def test_api_batch_too_many_posts(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    resp = await client.post(
+        "/api/v1/posts:batch",
+        headers={"Authorization": f"Bearer {info['api_key']}"},
+        json={"posts": [{"title": f"T{i}", "body_markdown": "B"} for i in range(501)]},
+    )
+    assert resp.status_code == 422
+
+
+async def test_api_batch_sends_one_digest(client: AsyncClient, monkeypatch):
+    """Several published posts in a batch queue a single digest notification."""
+    info = await _setup_project_with_api_key(client)
+    await client.post("/changelog/api-project/subscribe", data={"email": "digest@example.com"})
+
+    calls = []
+
+    async def fake_digest(**kwargs):
+        calls.append(kwargs)
+
+    async def fake_single(**kwargs):
+        raise AssertionError("single-post notification should not be sent")
+
+    monkeypatch.setattr(notifications, "send_digest_notification", fake_digest)
+    monkeypatch.setattr(notifications, "send_post_notification", fake_single)
+    resp = await client.post(
+        "/api/v1/posts:batch",
+        headers={"Authorization": f"Bearer {info['api_key']}"},
+        json={"posts": [
+            {"title": f"Release {i}", "body_markdown": "Body", "is_published": True}
+            for i in range(3)
+        ]},
+    )
+    assert resp.status_code == 201
+    assert len(calls) == 1
+    assert [p["title"] for p in calls[0]["posts"]] == ["Release 0", "Release 1", "Release 2"]
+
+
+async def test_render_markdown_many_uses_process_pool(monkeypatch):
+    """Large batches render in worker processes with the same output."""
+    monkeypatch.setattr(settings, "render_pool_min_batch", 2)
+    monkeypatch.setattr(settings, "render_pool_workers", 2)
+    try:
+        rendered = await render_markdown_many(["# One", "**two**", "<script>x</script>three"])
+    finally:
+        shutdown_render_pool()
+    assert rendered == [render_markdown(t) for t in ["# One", "**two**", "<script>x</script>three"]]
+
+
+# --- Idempotency keys ---
+
+async def test_api_create_post_idempotent_replay(client: AsyncClient):
+    """Retrying with the same Idempotency-Key returns the original post."""
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}", "Idempotency-Key": "retry-1"}
+    payload = {"title": "Once", "body_markdown": "Only once", "is_published": True}
+
+    first = await client.post("/api/v1/posts", headers=headers, json=payload)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    second = await client.post("/api/v1/posts", headers=headers, json=payload)
+    assert second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+
+    resp = await client.get(
+        "/api/v1/posts/count", headers={"Authorization": f"Bearer {info['api_key']}"}
+    )
+    assert resp.json()["total"] == 1
+
+
+async def test_api_idempotency_replay_survives_cache_clear(client: AsyncClient):
+    """Stored responses are read back from the database, not only the LRU."""
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}", "Idempotency-Key": "k"}
+    payload = {"title": "Durable", "body_markdown": "Body"}
+    first = await client.post("/api/v1/posts", headers=headers, json=payload)
+    clear_idempotency_cache()
+    second = await client.post("/api/v1/posts", headers=headers, json=payload)
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json()["post"]["id"] == first.json()["post"]["id"]
+
+
+async def test_api_idempotency_key_reused_with_different_body(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}", "Idempotency-Key": "same"}
+    await client.post("/api/v1/posts", headers=headers, json={"title": "A", "body_markdown": "A"})
+    resp = await client.post(
+        "/api/v1/posts", headers=headers, json={"title": "B", "body_markdown": "B"}
+    )
+    assert resp.status_code == 422
+
+
+async def test_api_idempotency_key_scoped_to_endpoint(client: AsyncClient):
+    """The same key on the batch endpoint is a different request."""
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}", "Idempotency-Key": "shared"}
+    await client.post("/api/v1/posts", headers=headers, json={"title": "A", "body_markdown": "A"})
+    resp = await client.post(
+        "/api/v1/posts:batch", headers=headers, json={"posts": [{"title": "A", "body_markdown": "A"}]}
+    )
+    assert resp.status_code == 422
+
+
+async def test_api_batch_idempotent_replay(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}", "Idempotency-Key": "batch-1"}
+    payload = {"posts": [{"title": f"T{i}", "body_markdown": "B"} for i in range(3)]}
+    first = await client.post("/api/v1/posts:batch", headers=headers, json=payload)
+    second = await client.post("/api/v1/posts:batch", headers=headers, json=payload)
+    assert second.status_code == 201
+    assert second.json() == first.json()
+
+    resp = await client.get(
+        "/api/v1/posts/count", headers={"Authorization": f"Bearer {info['api_key']}"}
+    )
+    assert resp.json()["total"] == 3
+
+
+async def test_api_idempotency_key_expires(client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(settings, "idempotency_key_ttl_hours", 0)
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}", "Idempotency-Key": "short"}
+    payload = {"title": "Again", "body_markdown": "Body"}
+    first = await client.post("/api/v1/posts", headers=headers, json=payload)
+    second = await client.post("/api/v1/posts", headers=headers, json=payload)
+    assert second.status_code == 201
+    assert "Idempotent-Replayed" not in second.headers
+    assert second.json()["post"]["id"] != first.json()["post"]["id"]
+
+
+async def test_api_idempotency_key_too_long(client: AsyncClient):
+    info = await _setup_project_with_api_key(client)
+    resp = await client.post(
+        "/api/v1/posts",
+        headers={"Authorization": f"Bearer {info['api_key']}", "Idempotency-Key": "x" * 256},
+        json={"title": "A", "body_markdown": "A"},
+    )
+    assert resp.status_code == 400
@@ -0,0 +1,103 @@
+import logging
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+
+from app import query_stats
+from app.config import settings
+from app.models import Post
+from app.query_stats import QueryStats, track_queries
+from tests.test_projects import register_and_login
+
+
+async def _project_with_posts(client, posts: int) -> str:
+    await register_and_login(client)
+    resp = await client.post(
+        "/projects/new", data={"name": "Budget Project"}, follow_redirects=False
+    )
+    project_id = resp.headers["location"].rsplit("/", 1)[-1]
+    for i in range(posts):
+        await client.post(
+            f"/projects/{project_id}/posts/new",
+            data={"title": f"Post {i}", "body_markdown": f"Body {i}", "action": "publish"},
+        )
+    return project_id
+
+
+# Same budgets with 1 and 8 posts: a page whose query count grows with the
+# number of rows shown has an N+1
+@pytest.mark.parametrize("posts", [1, 8])
+async def test_route_query_budgets(client, query_budget, posts):
+    project_id = await _project_with_posts(client, posts)
+    routes = {
+        "/dashboard": 3,
+        "/projects": 1,
+        f"/projects/{project_id}": 4,
+        f"/projects/{project_id}/posts": 3,
+        f"/projects/{project_id}/analytics": 3,
+        "/changelog/budget-project": 2,
+        "/api/widget/budget-project/posts": 2,
+    }
+    for path, budget in routes.items():
+        with query_budget(budget):
+            resp = await client.get(path)
+        assert resp.status_code == 200, path
+
+
+async def test_server_timing_header(client):
+    project_id = await _project_with_posts(client, 1)
+    resp = await client.get(f"/projects/{project_id}")
+    timing = resp.headers["server-timing"]
+    assert timing.startswith("db;dur=")
+    assert timing.endswith('desc="4 queries"')
+
+
+async def test_track_queries_records_slowest_and_repeats(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "n_plus_one_threshold", 3)
+    with track_queries() as outer:
+        for _ in range(3):
+            await db_session.execute(select(Post).where(Post.id == "x"))
+        with track_queries() as inner:
+            await db_session.execute(select(Post.id))
+    assert (outer.count, inner.count) == (4, 1)
+    assert outer.slowest_statement is not None
+    assert outer.total_ms >= outer.slowest_ms > 0
+    [(statement, count)] = outer.repeated()
+    assert count == 3 and "WHERE posts.id" in statement
+    assert inner.repeated() == []
+
+
+async def test_failed_statement_leaves_no_timer_on_connection(db_engine, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+    async with db_engine.connect() as conn:
+        with track_queries() as stats:
+            with pytest.raises(DBAPIError):
+                await conn.execute(text("SELECT * FROM no_such_table"))
+            await conn.execute(text("SELECT 1"))
+        assert stats.count == 1
+        assert not any(conn.info.values())
+
+
+def test_repeated_statement_logged_once_per_route(monkeypatch, caplog):
+    monkeypatch.setattr(query_stats, "_reported_repeats", set())
+    stats = QueryStats()
+    for _ in range(settings.n_plus_one_threshold):
+        stats.add("SELECT * FROM subscribers WHERE id = ?", 0.001)
+    scope = {"method": "GET", "path": "/projects/abc"}
+    with caplog.at_level(logging.WARNING, logger="app.query_stats"):
+        query_stats._report_repeats(scope, stats)
+        query_stats._report_repeats(scope, stats)
+    [record] = caplog.records
+    assert "ran 10 times" in record.getMessage()
+
+
+async def test_debug_toolbar_only_in_debug(client, monkeypatch):
+    project_id = await _project_with_posts(client, 1)
+    resp = await client.get(f"/projects/{project_id}")
+    assert "debug-toolbar" not in resp.text
+
+    monkeypatch.setattr(settings, "debug", True)
+    resp = await client.get(f"/projects/{project_id}")
+    assert 'id="debug-toolbar"' in resp.text
+    assert "SQL: 4 queries" in resp.text
@@ -0,0 +1,157 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.models import JobCheckpoint, Post
+from app.services import markdown_renderer, rerender
+from app.services.auth import create_user
+from app.services.project import create_project
+from app.services.rerender import JOB_NAME, rerender_posts
+
+
+async def _seed(db_session, count: int = 5) -> list[str]:
+    user = await create_user(db_session, "rerender@test.com", "rerenderer", "password123")
+    project = await create_project(db_session, name="Rerender Project", owner_id=user.id)
+    for i in range(count):
+        db_session.add(Post(
+            title=f"Post {i}",
+            slug=f"post-{i}",
+            body_markdown=f"**Post {i}**",
+            body_html="<p>stale</p>",
+            project_id=project.id,
+        ))
+    await db_session.commit()
+    return sorted((await db_session.execute(select(Post.id))).scalars())
+
+
+async def _html_by_id(db_session) -> dict[str, str]:
+    db_session.expire_all()
+    rows = (await db_session.execute(select(Post.id, Post.body_html))).all()
+    return {row.id: row.body_html for row in rows}
+
+
+async def test_rerender_posts_in_batches(db_engine, db_session):
+    ids = await _seed(db_session)
+    batches = []
+    progress = await rerender_posts(
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False),
+        batch_size=2,
+        on_batch=lambda p: batches.append(p.processed),
+    )
+    assert batches == [2, 4, 5]
+    assert (progress.total, progress.processed, progress.changed) == (5, 5, 5)
+    assert progress.finished
+
+    html = await _html_by_id(db_session)
+    assert all(html[post_id].startswith("<p><strong>Post") for post_id in ids)
+    assert await db_session.get(JobCheckpoint, JOB_NAME) is None
+
+    again = await rerender_posts(
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    assert (again.processed, again.changed) == (5, 0)
+
+
+async def test_rerender_keeps_updated_at(db_engine, db_session):
+    await _seed(db_session, count=2)
+    edited = datetime(2024, 1, 1, 12, 0)
+    await db_session.execute(update(Post).values(updated_at=edited))
+    await db_session.commit()
+    await rerender_posts(async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False))
+
+    db_session.expire_all()
+    assert set((await db_session.execute(select(Post.updated_at))).scalars()) == {edited}
+    assert all(html.startswith("<p><strong>") for html in (await _html_by_id(db_session)).values())
+
+
+async def test_rerender_resumes_from_checkpoint(db_engine, db_session):
+    ids = await _seed(db_session)
+    db_session.add(JobCheckpoint(
+        name=JOB_NAME,
+        position=ids[2],
+        state=json.dumps({
+            "config_version": markdown_renderer.renderer.config_version,
+            "processed": 3,
+            "changed": 3,
+        }),
+    ))
+    await db_session.commit()
+
+    progress = await rerender_posts(
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    assert progress.resumed_from == ids[2]
+    assert (progress.processed, progress.changed) == (5, 5)
+    html = await _html_by_id(db_session)
+    assert [html[post_id] == "<p>stale</p>" for post_id in ids] == [True, True, True, False, False]
+
+
+async def test_rerender_ignores_checkpoint_from_other_config(db_engine, db_session):
+    ids = await _seed(db_session)
+    db_session.add(JobCheckpoint(
+        name=JOB_NAME, position=ids[2], state=json.dumps({"config_version": "old"})
+    ))
+    await db_session.commit()
+
+    progress = await rerender_posts(
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    assert progress.resumed_from is None
+    assert progress.changed == 5
+
+
+async def test_rerender_skips_posts_edited_mid_batch(db_engine, db_session, monkeypatch):
+    ids = await _seed(db_session, count=2)
+    factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    real_render = rerender.render_markdown_many
+
+    async def render_while_editing(texts, use_cache=True):
+        async with factory() as other:
+            post = await other.get(Post, ids[0])
+            post.body_markdown = "edited"
+            post.body_html = "<p>edited</p>"
+            await other.commit()
+        return await real_render(texts, use_cache=use_cache)
+
+    monkeypatch.setattr(rerender, "render_markdown_many", render_while_editing)
+    progress = await rerender_posts(factory)
+    assert progress.changed == 2
+    html = await _html_by_id(db_session)
+    assert html[ids[0]] == "<p>edited</p>"
+    assert html[ids[1]].startswith("<p><strong>Post ")
+
+
+async def _login(client, email: str):
+    resp = await client.post(
+        "/register",
+        data={"email": email, "username": email.split("@")[0], "password": "password123"},
+        follow_redirects=False,
+    )
+    client.cookies.set("access_token", resp.cookies.get("access_token"))
+
+
+async def test_admin_rerender_job(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", "Boss@Example.com")
+    await _login(client, "boss@example.com")
+
+    resp = await client.get("/admin/jobs/rerender-posts")
+    assert resp.status_code == 404
+
+    resp = await client.post("/admin/jobs/rerender-posts")
+    assert resp.status_code == 202
+    assert resp.json()["running"] is True
+    await rerender._job
+
+    status = (await client.get("/admin/jobs/rerender-posts")).json()
+    assert status["running"] is False
+    assert status["finished"] is True
+    assert status["error"] is None
+
+
+async def test_admin_routes_require_admin(client):
+    await _login(client, "someone@example.com")
+    resp = await client.post("/admin/jobs/rerender-posts")
+    assert resp.status_code == 403
@@ -0,0 +1,201 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import _add_missing_columns
+from app.models import Lease, Post
+from app.services import notifications, scheduler
+from app.services.auth import create_user
+from app.services.lease import acquire_lease, utcnow
+from app.services.post import parse_schedule_time, publish_due_posts, schedule_post
+from app.services.project import create_project
+from app.services.subscriber import subscribe
+from tests.test_programmatic_api import _setup_project_with_api_key
+
+
+async def _project(db_session):
+    user = await create_user(db_session, "sched@test.com", "scheduler", "password123")
+    project = await create_project(db_session, name="Sched Project", owner_id=user.id)
+    await db_session.commit()
+    return project
+
+
+def _post(project, title: str, scheduled_at: datetime | None) -> Post:
+    return Post(
+        title=title,
+        slug=title.lower().replace(" ", "-"),
+        body_markdown=title,
+        body_html=f"<p>{title}</p>",
+        project_id=project.id,
+        scheduled_at=scheduled_at,
+    )
+
+
+def test_parse_schedule_time():
+    now = datetime(2030, 1, 1, 12, 0)
+    assert parse_schedule_time("2030-01-01T13:30", now) == datetime(2030, 1, 1, 13, 30)
+    assert parse_schedule_time("2030-01-01T15:00+02:00", now) == datetime(2030, 1, 1, 13, 0)
+    with pytest.raises(ValueError):
+        parse_schedule_time("2030-01-01T11:00", now)
+    with pytest.raises(ValueError):
+        parse_schedule_time("tomorrow", now)
+
+
+async def test_publish_due_posts_only_publishes_due(db_session):
+    project = await _project(db_session)
+    now = utcnow()
+    due_at = now - timedelta(minutes=5)
+    db_session.add_all([
+        _post(project, "Due", due_at),
+        _post(project, "Later", now + timedelta(hours=1)),
+        _post(project, "Draft", None),
+    ])
+    await db_session.commit()
+
+    published = await publish_due_posts(db_session, now)
+    await db_session.commit()
+
+    assert [post.title for post in published] == ["Due"]
+    assert published[0].is_published
+    assert published[0].published_at == due_at
+    assert published[0].scheduled_at is None
+    assert await scheduler.next_due_at(db_session) == now + timedelta(hours=1)
+
+
+async def test_run_due_publishes_notifies_and_sleeps_until_next(db_engine, db_session, monkeypatch):
+    project = await _project(db_session)
+    await subscribe(db_session, "reader@example.com", project.id)
+    now = utcnow()
+    db_session.add_all([
+        _post(project, "One", now - timedelta(seconds=1)),
+        _post(project, "Two", now - timedelta(seconds=2)),
+        _post(project, "Next", now + timedelta(seconds=10)),
+    ])
+    await db_session.commit()
+
+    digests = []
+
+    async def fake_digest(**kwargs):
+        digests.append(kwargs)
+
+    monkeypatch.setattr(notifications, "send_digest_notification", fake_digest)
+    session_factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+    wait = await scheduler.run_due(session_factory)
+    for task in list(scheduler._sending):
+        await task
+
+    assert 0 < wait <= 10
+    assert [p["title"] for p in digests[0]["posts"]] == ["Two", "One"]
+    db_session.expire_all()
+    published = (await db_session.execute(
+        select(Post.title).where(Post.is_published == True)
+    )).scalars().all()
+    assert sorted(published) == ["One", "Two"]
+
+
+async def test_run_due_sleeps_until_woken_when_nothing_is_scheduled(db_engine, monkeypatch):
+    session_factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    assert await scheduler.run_due(session_factory) is None
+
+    monkeypatch.setattr(settings, "scheduler_max_sleep_seconds", 600)
+    assert await scheduler.run_due(session_factory) == 600
+
+
+async def test_published_post_with_stale_schedule_is_not_due(db_engine, db_session):
+    project = await _project(db_session)
+    post = _post(project, "Imported", utcnow() - timedelta(days=1))
+    post.is_published = True
+    db_session.add(post)
+    await db_session.commit()
+
+    assert await scheduler.next_due_at(db_session) is None
+    session_factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    assert await scheduler.run_due(session_factory) is None
+
+
+async def test_run_due_skips_while_another_worker_holds_lease(db_engine, db_session):
+    project = await _project(db_session)
+    db_session.add(_post(project, "Due", utcnow() - timedelta(seconds=1)))
+    db_session.add(Lease(
+        name=scheduler.LEASE_NAME, owner="other", expires_at=utcnow() + timedelta(minutes=1)
+    ))
+    await db_session.commit()
+    session_factory = async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+    assert await scheduler.run_due(session_factory) == settings.scheduler_lease_seconds
+    assert (await db_session.execute(select(Post.is_published))).scalar() is False
+
+
+async def test_lease_taken_over_after_expiry(db_session):
+    assert await acquire_lease(db_session, "job", 60, owner="a")
+    assert await acquire_lease(db_session, "job", 60, owner="a")
+    assert not await acquire_lease(db_session, "job", 60, owner="b")
+    await db_session.execute(text("UPDATE leases SET expires_at = '2000-01-01 00:00:00'"))
+    assert await acquire_lease(db_session, "job", 60, owner="b")
+
+
+async def test_committed_schedule_wakes_scheduler(db_session):
+    project = await _project(db_session)
+    post = _post(project, "Soon", None)
+    db_session.add(post)
+    await db_session.commit()
+    scheduler._wake.clear()
+
+    await schedule_post(db_session, post, utcnow() + timedelta(minutes=1))
+    assert not scheduler._wake.is_set()
+    await db_session.commit()
+    assert scheduler._wake.is_set()
+    scheduler._wake.clear()
+
+
+async def test_api_and_dashboard_scheduling(client):
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}"}
+    when = (utcnow() + timedelta(days=1)).replace(microsecond=0)
+
+    resp = await client.post("/api/v1/posts", headers=headers, json={
+        "title": "Launch", "body_markdown": "Soon", "scheduled_at": when.isoformat() + "Z",
+    })
+    assert resp.status_code == 201
+    post = resp.json()["post"]
+    assert post["is_published"] is False
+    assert post["scheduled_at"] == when.isoformat()
+
+    resp = await client.post("/api/v1/posts", headers=headers, json={
+        "title": "Past", "body_markdown": "x", "scheduled_at": "2001-01-01T00:00:00Z",
+    })
+    assert resp.status_code == 422
+    resp = await client.post("/api/v1/posts", headers=headers, json={
+        "title": "Both", "body_markdown": "x", "is_published": True,
+        "scheduled_at": when.isoformat(),
+    })
+    assert resp.status_code == 422
+
+    base = f"/projects/{info['project_id']}/posts/{post['id']}"
+    page = await client.get(base)
+    assert "Scheduled for" in page.text
+    resp = await client.post(f"{base}/unschedule", follow_redirects=False)
+    assert resp.status_code == 302
+    resp = await client.post(
+        f"{base}/schedule", data={"scheduled_at": when.strftime("%Y-%m-%dT%H:%M")},
+        follow_redirects=False,
+    )
+    assert resp.status_code == 302
+    listed = (await client.get("/api/v1/posts?fields=id,scheduled_at", headers=headers)).json()
+    assert listed["posts"][0]["scheduled_at"] == when.replace(second=0).isoformat()
+
+
+def test_missing_nullable_columns_are_added():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE posts (id VARCHAR(36) PRIMARY KEY, title VARCHAR(300) NOT NULL)"
+        )
+        _add_missing_columns(conn)
+        columns = {c["name"] for c in inspect(conn).get_columns("posts")}
+    assert "scheduled_at" in columns
+    assert "title" in columns
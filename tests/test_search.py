@@ -0,0 +1,135 @@
+from sqlalchemy import insert, text
+
+from app.models import Post
+from app.services import search
+from app.services.auth import create_user
+from app.services.post import create_post, delete_post, toggle_publish, update_post
+from app.services.project import create_project
+from tests.test_programmatic_api import _setup_project_with_api_key
+
+
+async def _project(db_session):
+    user = await create_user(db_session, "search@test.com", "searcher", "password123")
+    project = await create_project(db_session, name="Search Project", owner_id=user.id)
+    await db_session.commit()
+    return project
+
+
+async def _titles(db_session, project_id, query, **kwargs):
+    return [post.title for post, _, _ in await search.search_posts(db_session, project_id, query, **kwargs)]
+
+
+def test_build_match_query():
+    assert search.build_match_query("SSO export") == '"sso" "export"'
+    assert search.build_match_query("the export of webh*") == '"export" "webh"*'
+    assert search.build_match_query("the") == '"the"'
+    assert search.build_match_query('title:x OR "NEAR(') == '"title" "x" "near"'
+    assert search.build_match_query("  ?! ") is None
+
+
+async def test_index_follows_post_changes(db_session):
+    project = await _project(db_session)
+    post = await create_post(db_session, project.id, "SSO support", "Sign in with **SAML**.")
+    await db_session.commit()
+    assert await _titles(db_session, project.id, "saml") == ["SSO support"]
+    assert await _titles(db_session, project.id, "saml", published_only=True) == []
+
+    await toggle_publish(db_session, post)
+    await update_post(db_session, post, title="Single sign-on", body_markdown="Now with OIDC.")
+    await db_session.commit()
+    assert await _titles(db_session, project.id, "saml") == []
+    assert await _titles(db_session, project.id, "oidc", published_only=True) == ["Single sign-on"]
+
+    await delete_post(db_session, post)
+    await db_session.commit()
+    assert await _titles(db_session, project.id, "oidc") == []
+    assert (await db_session.execute(text("SELECT count(*) FROM post_search"))).scalar() == 0
+
+
+async def test_ranking_scope_and_highlighting(db_session):
+    project = await _project(db_session)
+    other = await create_project(db_session, name="Other", owner_id=project.owner_id)
+    await create_post(db_session, project.id, "Billing fixes", "CSV export of invoices works again.")
+    await create_post(db_session, project.id, "CSV export", "Download any report.")
+    await create_post(db_session, other.id, "CSV export elsewhere", "Not this project.")
+    await create_post(db_session, project.id, "<b>Bold</b> & co", "Text <script>alert(1)</script> export")
+    await db_session.commit()
+
+    results = await search.search_posts(db_session, project.id, "export")
+    # The title match outranks body matches; the other project's post is left out
+    assert results[0][0].title == "CSV export"
+    assert len(results) == 3
+    _, title, snippet = results[0]
+    assert title == "CSV <mark>export</mark>"
+    assert snippet == ""
+    _, title, snippet = next(r for r in results if r[0].title.startswith("<b>"))
+    assert title == "&lt;b&gt;Bold&lt;/b&gt; &amp; co"
+    assert "<script>" not in snippet
+    assert snippet.endswith("<mark>export</mark>")
+
+
+async def test_older_posts_rank_by_relevance(db_session):
+    project = await _project(db_session)
+    await create_post(db_session, project.id, "Export", "The original export post.")
+    for i in range(30):
+        await create_post(db_session, project.id, f"Release {i}", "Includes an export fix.")
+    await db_session.commit()
+
+    titles = await _titles(db_session, project.id, "export", limit=5)
+    assert titles[0] == "Export"
+    assert len(titles) == 5
+
+
+async def test_category_filtered_before_limit(db_session):
+    project = await _project(db_session)
+    await create_post(db_session, project.id, "Export fix", "Export works.", category="bugfix")
+    for i in range(5):
+        await create_post(db_session, project.id, f"Export {i}", "Export export.", category="new_feature")
+    await db_session.commit()
+
+    assert await _titles(db_session, project.id, "export", category="bugfix", limit=2) == ["Export fix"]
+
+
+async def test_existing_posts_are_backfilled(db_engine, db_session):
+    project = await _project(db_session)
+    async with db_engine.begin() as conn:
+        await conn.run_sync(search.drop_search_index)
+        await conn.execute(insert(Post.__table__), [{
+            "id": "legacy-post", "title": "Legacy", "slug": "legacy", "body_markdown": "x",
+            "body_html": "<p>Old &amp; <em>dusty</em> webhooks</p>", "category": "improvement",
+            "is_published": True, "view_count": 0, "project_id": project.id,
+        }])
+        await conn.run_sync(search.create_search_index)
+
+    results = await search.search_posts(db_session, project.id, "webh*", published_only=True)
+    assert [(post.id, str(snippet)) for post, _, snippet in results] == [
+        ("legacy-post", "Old &amp; dusty <mark>webhooks</mark>")
+    ]
+
+
+async def test_search_endpoints(client):
+    info = await _setup_project_with_api_key(client)
+    headers = {"Authorization": f"Bearer {info['api_key']}"}
+    for title, published in [("SSO launch", True), ("SSO draft", False), ("Dark mode", True)]:
+        resp = await client.post("/api/v1/posts", headers=headers, json={
+            "title": title, "body_markdown": f"{title} details", "is_published": published,
+        })
+        assert resp.status_code == 201
+
+    resp = await client.get("/api/v1/posts/search?q=sso&fields=title", headers=headers)
+    assert {p["title"] for p in resp.json()["posts"]} == {"SSO launch", "SSO draft"}
+    resp = await client.get("/api/v1/posts/search?q=sso&published=true", headers=headers)
+    post = resp.json()["posts"][0]
+    assert [p["title"] for p in resp.json()["posts"]] == ["SSO launch"]
+    assert post["highlighted_title"] == "<mark>SSO</mark> launch"
+    assert post["snippet"] == "<mark>SSO</mark> launch details"
+
+    page = await client.get(f"/projects/{info['project_id']}/posts?q=sso")
+    assert "<mark>SSO</mark> draft" in page.text
+    assert "Dark mode" not in page.text
+
+    page = await client.get("/changelog/api-project?q=sso")
+    assert page.status_code == 200
+    assert "<mark>SSO</mark> launch" in page.text
+    assert "SSO draft" not in page.text
+    assert "Dark mode" not in page.text
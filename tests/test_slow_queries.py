@@ -0,0 +1,90 @@
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app import slow_queries
+from app.config import settings
+
+
+async def _login(client, email: str) -> None:
+    resp = await client.post(
+        "/register",
+        data={"email": email, "username": email.split("@")[0], "password": "password123"},
+        follow_redirects=False,
+    )
+    client.cookies.set("access_token", resp.cookies.get("access_token"))
+
+
+def test_parameter_shape_hides_values():
+    assert slow_queries.parameter_shape(("secret", 3, None, b"ab")) == "(str[6], int, NULL, bytes[2])"
+    assert slow_queries.parameter_shape({"slug": "abc"}) == "{slug: str[3]}"
+    assert slow_queries.parameter_shape([("a",), ("bb",)], executemany=True) == "2 x (str[1])"
+
+
+async def test_slow_statement_recorded_with_plan(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 0.0001)
+
+    await db_session.execute(
+        text("SELECT id FROM posts WHERE body_markdown = :body"), {"body": "needle"}
+    )
+
+    entry = next(e for e in slow_queries.recent() if "body_markdown" in e["statement"])
+    assert entry["parameters"] == "(str[6])"
+    assert entry["route"] == "-"
+    assert any(line.strip().startswith("SCAN posts") for line in entry["plan"])
+
+
+async def test_nothing_recorded_below_threshold_or_disabled(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 60_000)
+    await db_session.execute(text("SELECT 1"))
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+    await db_session.execute(text("SELECT 1"))
+    assert slow_queries.recent() == []
+
+
+async def test_failed_statement_leaves_no_timer_on_connection(db_engine, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 0.0001)
+    async with db_engine.connect() as conn:
+        with pytest.raises(DBAPIError):
+            await conn.execute(text("SELECT * FROM no_such_table"))
+        await conn.execute(text("SELECT 1"))
+        assert not any(conn.info.values())
+    assert [e["statement"] for e in slow_queries.recent()] == ["SELECT 1"]
+
+
+async def test_route_log_file_and_admin_page(client, monkeypatch, tmp_path):
+    log_file = tmp_path / "slow.log"
+    monkeypatch.setattr(settings, "admin_emails", "boss@example.com")
+    monkeypatch.setattr(settings, "slow_query_log_file", str(log_file))
+    await _login(client, "boss@example.com")
+    monkeypatch.setattr(settings, "slow_query_ms", 0.0001)
+
+    await client.get("/dashboard")
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+
+    entries = slow_queries.recent()
+    assert entries
+    assert {e["route"] for e in entries} == {"GET /dashboard"}
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == len(entries)
+    assert json.loads(lines[0])["route"] == "GET /dashboard"
+
+    page = await client.get("/admin/slow-queries")
+    assert page.status_code == 200
+    assert "GET /dashboard" in page.text
+    assert (await client.get("/admin/slow-queries.json")).json() == entries
+
+
+async def test_ring_is_bounded(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 0.0001)
+    monkeypatch.setattr(settings, "slow_query_keep", 3)
+    for i in range(5):
+        await db_session.execute(text(f"SELECT {i}"))
+    assert [e["statement"] for e in slow_queries.recent()] == ["SELECT 4", "SELECT 3", "SELECT 2"]
+
+
+async def test_slow_query_page_requires_admin(client):
+    await _login(client, "someone@example.com")
+    assert (await client.get("/admin/slow-queries")).status_code == 403
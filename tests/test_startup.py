@@ -0,0 +1,73 @@
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database
+from app.config import settings
+from app.startup import COLD_START_BUDGET_SECONDS, StartupProfile, profile_cold_start
+
+
+async def test_ensure_schema_skips_create_all_when_current(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'boot.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    try:
+        assert await database.ensure_schema() is False
+        assert await database.ensure_schema() is True
+
+        async with engine.begin() as conn:
+            await conn.execute(update(database.schema_version).values(fingerprint="stale"))
+        assert await database.ensure_schema() is False
+        assert await database.ensure_schema() is True
+    finally:
+        await engine.dispose()
+
+
+def test_startup_profile_steps():
+    profile = StartupProfile()
+    with profile.step("schema"):
+        pass
+    profile.record("import", 0.25)
+    snapshot = profile.snapshot()
+    assert list(snapshot["steps_ms"]) == ["schema", "import"]
+    assert snapshot["total_ms"] >= 250
+
+
+async def test_admin_runtime_reports_startup(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_emails", "boss@example.com")
+    assert "startup" not in (await client.get("/health")).json()
+    resp = await client.post(
+        "/register",
+        data={"email": "viewer@example.com", "username": "viewer", "password": "password123"},
+        follow_redirects=False,
+    )
+    client.cookies.set("access_token", resp.cookies.get("access_token"))
+    assert (await client.get("/admin/runtime")).status_code == 403
+
+    resp = await client.post(
+        "/register",
+        data={"email": "boss@example.com", "username": "boss", "password": "password123"},
+        follow_redirects=False,
+    )
+    client.cookies.set("access_token", resp.cookies.get("access_token"))
+    data = (await client.get("/admin/runtime")).json()
+    assert "import" in data["startup"]["steps_ms"]
+    assert data["password_hashing"]["in_flight"] == 0
+
+
+def test_fast_boot_cold_start_budget(tmp_path):
+    env = {"DATABASE_URL": f"sqlite+aiosqlite:///{tmp_path / 'cold.db'}"}
+    full = profile_cold_start(env)
+    assert list(full.steps) == ["import", "schema", "templates"]
+
+    fast = profile_cold_start({**env, "FAST_BOOT": "true"})
+    assert fast.total < COLD_START_BUDGET_SECONDS, fast.steps
+    imported = {entry.module for entry in fast.imports}
+    assert "app.main" in imported
+    # Only needed once a post is rendered
+    assert not imported & {"markdown", "bleach"}
+
+    quiet = profile_cold_start(
+        {**env, "FAST_BOOT": "true", "SCHEDULER_ENABLED": "false", "MAINTENANCE_ENABLED": "false"}
+    )
+    imported = {entry.module for entry in quiet.imports}
+    # Only imported by workers that run them
+    assert not imported & {"app.services.scheduler", "app.services.maintenance"}
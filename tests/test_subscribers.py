@@ -1,6 +1,7 @@
-import pytest
 from httpx import AsyncClient
 
+from app.services.email import _build_digest_email, _build_html_email
+
 
 async def _register_and_login(client: AsyncClient) -> dict:
     await client.post(
@@ -248,3 +249,21 @@ async def test_dashboard_subscriber_count(client: AsyncClient):
     assert resp.status_code == 200
     # Should show 2 subscribers, not hardcoded 0
     assert ">2<" in resp.text
+
+
+def test_notification_emails_escape_post_fields():
+    evil = '<img src=x onerror="alert(1)">'
+    single = _build_html_email(
+        project_name=evil, project_slug="p", post_title=evil, post_slug="s",
+        post_body_html="<p>Body</p>", post_category_label=evil,
+        accent_color="#6366f1", unsubscribe_token="t",
+    )
+    digest = _build_digest_email(
+        project_name=evil, project_slug="p",
+        posts=[{"slug": "s", "title": evil, "category_label": evil}],
+        accent_color="#6366f1", unsubscribe_token="t",
+    )
+    for body in (single, digest):
+        assert "<img" not in body
+        assert "&lt;img src=x onerror=&quot;alert(1)&quot;&gt;" in body
+    assert "<p>Body</p>" in single
@@ -0,0 +1,38 @@
+import pytest
+
+from app import templating
+from app.api import changelog, posts, projects
+from app.config import settings
+from app.main import templates
+
+
+def test_routers_share_one_environment():
+    assert changelog.templates is templates
+    assert posts.templates is templates
+    assert projects.templates.env is templating.env
+
+
+def test_auto_reload_off_outside_debug():
+    assert settings.debug is False
+    assert templating.env.auto_reload is False
+
+
+@pytest.mark.asyncio
+async def test_precompiled_pages_render_without_the_loader(client, monkeypatch):
+    count = templating.precompile_templates()
+    assert count == len(templating.env.list_templates(extensions=["html"]))
+    assert count > 20
+
+    def no_disk(*args):
+        raise AssertionError("template loaded after precompilation")
+
+    monkeypatch.setattr(templating.env.loader, "get_source", no_disk)
+    response = await client.get("/login")
+    assert response.status_code == 200
+
+
+def test_bytecode_cache_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "template_bytecode_cache_dir", str(tmp_path / "jinja"))
+    env = templating.create_environment()
+    env.get_template("pages/login.html")
+    assert list((tmp_path / "jinja").glob("__jinja2_*.cache"))
@@ -1,8 +1,12 @@
-import json
+import asyncio
+import gzip
 
-import pytest
 from httpx import AsyncClient
 
+from app.api.widget import LITE_WIDGET_MAX_BYTES, LITE_WIDGET_MAX_GZIP_BYTES
+from app.config import settings
+from app.services import widget_cache
+
 
 async def _setup_project_with_posts(client: AsyncClient) -> dict:
     """Create a project with some published posts."""
@@ -26,7 +30,7 @@ async def _setup_project_with_posts(client: AsyncClient) -> dict:
     project_id = resp.headers["location"].split("/projects/")[1]
 
     # Create a published post
-    await client.post(
+    resp = await client.post(
         f"/projects/{project_id}/posts/new",
         data={
             "title": "Widget Feature Post",
@@ -36,6 +40,7 @@ async def _setup_project_with_posts(client: AsyncClient) -> dict:
         },
         follow_redirects=False,
     )
+    post_id = resp.headers["location"].split("/posts/")[1]
 
     # Create a draft post (should not appear in widget)
     await client.post(
@@ -49,7 +54,7 @@ async def _setup_project_with_posts(client: AsyncClient) -> dict:
         follow_redirects=False,
     )
 
-    return {"project_id": project_id, "slug": "widget-test"}
+    return {"project_id": project_id, "slug": "widget-test", "post_id": post_id}
 
 
 # --- Widget JSON API ---
@@ -165,3 +170,207 @@ async def test_widget_embed_js_has_html_escape(client: AsyncClient):
     # Verify esc() is used for post content rendering
     assert "esc(post.title)" in resp.text
     assert "esc(post.excerpt)" in resp.text
+
+
+# --- Widget response cache ---
+
+async def test_widget_posts_cache_hit(client: AsyncClient):
+    """Second widget request is served from the snapshot cache."""
+    info = await _setup_project_with_posts(client)
+    first = await client.get(f"/api/widget/{info['slug']}/posts")
+    second = await client.get(f"/api/widget/{info['slug']}/posts")
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "FRESH"
+    assert first.content == second.content
+    assert "stale-while-revalidate=" in second.headers["cache-control"]
+
+
+async def test_widget_posts_cache_keyed_by_limit(client: AsyncClient):
+    """Different limits are cached separately."""
+    info = await _setup_project_with_posts(client)
+    await client.get(f"/api/widget/{info['slug']}/posts?limit=5")
+    resp = await client.get(f"/api/widget/{info['slug']}/posts?limit=1")
+    assert resp.headers["x-cache"] == "MISS"
+
+
+async def test_widget_posts_cache_invalidated_on_publish(client: AsyncClient):
+    """Publishing a post drops the cached snapshot."""
+    info = await _setup_project_with_posts(client)
+    await client.get(f"/api/widget/{info['slug']}/posts")
+    await client.post(
+        f"/projects/{info['project_id']}/posts/new",
+        data={
+            "title": "Fresh Release",
+            "body_markdown": "Just shipped.",
+            "category": "announcement",
+            "action": "publish",
+        },
+    )
+    resp = await client.get(f"/api/widget/{info['slug']}/posts")
+    assert resp.headers["x-cache"] == "MISS"
+    assert resp.json()["posts"][0]["title"] == "Fresh Release"
+
+
+async def test_widget_posts_cache_invalidated_on_edit_and_delete(client: AsyncClient):
+    """Editing or deleting a published post drops the cached snapshot."""
+    info = await _setup_project_with_posts(client)
+    post_id = info["post_id"]
+    await client.get(f"/api/widget/{info['slug']}/posts")
+
+    await client.post(
+        f"/projects/{info['project_id']}/posts/{post_id}/edit",
+        data={"title": "Renamed Feature", "body_markdown": "Updated.", "category": "new_feature"},
+    )
+    resp = await client.get(f"/api/widget/{info['slug']}/posts")
+    assert resp.headers["x-cache"] == "MISS"
+    assert resp.json()["posts"][0]["title"] == "Renamed Feature"
+
+    await client.post(f"/projects/{info['project_id']}/posts/{post_id}/delete")
+    resp = await client.get(f"/api/widget/{info['slug']}/posts")
+    assert resp.headers["x-cache"] == "MISS"
+    assert resp.json()["posts"] == []
+
+
+async def test_widget_posts_stale_served_while_revalidating(client: AsyncClient, monkeypatch):
+    """A stale snapshot is served immediately and refreshed in the background."""
+    info = await _setup_project_with_posts(client)
+    await client.get(f"/api/widget/{info['slug']}/posts")
+
+    monkeypatch.setattr(settings, "widget_cache_ttl_seconds", 0)
+    resp = await client.get(f"/api/widget/{info['slug']}/posts")
+    assert resp.headers["x-cache"] == "STALE"
+    await asyncio.gather(*widget_cache._tasks)
+
+    monkeypatch.setattr(settings, "widget_cache_ttl_seconds", 30)
+    resp = await client.get(f"/api/widget/{info['slug']}/posts")
+    assert resp.headers["x-cache"] == "FRESH"
+
+
+def test_widget_cache_refresh_is_single_flight():
+    """Only one background refresh runs per key at a time."""
+    started = []
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def refresh():
+            started.append(1)
+            await gate.wait()
+
+        assert widget_cache.refresh_in_background(("p", 5), refresh)
+        assert not widget_cache.refresh_in_background(("p", 5), refresh)
+        gate.set()
+        await asyncio.gather(*widget_cache._tasks)
+        assert widget_cache.refresh_in_background(("p", 5), refresh)
+        await asyncio.gather(*widget_cache._tasks)
+
+    asyncio.run(scenario())
+    assert len(started) == 2
+
+
+def test_widget_cache_discards_racing_build():
+    """A build that started before an invalidation is not stored."""
+    gen = widget_cache.generation("project-1")
+    widget_cache.invalidate_project("project-1")
+    widget_cache.store(("slug", 5), "project-1", b"{}", gen)
+    snapshot, state = widget_cache.lookup(("slug", 5))
+    assert snapshot is None
+    assert state == widget_cache.MISS
+
+
+# --- Batch widget API ---
+
+async def test_widget_batch_posts(client: AsyncClient):
+    """Batch endpoint returns posts for every known slug and lists unknown ones."""
+    info = await _setup_project_with_posts(client)
+    await client.post("/projects/new", data={"name": "Second Widget"})
+    resp = await client.get(
+        f"/api/widget/batch?slugs={info['slug']},second-widget&slugs=nope"
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert list(data["projects"]) == [info["slug"], "second-widget"]
+    assert [p["title"] for p in data["projects"][info["slug"]]["posts"]] == ["Widget Feature Post"]
+    assert data["projects"]["second-widget"]["posts"] == []
+    assert data["not_found"] == ["nope"]
+    assert resp.headers.get("access-control-allow-origin") == "*"
+
+
+async def test_widget_batch_posts_limit_per_project(client: AsyncClient):
+    """Limit applies to each project separately, newest first."""
+    info = await _setup_project_with_posts(client)
+    for title in ("Second Release", "Third Release"):
+        await client.post(
+            f"/projects/{info['project_id']}/posts/new",
+            data={"title": title, "body_markdown": "Body", "action": "publish"},
+        )
+    resp = await client.get(f"/api/widget/batch?slugs={info['slug']}&limit=2")
+    posts = resp.json()["projects"][info["slug"]]["posts"]
+    assert [p["title"] for p in posts] == ["Third Release", "Second Release"]
+
+
+async def test_widget_batch_posts_requires_slugs(client: AsyncClient):
+    resp = await client.get("/api/widget/batch")
+    assert resp.status_code == 422
+
+
+async def test_widget_batch_posts_too_many_slugs(client: AsyncClient):
+    slugs = ",".join(f"s{i}" for i in range(101))
+    resp = await client.get(f"/api/widget/batch?slugs={slugs}")
+    assert resp.status_code == 422
+
+
+# --- Lite widget ---
+
+async def test_widget_lite_js(client: AsyncClient):
+    """Lite runtime is served minified for the project."""
+    info = await _setup_project_with_posts(client)
+    resp = await client.get(f"/api/widget/{info['slug']}/lite.js")
+    assert resp.status_code == 200
+    assert "javascript" in resp.headers.get("content-type", "")
+    assert resp.headers.get("access-control-allow-origin") == "*"
+    assert f"'{info['slug']}'" in resp.text
+    assert "\n" not in resp.text
+    assert "requestIdleCallback" in resp.text
+    assert "addEventListener('unpublished'" in resp.text
+
+
+async def test_widget_lite_js_within_budget(client: AsyncClient):
+    """Lite runtime stays under its published byte budgets."""
+    info = await _setup_project_with_posts(client)
+    resp = await client.get(f"/api/widget/{info['slug']}/lite.js")
+    assert len(resp.content) <= LITE_WIDGET_MAX_BYTES
+    assert len(gzip.compress(resp.content)) <= LITE_WIDGET_MAX_GZIP_BYTES
+
+
+async def test_widget_lite_js_nonexistent_project(client: AsyncClient):
+    resp = await client.get("/api/widget/no-such-project/lite.js")
+    assert resp.status_code == 404
+
+
+async def test_widget_latest(client: AsyncClient):
+    """Unread check endpoint returns epoch-millisecond publish times only."""
+    info = await _setup_project_with_posts(client)
+    resp = await client.get(f"/api/widget/{info['slug']}/latest")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert list(data) == ["published"]
+    assert len(data["published"]) == 1
+    assert isinstance(data["published"][0], int)
+    assert data["published"][0] > 1_600_000_000_000
+
+
+async def test_widget_latest_invalidated_on_publish(client: AsyncClient):
+    info = await _setup_project_with_posts(client)
+    await client.get(f"/api/widget/{info['slug']}/latest")
+    await client.post(
+        f"/projects/{info['project_id']}/posts/new",
+        data={"title": "Another", "body_markdown": "Body", "action": "publish"},
+    )
+    resp = await client.get(f"/api/widget/{info['slug']}/latest")
+    assert len(resp.json()["published"]) == 2
+
+
+async def test_widget_latest_nonexistent_project(client: AsyncClient):
+    resp = await client.get("/api/widget/no-such-project/latest")
+    assert resp.status_code == 404